@@ -3,14 +3,51 @@ ASGI config for apiorders project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Потоковые выгрузки (ExportView) читают строки из БД синхронным итератором, а Django 4.1 перебирает
+потоковый ответ в цикле событий (SynchronousOnlyOperation). Поэтому их запросы выполняет WSGI-обработчик
+в отдельном потоке (asgiref WsgiToAsgi): ответ по-прежнему отдается частями по мере чтения.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 """
 
 import os
 
+from asgiref.wsgi import WsgiToAsgi
 from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.urls import Resolver404, resolve
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'apiorders.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+wsgi_application = get_wsgi_application()
+
+from backend.views import ExportView  # после настройки Django
+
+
+def wsgi_streaming(environ, start_response):
+    """WSGI-обработчик, закрывающий ответ после перебора (WsgiToAsgi не вызывает close())"""
+
+    response = wsgi_application(environ, start_response)
+    try:
+        yield from response
+    finally:
+        response.close()
+
+
+streaming_application = WsgiToAsgi(wsgi_streaming)
+
+
+def is_streaming_export(path):
+    try:
+        view_class = getattr(resolve(path).func, 'view_class', None)
+    except Resolver404:
+        return False
+    return view_class is not None and issubclass(view_class, ExportView)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and is_streaming_export(scope['path']):
+        return await streaming_application(scope, receive, send)
+    return await django_application(scope, receive, send)
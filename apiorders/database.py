@@ -0,0 +1,44 @@
+"""
+Настройки подключения к PostgreSQL из переменных окружения.
+
+Режим управления соединениями задается DB_CONN_MODE:
+    none        - соединение открывается и закрывается на каждый запрос (поведение Django по умолчанию);
+    persistent  - постоянные соединения: живут DB_CONN_MAX_AGE секунд, перед повторным использованием
+                  проверяются (CONN_HEALTH_CHECKS), разорванные соединения переоткрываются;
+    pooled      - работа через пулер в режиме transaction pooling (PgBouncer): соединение с пулером
+                  держится как в persistent, серверные курсоры отключены, т.к. курсор живет дольше
+                  транзакции, а соединение с сервером между транзакциями может смениться.
+"""
+import os
+
+CONN_MODES = ('none', 'persistent', 'pooled')
+
+
+def get_database(prefix='POSTGRES', mode=None):
+    """Словарь для DATABASES из переменных <prefix>_ENGINE, <prefix>_DB, <prefix>_HOST и т.д."""
+
+    mode = mode or os.getenv('DB_CONN_MODE', 'none')
+    if mode not in CONN_MODES:
+        raise ValueError(f'DB_CONN_MODE должен быть одним из {CONN_MODES}, получено {mode!r}')
+
+    database = {
+        'ENGINE': os.getenv(f'{prefix}_ENGINE', os.getenv('POSTGRES_ENGINE')),
+        'NAME': os.getenv(f'{prefix}_DB', os.getenv('POSTGRES_DB')),
+        'HOST': os.getenv(f'{prefix}_HOST', default='127.0.0.1'),
+        'PORT': os.getenv(f'{prefix}_PORT', '5432'),
+        'USER': os.getenv(f'{prefix}_USER', os.getenv('POSTGRES_USER')),
+        'PASSWORD': os.getenv(f'{prefix}_PASSWORD', os.getenv('POSTGRES_PASSWORD')),
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+    }
+
+    if mode in ('persistent', 'pooled'):
+        database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 60))
+        database['CONN_HEALTH_CHECKS'] = True
+    if mode == 'pooled':
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+    connect_timeout = os.getenv('DB_CONNECT_TIMEOUT')
+    if connect_timeout and 'postgresql' in (database['ENGINE'] or ''):
+        database['OPTIONS'] = {'connect_timeout': int(connect_timeout)}
+    return database
@@ -1,15 +1,115 @@
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.urls import path
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 from backend.serializers import SupplierOrdertGetSerializer, BasketGetSerializer, \
     BuyerOrderGetSerializer, BuyerOrderPostRequestSerializer, \
     BasketPostRequestSerializer, PriceListUpdateSerializer, ProductSupplierSerializer
 
+
+def lazy_view(name, **initkwargs):
+    """
+    Представление drf_spectacular.views.<name>: модуль (генератор схемы, рендереры) импортируется
+    при первом запросе к схеме, а не при загрузке URLconf в каждом воркере
+    """
+    view = None
+
+    def schema_view(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            from drf_spectacular import views
+            view = getattr(views, name).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    schema_view.csrf_exempt = True
+    return schema_view
+
+
+# Форматы собранной схемы: расширение файла - тип содержимого (как у рендереров drf-spectacular)
+SCHEMA_FORMATS = {
+    'yaml': 'application/vnd.oai.openapi; charset=utf-8',
+    'json': 'application/vnd.oai.openapi+json; charset=utf-8',
+}
+
+_live_schema_view = lazy_view('SpectacularAPIView')
+_schema_files = {}
+_schema_files_lock = threading.Lock()
+
+
+def schema_file_path(schema_format, version=None):
+    """Файл собранной схемы для версии API (SPECTACULAR_SETTINGS['VERSION'])"""
+
+    if version is None:
+        from drf_spectacular.settings import spectacular_settings
+        version = spectacular_settings.VERSION
+    return os.path.join(settings.OPENAPI_SCHEMA_DIR, f'openapi-{version}.{schema_format}')
+
+
+def build_schema():
+    """Схема OpenAPI без запроса (как manage.py spectacular): {формат: содержимое}"""
+
+    from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    schema = spectacular_settings.DEFAULT_GENERATOR_CLASS().get_schema(request=None, public=True)
+    return {
+        'yaml': OpenApiYamlRenderer().render(schema, renderer_context={}),
+        'json': OpenApiJsonRenderer().render(schema, renderer_context={}),
+    }
+
+
+def load_schema_file(schema_format):
+    """(содержимое, ETag) собранной схемы или None; файл перечитывается после пересборки"""
+
+    path = schema_file_path(schema_format)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _schema_files.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, 'rb') as file:
+            content = file.read()
+        cached = (key, content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+        with _schema_files_lock:
+            _schema_files[path] = cached
+    return cached[1:]
+
+
+def static_schema_view(request, *args, **kwargs):
+    """
+    Схема из файла manage.py build_openapi_schema (?format=json или Accept с json - JSON, иначе YAML)
+    с ETag и Cache-Control. Без файла схема генерируется при каждом запросе только при DEBUG
+    """
+    accept = request.META.get('HTTP_ACCEPT', '')
+    schema_format = 'json' if request.GET.get('format') == 'json' or 'json' in accept else 'yaml'
+    schema = load_schema_file(schema_format)
+    if schema is None:
+        if settings.DEBUG:
+            return _live_schema_view(request, *args, **kwargs)
+        return JsonResponse({'error': 'Схема не собрана: python manage.py build_openapi_schema'}, status=404)
+
+    content, etag = schema
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=SCHEMA_FORMATS[schema_format])
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
 schema_urlpatterns = [
-    path('schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('schema/', static_schema_view, name='schema'),
+    path('schema/swagger-ui/', lazy_view('SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
+    path('schema/redoc/', lazy_view('SpectacularRedocView', url_name='schema'), name='redoc'),
 ]
 
 extend_schema_data = {
@@ -74,6 +174,24 @@ extend_schema_data = {
                         },
 
     'BuyerOrderView': {'responses': BuyerOrderGetSerializer(many=True)},
+    'OrderHistory': {
+        'parameters': [
+            OpenApiParameter(
+                name='date_from',
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Orders created from this date (archived orders are read only for old dates)'
+            ),
+            OpenApiParameter(
+                name='date_to',
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Orders created up to this date inclusive'
+            ),
+        ],
+    },
     'BuyerOrderView_POST': {
                         'request': BuyerOrderPostRequestSerializer,
                         'responses':    {
@@ -95,6 +213,56 @@ extend_schema_data = {
         'request': PriceListUpdateSerializer,
                             },
 
+    'SupplierStockView': {
+        'request': {
+            'application/json': {
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'supplier_id': {'type': 'integer'},
+                        'items': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'external_id': {'type': 'integer'},
+                                    'price': {'type': 'string', 'format': 'decimal'},
+                                    'price_rrc': {'type': 'string', 'format': 'decimal'},
+                                    'quantity': {'type': 'integer'},
+                                },
+                                'required': ['external_id'],
+                            },
+                        },
+                    },
+                    'required': ['supplier_id', 'items'],
+                },
+                'example': {
+                    'supplier_id': 1,
+                    'items': [{'external_id': 4216292, 'quantity': 12},
+                              {'external_id': 4216313, 'price': '69990.00', 'quantity': 0}],
+                },
+            },
+        },
+        'responses': {
+            200: {
+                'type': 'object',
+                'properties': {
+                    'updated': {'type': 'integer'},
+                    'unchanged': {'type': 'integer'},
+                    'not_found': {'type': 'integer'},
+                    'invalid': {'type': 'integer'},
+                    'results': {'type': 'array', 'items': {'type': 'object'}},
+                },
+                'example': {
+                    'updated': 1, 'unchanged': 0, 'not_found': 1, 'invalid': 0,
+                    'results': [{'external_id': 4216292, 'status': 'updated'},
+                                {'external_id': 4216313, 'status': 'not_found'}],
+                },
+            },
+            400: {'type': 'object', 'properties': {'error': {'type': 'string'}}},
+        },
+    },
+
     'ProductSupplierView': {
         'responses': ProductSupplierSerializer(many=True),
         'parameters': [
@@ -122,6 +290,200 @@ extend_schema_data = {
         ],
     },
 
+    'ProductSupplierSearchView': {
+        'responses': ProductSupplierSerializer(many=True),
+        'parameters': [
+            OpenApiParameter(
+                name='q',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=True,
+                description='Search query (product name, model, parameter values)'
+            ),
+            OpenApiParameter(
+                name='page',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Page number'
+            ),
+        ],
+    },
+
+    'ProductSupplierAutocompleteView': {
+        'responses': {
+            200: {
+                'type': 'object',
+                'properties': {
+                    'suggestions': {'type': 'array', 'items': {'type': 'object'}},
+                },
+                'example': {
+                    'suggestions': [
+                        {'text': 'Смартфон Apple iPhone XS Max 512GB (золотистый)', 'kind': 'name', 'offers': 3,
+                         'quantity': 35},
+                        {'text': 'apple/iphone/xs-max', 'kind': 'model', 'offers': 2, 'quantity': 21},
+                    ],
+                },
+            },
+        },
+        'parameters': [
+            OpenApiParameter(
+                name='q',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=True,
+                description='Prefix of a product name or model (of any word)'
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Max suggestions'
+            ),
+        ],
+    },
+
+    'ProductSupplierChangesView': {
+        'responses': {
+            200: {
+                'type': 'object',
+                'properties': {
+                    'cursor': {'type': 'integer'},
+                    'has_more': {'type': 'boolean'},
+                    'changes': {'type': 'array', 'items': {'type': 'object'}},
+                },
+                'example': {
+                    'cursor': 1250,
+                    'has_more': False,
+                    'changes': [
+                        {'seq': 1248, 'kind': 'update', 'id': 54, 'supplier_id': 1, 'price': '109990.00',
+                         'quantity': 12},
+                        {'seq': 1249, 'kind': 'retire', 'id': 57, 'supplier_id': 1},
+                        {'seq': 1250, 'kind': 'availability', 'supplier_id': 2, 'is_available': False},
+                    ],
+                },
+            },
+        },
+        'parameters': [
+            OpenApiParameter(
+                name='since',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Cursor from the previous response (without it only the current cursor is returned)'
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Max change log entries per response'
+            ),
+        ],
+    },
+
+    'SupplierSalesAnalyticsView': {
+        'responses': {
+            200: {
+                'type': 'object',
+                'properties': {
+                    'date_from': {'type': 'string', 'format': 'date'},
+                    'date_to': {'type': 'string', 'format': 'date'},
+                    'interval': {'type': 'string'},
+                    'totals': {'type': 'object'},
+                    'series': {'type': 'array', 'items': {'type': 'object'}},
+                    'categories': {'type': 'array', 'items': {'type': 'object'}},
+                    'top_products': {'type': 'array', 'items': {'type': 'object'}},
+                },
+                'example': {
+                    'date_from': '2026-10-01',
+                    'date_to': '2026-10-02',
+                    'interval': 'day',
+                    'totals': {'quantity': 5, 'amount': '329970.00'},
+                    'series': [
+                        {'period': '2026-10-01', 'quantity': 3, 'amount': '209980.00'},
+                        {'period': '2026-10-02', 'quantity': 2, 'amount': '119990.00'},
+                    ],
+                    'categories': [{'id': 224, 'name': 'Смартфоны', 'quantity': 5, 'amount': '329970.00'}],
+                    'top_products': [
+                        {'id': 1, 'name': 'Смартфон Apple iPhone XS Max 512GB (золотистый)', 'orders': 2,
+                         'quantity': 2, 'amount': '219980.00'},
+                        {'id': 2, 'name': 'Смартфон Apple iPhone XR 256GB (красный)', 'orders': 2, 'quantity': 3,
+                         'amount': '109990.00'},
+                    ],
+                },
+            },
+        },
+        'parameters': [
+            OpenApiParameter(
+                name='date_from',
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Period start (30 days before date_to by default)'
+            ),
+            OpenApiParameter(
+                name='date_to',
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Period end (today by default)'
+            ),
+            OpenApiParameter(
+                name='interval',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=['day', 'week', 'month'],
+                description='Time series interval'
+            ),
+            OpenApiParameter(
+                name='supplier_id',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Supplier of the user (all by default)'
+            ),
+            OpenApiParameter(
+                name='category_id',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Product category'
+            ),
+            OpenApiParameter(
+                name='state',
+                type={'type': 'array', 'items': {'type': 'string'}},
+                location=OpenApiParameter.QUERY,
+                required=False,
+                explode=True,
+                description='Order states (all except canceled by default)'
+            ),
+            OpenApiParameter(
+                name='top',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description='Number of top products'
+            ),
+        ],
+    },
+
+    'ExportView': {
+        'responses': {(200, 'application/x-ndjson'): OpenApiTypes.STR, (200, 'text/csv'): OpenApiTypes.STR},
+        'parameters': [
+            OpenApiParameter(
+                name='format',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=['ndjson', 'csv'],
+                description='Export format (NDJSON by default)'
+            ),
+        ],
+    },
+
     'LoginView': {
         'request': {
             'schema': {
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
+from apiorders.database import get_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 # BASE_DIR = Path(__file__).resolve().parent.parent
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -28,7 +31,7 @@ if os.path.exists(dotenv_path):
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'on') != 'off'
 
 ALLOWED_HOSTS = ['*']
 
@@ -42,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'backend.apps.BackendConfig',
     'rest_framework',
     'rest_framework.authtoken',
@@ -53,15 +57,53 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.RequestMetricsMiddleware',
+    'backend.middleware.ProfilingMiddleware',
+    'backend.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'backend.middleware.ReplicaRoutingMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Сжатие ответов (backend/middleware.py CompressionMiddleware): COMPRESSION=off - выключено, минимальный размер
+# ответа, байт, алгоритмы в порядке предпочтения (zstd и br - при установленных zstandard и brotli) и уровни сжатия
+# (подобраны по python -m benchmarks.compression: скорость важнее последних процентов размера)
+COMPRESSION = os.getenv('COMPRESSION', 'on') != 'off'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_ENCODINGS = os.getenv('COMPRESSION_ENCODINGS', 'zstd,br,gzip').split(',')
+COMPRESSION_LEVELS = {
+    'gzip': int(os.getenv('COMPRESSION_GZIP_LEVEL', 6)),
+    'zstd': int(os.getenv('COMPRESSION_ZSTD_LEVEL', 3)),
+    'br': int(os.getenv('COMPRESSION_BR_LEVEL', 4)),
+}
+
+# Метрики запросов (backend/middleware.py RequestMetricsMiddleware): REQUEST_METRICS=off - выключены,
+# доля запросов с учетом запросов к БД, порог медленного запроса для лога, мс
+REQUEST_METRICS = os.getenv('REQUEST_METRICS', 'on') != 'off'
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', 0.05))
+REQUEST_METRICS_SLOW_MS = float(os.getenv('REQUEST_METRICS_SLOW_MS', 1000))
+
+# Профили запросов (backend/profiling.py, ProfilingMiddleware): PROFILING=on - подключены (по заголовку X-Profile
+# от сотрудника и для доли PROFILING_SAMPLE_RATE запросов), режим cprofile или sample, интервал сэмплера, с,
+# каталог и число хранимых профилей
+PROFILING = os.getenv('PROFILING', 'off') == 'on'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'cprofile')
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', 0.005))
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILING_KEEP = int(os.getenv('PROFILING_KEEP', 200))
+
+# Токен для /metrics (Authorization: Bearer <токен>). Без токена /metrics отвечает 404, если не задан
+# METRICS_PUBLIC=on (доступ ограничивается сетью). Метрики нескольких процессов - переменная окружения
+# PROMETHEUS_MULTIPROC_DIR (backend/metrics.py)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_PUBLIC = os.getenv('METRICS_PUBLIC', 'off') == 'on'
+
 ROOT_URLCONF = 'apiorders.urls'
 
 TEMPLATES = [
@@ -88,16 +130,35 @@ WSGI_APPLICATION = 'apiorders.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Режим соединений (DB_CONN_MODE: none / persistent / pooled) описан в apiorders/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': os.getenv('POSTGRES_ENGINE'),
-        'NAME': os.getenv('POSTGRES_DB'),
-        'HOST': os.getenv('POSTGRES_HOST', default='127.0.0.1'),
-        'PORT': os.getenv('POSTGRES_PORT', '5432'),
-        'USER': os.getenv('POSTGRES_USER'),
-        'PASSWORD': os.getenv('POSTGRES_PASSWORD')
-    }
+    'default': get_database('POSTGRES'),
 }
+
+# Реплика для чтения каталога и истории заказов (POSTGRES_REPLICA_HOST, POSTGRES_REPLICA_PORT, POSTGRES_REPLICA_DB...)
+REPLICA_DATABASE = None
+if os.getenv('POSTGRES_REPLICA_HOST'):
+    REPLICA_DATABASE = 'replica'
+    DATABASES[REPLICA_DATABASE] = get_database('POSTGRES_REPLICA')
+    DATABASES[REPLICA_DATABASE]['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['backend.db_routers.ReplicaRouter']
+
+# GET-запросы, которые могут читать с реплики
+REPLICA_READ_URL_NAMES = [
+    'backend:category',
+    'backend:supplier-products',
+    'backend:supplier-products-changes',
+    'backend:supplier-products-search',
+    'backend:supplier-products-autocomplete',
+    'backend:buyer-order',
+    'backend:supplier-order',
+    'backend:supplier-analytics',
+]
+# Сколько секунд после изменяющего запроса клиент читает только из основной БД. Отметка хранится в кэше,
+# поэтому реплика требует общего для воркеров кэша (REDIS_CACHE_URL): с кэшем в памяти процесса запрос,
+# попавший в другой воркер, читал бы с отстающей реплики
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -134,6 +195,14 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Схема OpenAPI: собирается командой build_openapi_schema в OPENAPI_SCHEMA_DIR (файл на версию API),
+# отдается из файла с Cache-Control max-age, с; без файла генерируется на лету только при DEBUG
+OPENAPI_SCHEMA_DIR = os.getenv('OPENAPI_SCHEMA_DIR', os.path.join(BASE_DIR, 'openapi'))
+OPENAPI_SCHEMA_MAX_AGE = int(os.getenv('OPENAPI_SCHEMA_MAX_AGE', 3600))
+SPECTACULAR_SETTINGS = {
+    'VERSION': os.getenv('API_VERSION', '1.0.0'),
+}
+
 AUTH_USER_MODEL = 'backend.CustomUser'
 
 # Email configuration
@@ -149,6 +218,36 @@ SERVER_EMAIL = EMAIL_HOST_USER
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', default='redis://127.0.0.1:6379')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', default='redis://127.0.0.1:6379')
 
+# Плановое обновление прайсов поставщиков (celery beat)
+PRICE_LIST_REFRESH_INTERVAL = int(os.getenv('PRICE_LIST_REFRESH_INTERVAL', 3600))
+PRICE_LIST_REFRESH_WORKERS = int(os.getenv('PRICE_LIST_REFRESH_WORKERS', 16))
+PRICE_LIST_REFRESH_PER_HOST = int(os.getenv('PRICE_LIST_REFRESH_PER_HOST', 2))
+PRICE_LIST_REFRESH_TIMEOUT = float(os.getenv('PRICE_LIST_REFRESH_TIMEOUT', 30))
+
+# Пересчет дневных итогов продаж (backend/analytics.py): интервал запуска и задержка учета изменений заказов, секунды
+SALES_ROLLUP_INTERVAL = int(os.getenv('SALES_ROLLUP_INTERVAL', 300))
+SALES_ROLLUP_LAG = int(os.getenv('SALES_ROLLUP_LAG', 60))
+
+# Архив заказов в конечных статусах, не менявшихся дольше ORDER_ARCHIVE_AFTER_DAYS дней (backend/archive.py)
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', 365))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv('ORDER_ARCHIVE_BATCH_SIZE', 1000))
+ORDER_ARCHIVE_INTERVAL = int(os.getenv('ORDER_ARCHIVE_INTERVAL', 86400))
+
+CELERY_BEAT_SCHEDULE = {
+    'refresh-price-lists': {
+        'task': 'backend.tasks.refresh_price_lists_task',
+        'schedule': PRICE_LIST_REFRESH_INTERVAL,
+    },
+    'update-sales-rollups': {
+        'task': 'backend.tasks.update_sales_rollups_task',
+        'schedule': SALES_ROLLUP_INTERVAL,
+    },
+    'archive-orders': {
+        'task': 'backend.tasks.archive_orders_task',
+        'schedule': ORDER_ARCHIVE_INTERVAL,
+    },
+}
+
 SOCIAL_AUTH_YANDEX_KEY = os.getenv('SOCIAL_AUTH_YANDEX_KEY')
 SOCIAL_AUTH_YANDEX_SECRET = os.getenv('SOCIAL_AUTH_YANDEX_SECRET')
 
@@ -158,6 +257,43 @@ SOCIAL_AUTH_USER_MODEL = AUTH_USER_MODEL
 
 
 
+# Кэш: Redis (общий для всех воркеров), если задан REDIS_CACHE_URL, иначе кэш в памяти процесса
+REDIS_CACHE_URL = os.getenv('REDIS_CACHE_URL')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+elif REPLICA_DATABASE:
+    raise ImproperlyConfigured('POSTGRES_REPLICA_HOST требует REDIS_CACHE_URL: отметка "читать из основной БД" '
+                               'после изменяющего запроса должна быть общей для всех воркеров')
+
+# Кэш аутентификации по токену: снимок пользователя в памяти процесса (короткий TTL) и в кэше TOKEN_AUTH_CACHE
+TOKEN_AUTH_CACHE = 'default'
+TOKEN_AUTH_CACHE_TTL = int(os.getenv('TOKEN_AUTH_CACHE_TTL', 300))
+TOKEN_AUTH_LOCAL_CACHE_TTL = int(os.getenv('TOKEN_AUTH_LOCAL_CACHE_TTL', 5))
+TOKEN_AUTH_LOCAL_CACHE_SIZE = int(os.getenv('TOKEN_AUTH_LOCAL_CACHE_SIZE', 10000))
+
+# Троттлинг: если задан THROTTLE_REDIS_URL, счетчики общие для всех воркеров и хранятся в Redis,
+# иначе используются стандартные классы DRF (кэш Django). THROTTLING=off - без троттлинга (нагрузочный тест)
+THROTTLE_REDIS_URL = os.getenv('THROTTLE_REDIS_URL')
+THROTTLE_REDIS_TIMEOUT = float(os.getenv('THROTTLE_REDIS_TIMEOUT', 0.1))
+
+if os.getenv('THROTTLING', 'on') == 'off':
+    THROTTLE_CLASSES = []
+elif THROTTLE_REDIS_URL:
+    THROTTLE_CLASSES = ['backend.throttles.RedisScopedRateThrottle']
+else:
+    THROTTLE_CLASSES = [
+        'backend.throttles.AnonShortRateThrottle',
+        'backend.throttles.AnonLongRateThrottle',
+        'backend.throttles.UserShortRateThrottle',
+        'backend.throttles.UserLongRateThrottle',
+        'backend.throttles.ViewScopeRateThrottle',
+    ]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -167,25 +303,33 @@ REST_FRAMEWORK = {
 
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 
+    # JSON через orjson (backend/renderers.py), без orjson - стандартные классы DRF
+    'DEFAULT_RENDERER_CLASSES': (
+        'backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'backend.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+
     'DEFAULT_AUTHENTICATION_CLASSES': (
         # 'rest_framework.authentication.SessionAuthentication',
         # 'rest_framework.authentication.BasicAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'backend.authentication.CachedTokenAuthentication',
         'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
         'drf_social_oauth2.authentication.SocialAuthentication',
     ),
-    'DEFAULT_THROTTLE_CLASSES': [
-        'backend.throttles.AnonShortRateThrottle',
-        'backend.throttles.AnonLongRateThrottle',
-        'backend.throttles.UserShortRateThrottle',
-        'backend.throttles.UserLongRateThrottle',
-    ],
+    'DEFAULT_THROTTLE_CLASSES': THROTTLE_CLASSES,
     'DEFAULT_THROTTLE_RATES': {
         'anon_short': '60/min',
         'anon_long': '1200/day',
         'user_short': '120/min',
         'user_long': '2400/day',
         'price_list_update': '10/min',
+        'export': '10/hour',
+        'stock_update': '30/min',
     },
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -196,5 +340,29 @@ AUTHENTICATION_BACKENDS = (
    'django.contrib.auth.backends.ModelBackend',
 )
 
+# Выгрузки каталога и заказов (backend/exports.py): строк за одно чтение из курсора
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Обновление цен и остатков (backend/stock.py): максимум строк за один запрос
+STOCK_UPDATE_MAX_ROWS = int(os.getenv('STOCK_UPDATE_MAX_ROWS', 5000))
+
+# Поиск товаров: минимальная и максимальная длина запроса
+SEARCH_QUERY_MIN_LENGTH = 2
+SEARCH_QUERY_MAX_LENGTH = 100
+
+# Подсказки при вводе (backend/autocomplete.py): кэш с меткой версии каталога, интервал проверки ленты изменений
+# без смены метки (секунды), число подсказок по умолчанию и максимум
+AUTOCOMPLETE_CACHE = 'default'
+AUTOCOMPLETE_REFRESH_INTERVAL = int(os.getenv('AUTOCOMPLETE_REFRESH_INTERVAL', 60))
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Аналитика продаж: период по умолчанию и максимальный период, дни
+SALES_ANALYTICS_DEFAULT_DAYS = 30
+SALES_ANALYTICS_MAX_DAYS = 731
+
+# Лента изменений каталога (backend/changes.py): максимум записей ленты за один запрос
+CHANGES_FEED_LIMIT = int(os.getenv('CHANGES_FEED_LIMIT', 1000))
+
 # DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -16,15 +16,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from apiorders.schema import schema_urlpatterns
-from backend.views import CustomConvertTokenView
+from backend.views import CustomConvertTokenView, metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('backend.urls', namespace='backend')),
     path('auth/convert-token/', CustomConvertTokenView.as_view(), name='convert-token'),
     path('auth/', include('drf_social_oauth2.urls', namespace='drf')),
+    path('metrics', metrics_view, name='metrics'),
 ]
-
-print(urlpatterns)
 urlpatterns += schema_urlpatterns
 
@@ -0,0 +1,153 @@
+"""
+Аналитика продаж по дневным итогам (SalesRollup).
+
+Итоги считаются по заказанным позициям (все статусы, кроме корзины) за день создания заказа,
+в разрезе поставщика, категории, продукта и статуса заказа. Сумма - по цене товара поставщика
+на момент пересчета (цена в позиции заказа не хранится, так же считаются суммы в письмах о заказе),
+для заказов в архиве (backend/archive.py) - по цене, сохраненной при переносе. Архив учитывается при каждом
+пересчете дня, поэтому перенос заказов в архив итоги не меняет.
+
+Пересчет инкрементальный (update_sales_rollups, периодическая задача): по заказам, измененным
+(updated_at) после прошлого пересчета, определяются их дни, итоги этих дней пересчитываются целиком.
+Изменения последних SALES_ROLLUP_LAG секунд откладываются до следующего запуска, чтобы не пропустить
+заказы из еще не завершенных транзакций. Удаление заказов (вместе с покупателем) учитывается только
+полным пересчетом (full=True). Отчеты читают только итоги, а не позиции заказов.
+"""
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, F, Sum, Count, DecimalField
+from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
+from django.utils import timezone
+
+from backend.fast_read import decimal_str
+from backend.archive import archive_horizon, created_range
+from backend.models import Order, OrderItem, SalesRollup, SalesRollupState, ArchivedOrderItem
+
+INTERVALS = {'day': F('day'), 'week': TruncWeek('day'), 'month': TruncMonth('day')}
+
+# Размер порции при записи итогов
+BATCH_SIZE = 1000
+
+
+def day_ranges(days):
+    """Периоды [первый день, последний день] из дней создания заказа, подряд идущие дни объединяются"""
+
+    ranges = []
+    for day in sorted(days):
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return ranges
+
+
+def rollup_rows(items):
+    """Итоги по позициям заказов: день, поставщик, категория, продукт, статус"""
+
+    return items.exclude(order__state='basket').values(
+        rollup_day=TruncDate('order__created_at'),
+        rollup_supplier_id=F('product_supplier__supplier_id'),
+        rollup_category_id=F('product_supplier__product__category_id'),
+        rollup_product_id=F('product_supplier__product_id'),
+        rollup_state=F('order__state'),
+    ).annotate(
+        total_orders=Count('order_id', distinct=True),
+        total_quantity=Sum('quantity'),
+        total_amount=Sum(F('quantity') * F('product_supplier__price'),
+                         output_field=DecimalField(max_digits=14, decimal_places=2)),
+    ).order_by()
+
+
+def archived_rollup_rows(items):
+    """Итоги по позициям заказов в архиве (ключи - как у rollup_rows)"""
+
+    return items.values(
+        rollup_day=TruncDate('order__created_at'),
+        rollup_supplier_id=F('supplier_id'),
+        rollup_category_id=F('product__category_id'),
+        rollup_product_id=F('product_id'),
+        rollup_state=F('order__state'),
+    ).annotate(
+        total_orders=Count('order_id', distinct=True),
+        total_quantity=Sum('quantity'),
+        total_amount=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    ).order_by()
+
+
+def update_sales_rollups(full=False):
+    """Пересчет итогов за дни заказов, измененных после прошлого пересчета. Возвращает число пересчитанных дней"""
+
+    updated_to = timezone.now() - timedelta(seconds=settings.SALES_ROLLUP_LAG)
+    with transaction.atomic():
+        state, created = SalesRollupState.objects.select_for_update().get_or_create(
+            id=1, defaults={'updated_to': updated_to})
+
+        if full or created:
+            SalesRollup.objects.all().delete()
+            period = Q()
+            days = None
+        else:
+            days = set(Order.objects.filter(updated_at__gte=state.updated_to, updated_at__lt=updated_to).annotate(
+                day=TruncDate('created_at')).values_list('day', flat=True).distinct())
+            SalesRollup.objects.filter(day__in=days).delete()
+            period = reduce(or_, (created_range('order__', start, end) for start, end in day_ranges(days)),
+                            Q(pk__in=[]))
+
+        # заказ либо в оперативных таблицах, либо в архиве - итоги складываются.
+        # В архиве нет заказов новее границы архивации, для таких дней он не читается
+        sources = [rollup_rows(OrderItem.objects.filter(period))]
+        if days is None or (days and min(days) <= archive_horizon().date()):
+            sources.append(archived_rollup_rows(ArchivedOrderItem.objects.filter(period)))
+        totals = {}
+        for rows in sources:
+            for row in rows.iterator(chunk_size=BATCH_SIZE):
+                key = (row['rollup_day'], row['rollup_supplier_id'], row['rollup_category_id'],
+                       row['rollup_product_id'], row['rollup_state'])
+                total = totals.setdefault(key, [0, 0, 0])
+                total[0] += row['total_orders']
+                total[1] += row['total_quantity']
+                total[2] += row['total_amount']
+
+        SalesRollup.objects.bulk_create([
+            SalesRollup(day=day, supplier_id=supplier_id, category_id=category_id, product_id=product_id, state=state,
+                        orders=orders, quantity=quantity, amount=amount)
+            for (day, supplier_id, category_id, product_id, state), (orders, quantity, amount) in totals.items()
+        ], batch_size=BATCH_SIZE)
+        recomputed = {key[0] for key in totals}
+
+        state.updated_to = max(state.updated_to, updated_to)
+        state.save(update_fields=['updated_to'])
+    return len(recomputed if days is None else days)
+
+
+def sales_report(rollups, date_from, date_to, interval='day', top=10):
+    """Итоги за период по интервалам (day / week / month), по категориям и лучшие top продуктов по сумме"""
+
+    rollups = rollups.filter(day__gte=date_from, day__lte=date_to)
+    totals = {'total_quantity': Sum('quantity'), 'total_amount': Sum('amount')}
+
+    def row(values, **fields):
+        return {**fields, 'quantity': values['total_quantity'] or 0,
+                'amount': decimal_str(values['total_amount'] or 0)}
+
+    series = rollups.annotate(period=INTERVALS[interval]).values('period').annotate(**totals).order_by('period')
+    categories = rollups.values('category_id', 'category__name').annotate(**totals).order_by(
+        '-total_amount', 'category_id')
+    products = rollups.values('product_id', 'product__name').annotate(
+        total_orders=Sum('orders'), **totals).order_by('-total_amount', 'product_id')[:top]
+
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'interval': interval,
+        'totals': row(rollups.aggregate(**totals)),
+        'series': [row(values, period=values['period']) for values in series],
+        'categories': [row(values, id=values['category_id'], name=values['category__name'])
+                       for values in categories],
+        'top_products': [row(values, id=values['product_id'], name=values['product__name'],
+                             orders=values['total_orders']) for values in products],
+    }
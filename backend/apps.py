@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class BackendConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend'
+
+    def ready(self):
+        # обработчики сигналов, сбрасывающие кэш аутентификации по токену
+        import backend.authentication
+        # запись изменений товаров поставщиков в ленту изменений каталога
+        import backend.changes
+        # метрики задач Celery (сигналы публикации и выполнения задач)
+        import backend.metrics
@@ -0,0 +1,80 @@
+"""
+Архив заказов.
+
+Заказы в конечных статусах (доставлен, отменен), не менявшиеся дольше ORDER_ARCHIVE_AFTER_DAYS дней,
+переносятся порциями в ArchivedOrder / ArchivedOrderItem (с теми же id) и удаляются из Order / OrderItem,
+поэтому оперативные таблицы и запросы истории по ним остаются небольшими. Каждая порция переносится
+в своей транзакции. Запускается периодической задачей archive_orders_task или командой archive_orders.
+
+Заказ попадает в архив не раньше, чем через ORDER_ARCHIVE_AFTER_DAYS дней после создания, поэтому
+истории за период, начинающийся позже этой границы, архив не нужен (archive_needed). История без начала
+периода (вся история) читается вместе с архивом.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from backend.models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+ARCHIVE_STATES = ('delivered', 'canceled')
+
+
+def archive_horizon(now=None):
+    """Заказы, не менявшиеся с этого момента, переносятся в архив"""
+
+    return (now or timezone.now()) - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+
+
+def archive_needed(date_from):
+    """Могут ли быть в архиве заказы, созданные с date_from (без date_from - вся история, с архивом)"""
+
+    return date_from is None or timezone.make_aware(datetime.combine(date_from, time.min)) < archive_horizon()
+
+
+def created_range(prefix, date_from=None, date_to=None):
+    """Условие на дату создания заказа (поле prefix + created_at) по дням date_from - date_to включительно"""
+
+    query = Q()
+    if date_from:
+        query &= Q(**{f'{prefix}created_at__gte': timezone.make_aware(datetime.combine(date_from, time.min))})
+    if date_to:
+        query &= Q(**{f'{prefix}created_at__lt': timezone.make_aware(
+            datetime.combine(date_to + timedelta(days=1), time.min))})
+    return query
+
+
+def archive_orders(before=None, batch_size=None, limit=None):
+    """Перенос в архив заказов в конечных статусах, не менявшихся до before. Возвращает число заказов"""
+
+    before = before or archive_horizon()
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        with transaction.atomic():
+            orders = list(Order.objects.select_for_update(skip_locked=True).filter(
+                state__in=ARCHIVE_STATES, updated_at__lt=before).order_by('id').values_list(
+                'id', 'buyer_id', 'created_at', 'updated_at', 'state')[:size])
+            if not orders:
+                break
+            order_ids = [order[0] for order in orders]
+            ArchivedOrder.objects.bulk_create([
+                ArchivedOrder(id=order_id, buyer_id=buyer_id, created_at=created_at, updated_at=updated_at,
+                              state=state)
+                for order_id, buyer_id, created_at, updated_at, state in orders])
+            ArchivedOrderItem.objects.bulk_create([
+                ArchivedOrderItem(id=item_id, order_id=order_id, product_supplier_id=ps_id, supplier_id=supplier_id,
+                                  product_id=product_id, product_name=product_name, external_id=external_id,
+                                  quantity=quantity, price=price)
+                for item_id, order_id, ps_id, supplier_id, product_id, product_name, external_id, quantity, price
+                in OrderItem.objects.filter(order_id__in=order_ids).values_list(
+                    'id', 'order_id', 'product_supplier_id', 'product_supplier__supplier_id',
+                    'product_supplier__product_id', 'product_supplier__product__name',
+                    'product_supplier__external_id', 'quantity', 'product_supplier__price')])
+            OrderItem.objects.filter(order_id__in=order_ids).delete()
+            Order.objects.filter(id__in=order_ids).delete()
+        archived += len(orders)
+    return archived
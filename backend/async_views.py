@@ -0,0 +1,44 @@
+"""
+Представления DRF с async-обработчиками (DRF 3.14 вызывает обработчики синхронно).
+
+Под ASGI (uvicorn apiorders.asgi:application) async-обработчик не занимает поток, пока ждет БД или HTTP:
+запросы к БД - через async-методы QuerySet или sync_to_async, внешние HTTP-запросы - через httpx.AsyncClient.
+Аутентификация, проверка прав и лимитов (БД и кэш) и синхронные обработчики (post, delete...) выполняются
+через sync_to_async в потоке запроса. Под WSGI представление выполняется через async_to_sync.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework import views
+
+
+class AsyncAPIView(views.APIView):
+    """APIView, обработчики которого могут быть async def (в том числе вместе с обычными)"""
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from backend.models import CustomUser
+
+# Поля снимка пользователя, в порядке полей модели (так их ожидает Model.from_db).
+# Остальные поля модели при обращении догружаются из БД (как при .only())
+SNAPSHOT_FIELDS = ('id', 'is_superuser', 'email', 'is_active', 'type')
+
+
+class LocalTTLCache:
+    """Потокобезопасный LRU-кэш в памяти процесса с ограничением времени жизни записей"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalTTLCache(settings.TOKEN_AUTH_LOCAL_CACHE_SIZE, settings.TOKEN_AUTH_LOCAL_CACHE_TTL)
+
+
+def _cache_key(key):
+    return f'auth_token:{key}'
+
+
+def get_snapshot(key):
+    """Снимок пользователя по токену: сначала кэш процесса, затем общий кэш (Redis)"""
+
+    snapshot = local_cache.get(key)
+    if snapshot is None:
+        snapshot = caches[settings.TOKEN_AUTH_CACHE].get(_cache_key(key))
+        if snapshot is not None:
+            local_cache.set(key, snapshot)
+    return snapshot
+
+
+def set_snapshot(key, user):
+    snapshot = tuple(getattr(user, field) for field in SNAPSHOT_FIELDS)
+    caches[settings.TOKEN_AUTH_CACHE].set(_cache_key(key), snapshot, settings.TOKEN_AUTH_CACHE_TTL)
+    local_cache.set(key, snapshot)
+    return snapshot
+
+
+def invalidate_token(key):
+    local_cache.delete(key)
+    caches[settings.TOKEN_AUTH_CACHE].delete(_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    """Сброс кэша для всех токенов пользователя (до удаления токенов или после изменения пользователя)"""
+
+    keys = list(Token.objects.filter(user_id=user.pk).values_list('key', flat=True))
+    for key in keys:
+        local_cache.delete(key)
+    caches[settings.TOKEN_AUTH_CACHE].delete_many([_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без обращения к БД на каждый запрос.
+    Снимок пользователя (SNAPSHOT_FIELDS) хранится по ключу токена в двух уровнях: LRU-кэш процесса
+    с коротким TTL и общий кэш Django (Redis). request.user - экземпляр CustomUser только с полями снимка,
+    поэтому проверки IsBuyer/IsSupplier и связанные запросы (user.buyers) работают без загрузки пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        snapshot = get_snapshot(key)
+        if snapshot is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            snapshot = set_snapshot(key, token.user)
+
+        user = CustomUser.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, snapshot)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user, Token(key=key, user=user)
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, **kwargs):
+    """Изменение пользователя (тип, активность и т.д.) делает снимки его токенов неактуальными"""
+    if not created:
+        invalidate_user_tokens(instance)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
@@ -0,0 +1,267 @@
+"""
+Подсказки при вводе (autocomplete) по названиям продуктов и моделям товаров поставщиков.
+
+Индекс хранится в памяти процесса: отсортированный список пар (ключ, подсказка), где ключ - текст
+подсказки в нижнем регистре, начиная с каждого слова (поэтому "iph" находит и "Смартфон Apple iPhone",
+и "apple/iphone/xs-max"). Поиск по префиксу - двоичный поиск границ диапазона (bisect), из подсказок
+диапазона выбираются лучшие по наличию: сначала есть в наличии у доступных поставщиков, затем по остатку.
+Для коротких запросов (широкий диапазон) лучшие подсказки запоминаются до изменения подсказок с этим префиксом.
+
+Индекс строится один раз из БД, дальше обновляется инкрементально по ленте изменений каталога
+(backend/changes.py) с курсора, на котором он построен. Обновление запускается при следующем запросе
+подсказок, если изменилась метка версии каталога в кэше (ее меняют загрузка прайса и обновление
+остатков после коммита), и не реже раза в AUTOCOMPLETE_REFRESH_INTERVAL секунд - для остальных изменений.
+"""
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left, insort
+from heapq import nlargest
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from backend.changes import get_changes, get_last_cursor
+from backend.models import Product, ProductSupplier, Supplier
+
+# Ключ метки версии каталога в кэше AUTOCOMPLETE_CACHE
+VERSION_KEY = 'autocomplete:version'
+
+# Ключи длиннее обрезаются (экономия памяти), совпадение длинного запроса проверяется по полному тексту
+KEY_LENGTH = 48
+
+# Изменения ключей за одно обновление: до этого числа - вставка/удаление в список на месте,
+# больше - новый список одной сортировкой
+INSORT_LIMIT = 200
+
+# Лучшие подсказки для префиксов с большим диапазоном (короткие запросы) запоминаются до изменения
+# подсказок с этим префиксом
+WIDE_RANGE = 1000
+
+_words = re.compile(r'\w+')
+
+
+def catalog_changed():
+    """Новая метка версии каталога после коммита текущей транзакции"""
+
+    transaction.on_commit(
+        lambda: caches[settings.AUTOCOMPLETE_CACHE].set(VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def term_keys(text):
+    folded = text.casefold()
+    return {folded[match.start():match.start() + KEY_LENGTH] for match in _words.finditer(folded)}
+
+
+class AutocompleteIndex:
+    """Префиксный индекс подсказок. Читается без блокировки, обновляется одним потоком"""
+
+    def __init__(self):
+        self.entries = []           # [(ключ, подсказка)], подсказка - ('name' | 'model', текст)
+        self.terms = {}             # подсказка -> [товаров, товаров в наличии, остаток в наличии]
+        self.offers = {}            # id товара поставщика -> [product_id, supplier_id, модель, количество]
+        self.names = {}             # product_id -> название
+        self.suppliers = {}         # supplier_id -> доступен ли поставщик
+        self.supplier_offers = {}   # supplier_id -> id товаров поставщика
+        self.top = {}               # префикс широкого диапазона -> лучшие подсказки
+        self.pending = {}           # подсказка -> первое изменение за обновление ('add' | 'remove')
+        self.generation = 0
+        self.cursor = None
+        self.version = None
+        self.checked_at = 0
+        self._lock = threading.Lock()
+
+    def _offer_terms(self, offer):
+        product_id, _, model, _ = offer
+        if self.names.get(product_id):
+            yield 'name', self.names[product_id]
+        if model:
+            yield 'model', model
+
+    def _in_stock(self, offer):
+        return offer[3] > 0 and self.suppliers.get(offer[1], True)
+
+    def _touch(self, term):
+        # сброс запомненных подсказок для всех префиксов ключей подсказки
+        if self.top:
+            for key in term_keys(term[1]):
+                for length in range(1, len(key) + 1):
+                    self.top.pop(key[:length], None)
+
+    def _count_stock(self, offer, sign):
+        if self._in_stock(offer):
+            for term in self._offer_terms(offer):
+                self._touch(term)
+                stats = self.terms[term]
+                stats[1] += sign
+                stats[2] += sign * offer[3]
+
+    def _add_offer(self, offer_id, offer):
+        self.offers[offer_id] = offer
+        self.supplier_offers.setdefault(offer[1], set()).add(offer_id)
+        for term in self._offer_terms(offer):
+            stats = self.terms.get(term)
+            if stats is None:
+                stats = self.terms[term] = [0, 0, 0]
+                self._touch(term)
+                self.pending.setdefault(term, 'add')
+            stats[0] += 1
+        self._count_stock(offer, 1)
+
+    def _remove_offer(self, offer_id):
+        offer = self.offers.pop(offer_id, None)
+        if offer is None:
+            return None
+        self.supplier_offers[offer[1]].discard(offer_id)
+        self._count_stock(offer, -1)
+        for term in self._offer_terms(offer):
+            stats = self.terms[term]
+            stats[0] -= 1
+            if not stats[0]:
+                del self.terms[term]
+                self._touch(term)
+                self.pending.setdefault(term, 'remove')
+        return offer
+
+    def _merge(self):
+        """Перенос добавленных и удаленных за обновление подсказок в список ключей"""
+
+        added = [(key, term) for term, first in self.pending.items() if first == 'add' and term in self.terms
+                 for key in term_keys(term[1])]
+        removed = {term for term, first in self.pending.items() if first == 'remove' and term not in self.terms}
+        self.pending = {}
+        if len(added) + len(removed) <= INSORT_LIMIT:
+            for entry in added:
+                insort(self.entries, entry)
+            for term in removed:
+                for key in term_keys(term[1]):
+                    del self.entries[bisect_left(self.entries, (key, term))]
+            return
+        entries = [entry for entry in self.entries if entry[1] not in removed] if removed else self.entries[:]
+        entries.extend(added)
+        entries.sort()
+        self.entries = entries
+
+    def build(self):
+        """Полное построение из БД. Изменения, записанные во время чтения, применяются следующим refresh"""
+
+        cursor = get_last_cursor()
+        self.suppliers = dict(Supplier.objects.values_list('id', 'is_available'))
+        for offer_id, product_id, name, supplier_id, model, quantity in ProductSupplier.objects.values_list(
+                'id', 'product_id', 'product__name', 'supplier_id', 'model', 'quantity').iterator(
+                chunk_size=settings.EXPORT_CHUNK_SIZE):
+            self.names[product_id] = name
+            self._add_offer(offer_id, [product_id, supplier_id, model, quantity])
+        self._merge()
+        self.cursor = cursor
+
+    def refresh(self):
+        """Применение изменений каталога после курсора индекса"""
+
+        has_more = True
+        while has_more:
+            changes, self.cursor, has_more = get_changes(self.cursor, settings.CHANGES_FEED_LIMIT)
+            if not changes:
+                continue
+            # подсказки, посчитанные читающими потоками во время применения изменений, не запоминаются
+            self.generation += 1
+            new_products = {change['product_id'] for change in changes
+                            if 'product_id' in change and change['product_id'] not in self.names}
+            if new_products:
+                self.names.update(Product.objects.filter(id__in=new_products).values_list('id', 'name'))
+            for change in changes:
+                self.apply(change)
+            self._merge()
+            self.generation += 1
+
+    def apply(self, change):
+        if change['kind'] == 'availability':
+            offers = [self.offers[offer_id] for offer_id in self.supplier_offers.get(change['supplier_id'], ())]
+            # меняется наличие всех товаров поставщика - проще сбросить все запомненные подсказки
+            self.top.clear()
+            for offer in offers:
+                self._count_stock(offer, -1)
+            self.suppliers[change['supplier_id']] = change['is_available']
+            for offer in offers:
+                self._count_stock(offer, 1)
+            return
+
+        offer = self.offers.get(change['id'])
+        if offer is not None and change['kind'] == 'update' and change.get('model', offer[2]) == offer[2]:
+            # подсказки товара не меняются - пересчитывается только наличие, без вставок в список ключей
+            if 'quantity' in change:
+                self._count_stock(offer, -1)
+                offer[3] = change['quantity']
+                self._count_stock(offer, 1)
+            return
+
+        offer = self._remove_offer(change['id'])
+        if change['kind'] == 'retire':
+            return
+        if offer is None:
+            # update товара, которого нет в индексе, возможен только после его снятия - пропускается
+            if change['kind'] != 'insert':
+                return
+            offer = [change['product_id'], change['supplier_id'], '', 0]
+        offer = offer.copy()
+        if 'model' in change:
+            offer[2] = change['model']
+        if 'quantity' in change:
+            offer[3] = change['quantity']
+        self._add_offer(change['id'], offer)
+
+    def ensure_fresh(self):
+        """Построение или обновление индекса, если изменилась метка версии или прошел интервал проверки"""
+
+        version = caches[settings.AUTOCOMPLETE_CACHE].get(VERSION_KEY)
+        now = time.monotonic()
+        if self.cursor is not None and version == self.version and \
+                now - self.checked_at < settings.AUTOCOMPLETE_REFRESH_INTERVAL:
+            return
+        # пока один поток обновляет индекс, остальные отвечают по текущему состоянию (кроме первого построения)
+        if not self._lock.acquire(blocking=self.cursor is None):
+            return
+        try:
+            if self.cursor is None:
+                self.build()
+            self.refresh()
+            self.version = version
+            self.checked_at = now
+        finally:
+            self._lock.release()
+
+    def complete(self, query, limit):
+        """Лучшие limit подсказок, начинающихся с query (с начала любого слова)"""
+
+        folded = query.casefold()
+        key = folded[:KEY_LENGTH]
+        top = self.top.get(key)
+        if top is None:
+            generation = self.generation
+            start = bisect_left(self.entries, (key,))
+            end = bisect_left(self.entries, (key + '\U0010ffff',))
+            terms = dict.fromkeys(term for _, term in self.entries[start:end])
+            if len(folded) > KEY_LENGTH:
+                terms = [term for term in terms if folded in term[1].casefold()]
+
+            result = []
+            for term in terms:
+                stats = self.terms.get(term)
+                if stats:
+                    result.append((stats[1] > 0, stats[2], stats[1], term))
+            wide = end - start > WIDE_RANGE and len(folded) <= KEY_LENGTH
+            top = nlargest(settings.AUTOCOMPLETE_MAX_LIMIT if wide else limit, result, key=lambda item: item[:3])
+            if wide and generation == self.generation:
+                self.top[key] = top
+        return [{'text': text, 'kind': kind, 'offers': offers, 'quantity': quantity}
+                for _, quantity, offers, (kind, text) in top[:limit]]
+
+
+index = AutocompleteIndex()
+
+
+def complete(query, limit):
+    index.ensure_fresh()
+    return index.complete(query, limit)
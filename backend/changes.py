@@ -0,0 +1,123 @@
+"""
+Лента изменений каталога (ProductSupplierChange).
+
+Записываются добавление, изменение (цена, розничная цена, количество, модель, внешний id) и снятие
+товаров поставщиков, а также изменение доступности поставщика. Добавление, снятие и сохранение
+через save() записываются сигналами; загрузка прайса (do_import_task) обновляет товары через update()
+и записывает их изменения сама, одной вставкой.
+
+Номер изменения - автоинкремент. Чтобы клиент, прочитавший изменения до N, не пропустил изменение
+с меньшим номером из еще не завершенной транзакции, запись в ленту на PostgreSQL сериализуется
+транзакционной advisory-блокировкой: номера фиксируются в порядке коммитов.
+"""
+from django.db import connections, transaction, router
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from backend.fast_read import decimal_str
+from backend.models import ProductSupplier, ProductSupplierChange, Supplier
+
+# Поля товара поставщика, изменения которых попадают в ленту
+TRACKED_FIELDS = ('external_id', 'model', 'price', 'price_rrc', 'quantity')
+
+# Ключ advisory-блокировки ленты изменений
+CHANGES_LOCK_KEY = 7340034
+
+# Поля изменения в ответе ленты (пустые не выводятся)
+FEED_FIELDS = ('product_id',) + TRACKED_FIELDS + ('is_available',)
+
+
+def lock_changes(using=None):
+    """Блокировка записи в ленту до конца текущей транзакции (вызывается внутри transaction.atomic)"""
+
+    connection = connections[using or router.db_for_write(ProductSupplierChange)]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CHANGES_LOCK_KEY])
+
+
+def offer_change(kind, product_supplier, fields=TRACKED_FIELDS):
+    """Несохраненная запись изменения товара поставщика (значения - только полей fields)"""
+
+    change = ProductSupplierChange(kind=kind, product_supplier_id=product_supplier.pk,
+                                   supplier_id=product_supplier.supplier_id)
+    if kind == 'insert':
+        change.product_id = product_supplier.product_id
+    if kind != 'retire':
+        for field in fields:
+            setattr(change, field, getattr(product_supplier, field))
+    return change
+
+
+def record_changes(changes):
+    """Запись изменений в ленту одной вставкой"""
+
+    if not changes:
+        return
+    with transaction.atomic():
+        lock_changes()
+        ProductSupplierChange.objects.bulk_create(changes)
+
+
+@receiver(post_save, sender=ProductSupplier)
+def product_supplier_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_changes([offer_change('insert' if created else 'update', instance)])
+
+
+@receiver(post_delete, sender=ProductSupplier)
+def product_supplier_deleted(sender, instance, **kwargs):
+    record_changes([offer_change('retire', instance)])
+
+
+@receiver(pre_save, sender=Supplier)
+def supplier_pre_save(sender, instance, raw=False, **kwargs):
+    # прежняя доступность для сравнения в post_save
+    instance._was_available = None
+    if not raw and instance.pk:
+        instance._was_available = Supplier.objects.filter(pk=instance.pk).values_list(
+            'is_available', flat=True).first()
+
+
+@receiver(post_save, sender=Supplier)
+def supplier_saved(sender, instance, created, raw=False, **kwargs):
+    was_available = getattr(instance, '_was_available', None)
+    if not raw and not created and was_available is not None and was_available != instance.is_available:
+        record_changes([ProductSupplierChange(kind='availability', supplier_id=instance.pk,
+                                              is_available=instance.is_available)])
+
+
+def get_changes(since, limit):
+    """
+    Изменения с номером больше since (не более limit записей ленты), сжатые до последнего состояния
+    каждого товара (и доступности каждого поставщика). Возвращает (изменения, курсор, есть_еще)
+    """
+
+    rows = list(ProductSupplierChange.objects.filter(id__gt=since).order_by('id').values_list(
+        'id', 'kind', 'product_supplier_id', 'supplier_id', *FEED_FIELDS)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    compacted = {}
+    for change_id, kind, product_supplier_id, supplier_id, *values in rows:
+        key = ('supplier', supplier_id) if kind == 'availability' else ('offer', product_supplier_id)
+        change = {'seq': change_id, 'kind': kind}
+        if kind != 'availability':
+            change['id'] = product_supplier_id
+        change['supplier_id'] = supplier_id
+
+        previous = compacted.pop(key, None)
+        if previous and kind == 'update' and previous['kind'] in ('insert', 'update'):
+            # несколько изменений товара - одно, с последними значениями полей
+            change = {**previous, 'seq': change_id}
+        change.update((field, decimal_str(value) if field in ('price', 'price_rrc') else value)
+                      for field, value in zip(FEED_FIELDS, values) if value is not None)
+        compacted[key] = change
+
+    changes = sorted(compacted.values(), key=lambda change: change['seq'])
+    cursor = rows[-1][0] if rows else since
+    return changes, cursor, has_more
+
+
+def get_last_cursor():
+    return ProductSupplierChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
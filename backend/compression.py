@@ -0,0 +1,119 @@
+"""
+Сжатие ответов (CompressionMiddleware): gzip всегда, zstd (zstandard) и br (brotli) - если пакеты установлены.
+Алгоритм выбирается по Accept-Encoding клиента: наибольший q, при равном q - порядок COMPRESSION_ENCODINGS.
+Потоковые ответы сжимаются по частям: после каждой части - сброс буфера компрессора (sync flush),
+клиент получает строки выгрузки без ожидания конца ответа.
+"""
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # без zstandard - только gzip (и br при наличии brotli)
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # без brotli - только gzip (и zstd при наличии zstandard)
+    brotli = None
+
+# Типы содержимого, которые имеет смысл сжимать (начало Content-Type)
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/x-ndjson', 'application/vnd.oai.openapi', 'application/javascript',
+    'application/xml', 'text/',
+)
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 - заголовок gzip
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+COMPRESSORS = {'gzip': GzipCompressor}
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdCompressor
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+
+
+def is_compressible(content_type):
+    return content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding, preferred):
+    """
+    Алгоритм из preferred (доступные, в порядке предпочтения сервера) по заголовку Accept-Encoding или None.
+    q=0 - отказ от алгоритма, '*' - любой не указанный явно
+    """
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, *params = item.strip().lower().split(';')
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in preferred:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding, level):
+    compressor = COMPRESSORS[encoding](level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(chunks, encoding, level):
+    """Сжатие частей потокового ответа, каждая часть отдается сразу (sync flush)"""
+
+    compressor = COMPRESSORS[encoding](level)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Модели аутентификации всегда читаются из основной БД: только что выданный токен может еще не дойти до реплики
+PRIMARY_ONLY_MODELS = {'authtoken.token', 'backend.customuser'}
+
+# Разрешено ли читать с реплики в текущем запросе (устанавливает ReplicaRoutingMiddleware)
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def use_replica():
+    """Чтение с реплики внутри блока (для задач и команд, которым не нужны только что записанные данные)"""
+    token = replica_reads.set(True)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Чтение с реплики (settings.REPLICA_DATABASE) только там, где это явно разрешено:
+    в GET-запросах каталога и истории заказов без "липкого" окна после записи (см. ReplicaRoutingMiddleware)
+    или в блоке use_replica(). Все остальные чтения и все записи идут в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.REPLICA_DATABASE and replica_reads.get() and model._meta.label_lower not in PRIMARY_ONLY_MODELS:
+            return settings.REPLICA_DATABASE
+        # явно, иначе объекты, прочитанные с реплики, читали бы связанные объекты тоже с нее
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплика - копия основной БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != settings.REPLICA_DATABASE
@@ -0,0 +1,132 @@
+"""
+Потоковая выгрузка каталога и истории заказов (NDJSON / CSV).
+
+Строки читаются через .iterator(chunk_size) - на PostgreSQL это серверный курсор (кроме режима
+DB_CONN_MODE=pooled, где серверные курсоры отключены), поэтому память не зависит от числа строк.
+Параметры товаров подмешиваются слиянием двух курсоров, упорядоченных по id товара поставщика.
+"""
+import csv
+import heapq
+from itertools import groupby
+
+from django.conf import settings
+
+from backend.fast_read import decimal_str
+from backend.models import ProductSupplierParameter
+from backend.renderers import dumps
+
+CATALOG_FIELDS = ('id', 'product_id', 'product_name', 'category_id', 'category', 'supplier_id', 'external_id',
+                  'model', 'quantity', 'price', 'price_rrc', 'parameters')
+
+ORDER_ITEM_FIELDS = ('order_id', 'buyer_id', 'state', 'created_at', 'updated_at', 'id', 'product_supplier_id',
+                     'external_id', 'product_name', 'supplier_id', 'quantity', 'price', 'sum')
+
+# размер порции, отдаваемой серверу (байт)
+BUFFER_SIZE = 64 * 1024
+
+
+def catalog_rows(queryset, chunk_size=None):
+    """Товары поставщиков по одному словарю на строку, с параметрами"""
+
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    parameters = groupby(ProductSupplierParameter.objects.filter(
+        product_supplier__in=queryset.values('id')
+    ).order_by('product_supplier_id', 'id').values_list(
+        'product_supplier_id', 'parameter__name', 'value'
+    ).iterator(chunk_size=chunk_size), key=lambda row: row[0])
+    current_id, current = next(parameters, (None, ()))
+
+    for ps_id, product_id, product_name, category_id, category_name, supplier_id, external_id, model, quantity, \
+            price, price_rrc in queryset.order_by('id').values_list(
+            'id', 'product_id', 'product__name', 'product__category_id', 'product__category__name', 'supplier_id',
+            'external_id', 'model', 'quantity', 'price', 'price_rrc').iterator(chunk_size=chunk_size):
+        # параметры товаров, не попавших в выборку основного курсора, пропускаются
+        while current_id is not None and current_id < ps_id:
+            current_id, current = next(parameters, (None, ()))
+        row_parameters = []
+        if current_id == ps_id:
+            row_parameters = [f'{name}: {value}' for _, name, value in current]
+            current_id, current = next(parameters, (None, ()))
+        yield {
+            'id': ps_id,
+            'product_id': product_id,
+            'product_name': product_name,
+            'category_id': category_id,
+            'category': category_name,
+            'supplier_id': supplier_id,
+            'external_id': external_id,
+            'model': model,
+            'quantity': quantity,
+            'price': decimal_str(price),
+            'price_rrc': decimal_str(price_rrc),
+            'parameters': row_parameters,
+        }
+
+
+ITEM_VALUES = ('order_id', 'order__buyer_id', 'order__state', 'order__created_at', 'order__updated_at', 'id',
+               'product_supplier_id', 'product_supplier__external_id', 'product_supplier__product__name',
+               'product_supplier__supplier_id', 'quantity', 'product_supplier__price')
+ARCHIVED_ITEM_VALUES = ('order_id', 'order__buyer_id', 'order__state', 'order__created_at', 'order__updated_at', 'id',
+                        'product_supplier_id', 'external_id', 'product_name', 'supplier_id', 'quantity', 'price')
+
+
+def order_item_rows(queryset, archived=None, chunk_size=None):
+    """
+    Позиции заказов (по одной строке на позицию) в порядке создания заказов. archived - позиции архивных
+    заказов (ArchivedOrderItem), сливаются с оперативными по мере чтения обоих курсоров
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    ordering = ('order__created_at', 'order_id', 'id')
+    values = queryset.order_by(*ordering).values_list(*ITEM_VALUES).iterator(chunk_size=chunk_size)
+    if archived is not None:
+        values = heapq.merge(values, archived.order_by(*ordering).values_list(*ARCHIVED_ITEM_VALUES).iterator(
+            chunk_size=chunk_size), key=lambda row: (row[3], row[0], row[5]))
+
+    for row_values in values:
+        row = dict(zip(ORDER_ITEM_FIELDS, row_values))
+        row['created_at'] = row['created_at'].isoformat()
+        row['updated_at'] = row['updated_at'].isoformat()
+        row['sum'] = decimal_str(row['price'] * row['quantity'])
+        row['price'] = decimal_str(row['price'])
+        yield row
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield dumps(row) + b'\n'
+
+
+class _Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields).encode()
+    for row in rows:
+        yield writer.writerow(
+            ['; '.join(value) if isinstance(value, list) else value for value in (row[f] for f in fields)]
+        ).encode()
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Склейка строк в порции до size байт. Первая строка (заголовок CSV или первая запись) отдается сразу"""
+
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    yield first
+
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
@@ -0,0 +1,186 @@
+"""
+Быстрое чтение для списков каталога и заказов.
+
+Строки собираются из .values_list() в обычные словари, минуя поля сериализаторов DRF.
+Результат совпадает с выводом соответствующих сериализаторов (ProductSupplierSerializer,
+BasketGetSerializer, BuyerOrderGetSerializer, SupplierOrdertGetSerializer) - см. tests/backend/test_fast_read.py.
+Число запросов не зависит от объема данных.
+"""
+from decimal import Decimal
+
+from backend.archive import created_range
+from backend.models import ProductSupplierParameter, Order, OrderItem, Buyer, Supplier, ArchivedOrder, \
+    ArchivedOrderItem
+
+CENTS = Decimal('0.01')
+
+
+def decimal_str(value):
+    """Как DecimalField(decimal_places=2) DRF при COERCE_DECIMAL_TO_STRING=True"""
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return '{:f}'.format(value.quantize(CENTS))
+
+
+def product_supplier_rows(queryset):
+    """Товары поставщиков (формат ProductSupplierSerializer). 2 запроса"""
+
+    parameters = {}
+    for product_supplier_id, name, value in ProductSupplierParameter.objects.filter(
+            product_supplier__in=queryset.values('id')
+    ).order_by('id').values_list('product_supplier_id', 'parameter__name', 'value'):
+        parameters.setdefault(product_supplier_id, []).append(f'{name}: {value}')
+
+    return [{
+        'product': {'id': product_id, 'name': product_name, 'category': f'{category_id}.{category_name}'},
+        'model': model,
+        'supplier': supplier_id,
+        'quantity': quantity,
+        'price': decimal_str(price),
+        'p_parameters': parameters.get(ps_id, []),
+    } for ps_id, product_id, product_name, category_id, category_name, model, supplier_id, quantity, price
+        in queryset.values_list('id', 'product_id', 'product__name', 'product__category_id',
+                                'product__category__name', 'model', 'supplier_id', 'quantity', 'price')]
+
+
+ITEM_FIELDS = ('order_id', 'id', 'product_supplier_id', 'product_supplier__product__name',
+               'product_supplier__external_id', 'quantity', 'product_supplier__price')
+ARCHIVED_ITEM_FIELDS = ('order_id', 'id', 'product_supplier_id', 'product_name', 'external_id', 'quantity', 'price')
+
+
+def _order_items(queryset, fields=ITEM_FIELDS, items=None):
+    """Позиции заказов по order_id (с суммами), добавляются в items. 1 запрос"""
+
+    items = {} if items is None else items
+    for order_id, item_id, ps_id, product_name, external_id, quantity, price in queryset.order_by(
+            'id').values_list(*fields):
+        items.setdefault(order_id, []).append({
+            'id': item_id,
+            'product_supplier_id': ps_id,
+            'product_name': product_name,
+            'external_id': external_id,
+            'quantity': quantity,
+            'sum': price * quantity,
+        })
+    return items
+
+
+def _order_data(items, fields):
+    """Заказ: сумма и позиции (только поля fields, как у OrderItemGetSerializer)"""
+
+    order_sum = sum((item['sum'] for item in items), Decimal(0))
+    order_items = [{field: decimal_str(item[field]) if field == 'sum' else item[field] for field in fields}
+                   for item in items]
+    return order_sum, order_items
+
+
+def basket_rows(user):
+    """Корзины покупателей пользователя (формат BasketGetSerializer). 2 запроса"""
+
+    items = _order_items(OrderItem.objects.filter(order__buyer__user=user, order__state='basket'))
+    data = []
+    for order_id, buyer_id in Order.objects.filter(buyer__user=user, state='basket').values_list('id', 'buyer_id'):
+        order_sum, order_items = _order_data(
+            items.get(order_id, []), ('id', 'product_supplier_id', 'product_name', 'quantity', 'sum'))
+        data.append({
+            'buyer_id': buyer_id,
+            'order_id': order_id,
+            'order_sum': decimal_str(order_sum),
+            'order_items': order_items,
+        })
+    return data
+
+
+def buyer_order_rows(user, date_from=None, date_to=None, archive=False):
+    """
+    Заказы покупателей пользователя (формат BuyerOrderGetSerializer), созданные с date_from по date_to.
+    3 запроса, с архивом (archive=True) - 5
+    """
+
+    items = _order_items(OrderItem.objects.filter(
+        created_range('order__', date_from, date_to), order__buyer__user=user).exclude(order__state='basket'))
+    order_rows = list(Order.objects.filter(created_range('', date_from, date_to), buyer__user=user).exclude(
+        state='basket').values_list('id', 'buyer_id', 'state', 'created_at'))
+    if archive:
+        _order_items(ArchivedOrderItem.objects.filter(created_range('order__', date_from, date_to),
+                                                      order__buyer__user=user), ARCHIVED_ITEM_FIELDS, items)
+        order_rows += ArchivedOrder.objects.filter(created_range('', date_from, date_to), buyer__user=user).values_list(
+            'id', 'buyer_id', 'state', 'created_at')
+        order_rows.sort(key=lambda row: row[3])
+
+    orders = {}
+    for order_id, buyer_id, state, _ in order_rows:
+        order_sum, order_items = _order_data(
+            items.get(order_id, []), ('id', 'product_supplier_id', 'product_name', 'quantity', 'sum'))
+        orders.setdefault(buyer_id, []).append((order_sum, {
+            'id': order_id,
+            'state': state,
+            'order_sum': decimal_str(order_sum),
+            'order_items': order_items,
+        }))
+
+    data = []
+    for buyer_id in Buyer.objects.filter(user=user).values_list('id', flat=True):
+        buyer_orders = orders.get(buyer_id, [])
+        data.append({
+            'buyer_id': buyer_id,
+            'buyer_sum': decimal_str(sum((order_sum for order_sum, _ in buyer_orders), Decimal(0))),
+            'orders': [order for _, order in buyer_orders],
+        })
+    return data
+
+
+def supplier_order_rows(user, date_from=None, date_to=None, archive=False):
+    """
+    Заказанные позиции по товарам поставщиков пользователя (формат SupplierOrdertGetSerializer) в заказах,
+    созданных с date_from по date_to. 2 запроса, с архивом (archive=True) - 3.
+    В заказ поставщика попадают только его позиции.
+    """
+
+    rows = list(OrderItem.objects.filter(
+        created_range('order__', date_from, date_to), product_supplier__supplier__user=user).exclude(
+        order__state='basket').order_by('order__created_at', 'order_id', 'id').values_list(
+        'order__created_at', 'product_supplier__supplier_id', 'order_id', 'order__buyer_id', 'order__state',
+        'product_supplier_id', 'product_supplier__product__name', 'product_supplier__external_id', 'quantity',
+        'product_supplier__price'))
+    if archive:
+        rows += ArchivedOrderItem.objects.filter(
+            created_range('order__', date_from, date_to), supplier__user=user).order_by(
+            'order__created_at', 'order_id', 'id').values_list(
+            'order__created_at', 'supplier_id', 'order_id', 'order__buyer_id', 'order__state', 'product_supplier_id',
+            'product_name', 'external_id', 'quantity', 'price')
+        rows.sort(key=lambda row: (row[0], row[2]))
+
+    orders = {}
+    for _, supplier_id, order_id, buyer_id, state, ps_id, product_name, external_id, quantity, price in rows:
+        order = orders.setdefault(supplier_id, {}).setdefault(
+            order_id, {'id': order_id, 'buyer_id': buyer_id, 'state': state, 'items': []})
+        order['items'].append({
+            'product_supplier_id': ps_id,
+            'product_name': product_name,
+            'external_id': external_id,
+            'quantity': quantity,
+            'sum': price * quantity,
+        })
+
+    data = []
+    for supplier_id in Supplier.objects.filter(user=user).values_list('id', flat=True):
+        supplier_orders = []
+        supplier_sum = Decimal(0)
+        for order in orders.get(supplier_id, {}).values():
+            order_sum, order_items = _order_data(
+                order['items'], ('product_supplier_id', 'product_name', 'external_id', 'quantity', 'sum'))
+            supplier_orders.append({
+                'id': order['id'],
+                'buyer_id': order['buyer_id'],
+                'state': order['state'],
+                'order_sum': decimal_str(order_sum),
+                'order_items': order_items,
+            })
+            supplier_sum += order_sum
+        data.append({
+            'supplier_id': supplier_id,
+            'supplier_sum': decimal_str(supplier_sum),
+            'orders': supplier_orders,
+        })
+    return data
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from backend.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Перенос в архив заказов в конечных статусах (доставлен, отменен), не менявшихся дольше заданного срока'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+                            help='Заказы, не менявшиеся дольше этого числа дней (не меньше ORDER_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=settings.ORDER_ARCHIVE_BATCH_SIZE,
+                            help='Заказов в одной транзакции')
+        parser.add_argument('--limit', type=int, default=None, help='Не больше этого числа заказов за запуск')
+
+    def handle(self, *args, days, batch_size, limit, **options):
+        # история за период после границы ORDER_ARCHIVE_AFTER_DAYS архив не читает (archive_needed)
+        if days < settings.ORDER_ARCHIVE_AFTER_DAYS:
+            raise CommandError(f'--days не может быть меньше ORDER_ARCHIVE_AFTER_DAYS '
+                               f'({settings.ORDER_ARCHIVE_AFTER_DAYS}): такие заказы пропадут из истории')
+        archived = archive_orders(before=timezone.now() - timedelta(days=days), batch_size=batch_size, limit=limit)
+        self.stdout.write(f'Перенесено в архив заказов: {archived}')
@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apiorders.schema import build_schema, schema_file_path
+
+
+class Command(BaseCommand):
+    help = 'Сборка схемы OpenAPI в файлы OPENAPI_SCHEMA_DIR (YAML и JSON) для отдачи без генерации на запрос'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Не записывать, код выхода 1, если собранная схема отличается от кода')
+
+    def handle(self, *args, check, **options):
+        changed = []
+        for schema_format, content in build_schema().items():
+            path = schema_file_path(schema_format)
+            try:
+                with open(path, 'rb') as file:
+                    if file.read() == content:
+                        continue
+            except FileNotFoundError:
+                pass
+            changed.append(path)
+            if not check:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(f'{path}.tmp', 'wb') as file:
+                    file.write(content)
+                os.replace(f'{path}.tmp', path)
+
+        if check and changed:
+            raise CommandError(f'Схема устарела: {", ".join(changed)}')
+        self.stdout.write(f'Схема OpenAPI: {"обновлено" if changed else "без изменений"} {len(changed)} файл(ов)')
@@ -0,0 +1,406 @@
+"""
+Синтетические данные для нагрузочных тестов и бенчмарков: пользователи, поставщики, категории, продукты,
+товары поставщиков с параметрами, покупатели, корзины и заказы.
+
+Распределения неравномерные, как в реальном магазине: у крупных поставщиков больше товаров, популярные
+товары заказывают чаще (закон Ципфа), активные покупатели заказывают больше, недавних заказов больше,
+статус зависит от возраста заказа, часть товаров - не в наличии. Строки пишутся напрямую в таблицы
+(на PostgreSQL - COPY, иначе - executemany) порциями по --batch-size с явными id, затем сдвигаются
+последовательности. Сигналы не вызываются: товары не попадают в ленту изменений каталога, индекс подсказок
+строится при запуске процесса, итоги продаж - командой с --rollups или периодической задачей (полный пересчет).
+
+--price-lists N - прайсы N крупнейших поставщиков в формате data/s_test.yaml (совпадают с их товарами в БД,
+загрузка такого прайса - обновление на месте) для бенчмарков загрузки.
+
+    python manage.py generate_dataset --scale 0.01
+    python manage.py generate_dataset --products 1000000 --offers 3000000 --orders 2000000 --price-lists 3
+"""
+import io
+import math
+import random
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+from pathlib import Path
+
+import yaml
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from backend.analytics import update_sales_rollups
+from backend.autocomplete import catalog_changed
+from backend.models import CustomUser, Supplier, ProductCategory, Product, ProductSupplier, Parameter, \
+    ProductSupplierParameter, Buyer, Order, OrderItem
+
+KINDS = ('Смартфон', 'Ноутбук', 'Планшет', 'Телевизор', 'Наушники', 'Монитор', 'Фотоаппарат', 'Холодильник',
+         'Пылесос', 'Роутер', 'Принтер', 'Колонка', 'Часы', 'Жесткий диск', 'Flash-накопитель', 'Видеокарта')
+BRANDS = ('Apple', 'Samsung', 'Xiaomi', 'Huawei', 'Sony', 'LG', 'Lenovo', 'Asus', 'Acer', 'HP', 'Dell', 'Philips',
+          'Bosch', 'Canon', 'Nikon', 'TP-Link', 'JBL', 'Kingston', 'Seagate', 'MSI')
+COLORS = ('черный', 'белый', 'серебристый', 'золотистый', 'синий', 'красный', 'зеленый', 'серый')
+PARAMETERS = {
+    'Диагональ (дюйм)': lambda rng: f'{rng.choice((5.5, 6.1, 6.5, 10.1, 13.3, 15.6, 27, 55, 65))}',
+    'Разрешение (пикс)': lambda rng: rng.choice(('1920x1080', '2560x1440', '2688x1242', '3840x2160')),
+    'Встроенная память (Гб)': lambda rng: str(rng.choice((32, 64, 128, 256, 512, 1024))),
+    'Оперативная память (Гб)': lambda rng: str(rng.choice((2, 4, 8, 16, 32))),
+    'Цвет': lambda rng: rng.choice(COLORS),
+    'Вес (г)': lambda rng: str(rng.randint(50, 30000)),
+    'Гарантия (мес)': lambda rng: str(rng.choice((6, 12, 24, 36))),
+    'Страна производства': lambda rng: rng.choice(('Китай', 'Вьетнам', 'Корея', 'Тайвань', 'Россия')),
+}
+REGIONS = ('Московская', 'Ленинградская', 'Пермский', 'Свердловская', 'Новосибирская', 'Татарстан', 'Краснодарский')
+
+# Доли конечных статусов старых заказов; статусы недавних заказов - по возрасту (дни)
+CANCELED_SHARE = 0.12
+RECENT_STATES = ((1, ('new', 'confirmed')), (3, ('confirmed', 'assembled', 'sent')), (10, ('sent', 'delivered')))
+
+
+def zipf_weights(count, exponent=1.1):
+    """Накопленные веса для random.choices: элемент с рангом r выбирается с вероятностью ~ 1 / r^exponent"""
+
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def geometric(rng, mean):
+    """Целое >= 0 с геометрическим распределением и средним mean"""
+
+    if mean <= 0:
+        return 0
+    return int(math.log(1 - rng.random()) / math.log(mean / (mean + 1)))
+
+
+class TableWriter:
+    """Запись строк в таблицы моделей порциями: COPY на PostgreSQL, executemany на остальных БД"""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        self.copy = self.connection.vendor == 'postgresql'
+
+    @staticmethod
+    def _text(value):
+        if value is None:
+            return r'\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+    def write(self, model, columns, rows):
+        """rows - итерируемые кортежи значений columns (имена колонок). Возвращает число строк"""
+
+        ops = self.connection.ops
+        table = ops.quote_name(model._meta.db_table)
+        fields = {field.column: field for field in model._meta.local_concrete_fields}
+        quoted = ', '.join(ops.quote_name(column) for column in columns)
+        # даты со временем драйвер SQLite не передает в формате Django
+        prepare = [] if self.copy else [index for index, column in enumerate(columns)
+                                        if fields[column].get_internal_type() == 'DateTimeField']
+        batch = []
+        written = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(table, quoted, columns, batch, prepare)
+                written += len(batch)
+                batch = []
+        if batch:
+            self._flush(table, quoted, columns, batch, prepare)
+        return written + len(batch)
+
+    def _flush(self, table, quoted, columns, batch, prepare):
+        with self.connection.cursor() as cursor:
+            if self.copy:
+                buffer = io.StringIO()
+                for row in batch:
+                    buffer.write('\t'.join(self._text(value) for value in row))
+                    buffer.write('\n')
+                buffer.seek(0)
+                cursor.copy_expert(f'COPY {table} ({quoted}) FROM STDIN', buffer)
+            else:
+                if prepare:
+                    adapt = self.connection.ops.adapt_datetimefield_value
+                    batch = [list(row) for row in batch]
+                    for row in batch:
+                        for index in prepare:
+                            row[index] = adapt(row[index])
+                placeholders = ', '.join(['%s'] * len(columns))
+                cursor.executemany(f'INSERT INTO {table} ({quoted}) VALUES ({placeholders})', batch)
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = 'Генерация синтетических данных (пользователи, каталог, покупатели, заказы) и прайсов для бенчмарков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='множитель всех объемов')
+        parser.add_argument('--suppliers', type=int, default=100)
+        parser.add_argument('--categories', type=int, default=200)
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--offers', type=int, default=300000, help='товаров поставщиков')
+        parser.add_argument('--offer-parameters', type=int, default=4, help='параметров у товара поставщика')
+        parser.add_argument('--buyer-users', type=int, default=20000, help='пользователей-покупателей')
+        parser.add_argument('--orders', type=int, default=200000, help='размещенных заказов')
+        parser.add_argument('--items-per-order', type=float, default=3.0, help='среднее позиций в заказе')
+        parser.add_argument('--basket-share', type=float, default=0.3, help='доля покупателей с корзиной')
+        parser.add_argument('--days', type=int, default=730, help='период заказов, дней до текущей даты')
+        parser.add_argument('--password', default='Bench-12345', help='пароль всех пользователей')
+        parser.add_argument('--price-lists', type=int, default=0, help='прайсы N крупнейших поставщиков в YAML')
+        parser.add_argument('--price-list-dir', default=str(Path(settings.BASE_DIR) / 'data' / 'generated'))
+        parser.add_argument('--rollups', action='store_true', help='полный пересчет итогов продаж после генерации')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        counts = {name: max(1, round(options[name] * scale)) for name in (
+            'suppliers', 'categories', 'products', 'offers', 'buyer_users', 'orders')}
+        # у каждого продукта есть хотя бы один товар поставщика (продукты создаются загрузкой прайсов)
+        counts['offers'] = max(counts['products'], min(counts['offers'], counts['products'] * counts['suppliers']))
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.writer = TableWriter(options['batch_size'])
+        self.written = {}
+        self.now = timezone.now()
+
+        started = self.now
+        with transaction.atomic():
+            supplier_ids = self.suppliers(counts['suppliers'])
+            category_ids = self.categories(counts['categories'], supplier_ids)
+            products = self.products(counts['products'], category_ids)
+            offers = self.offers(counts['offers'], products, supplier_ids)
+            buyer_ids = self.buyers(counts['buyer_users'])
+            self.orders(counts['orders'], buyer_ids, offers)
+            self.reset_sequences()
+            catalog_changed()
+        if options['price_lists']:
+            self.price_lists(options['price_lists'], supplier_ids, offers)
+        if options['rollups']:
+            update_sales_rollups(full=True)
+
+        elapsed = (timezone.now() - started).total_seconds()
+        for model, rows in self.written.items():
+            self.stdout.write(f'{model._meta.db_table}: {rows}')
+        self.stdout.write(f'Готово за {elapsed:.1f} с')
+
+    def write(self, model, columns, rows):
+        self.written[model] = self.written.get(model, 0) + self.writer.write(model, columns, rows)
+
+    def suppliers(self, count):
+        """id поставщиков, крупные (больше товаров) - первыми"""
+
+        rng = self.rng
+        first_user = next_id(CustomUser)
+        self.write_users(first_user, count, 'supplier')
+        first = next_id(Supplier)
+        self.write(Supplier, ('id', 'user_id', 'name', 'person', 'phone', 'file_url', 'file_etag',
+                              'file_last_modified', 'file_hash', 'is_available'), (
+            (first + i, first_user + i, f'{rng.choice(BRANDS)} Store {first + i}', f'Менеджер {i}',
+             f'+7999{first + i:07d}', None, '', '', '', rng.random() > 0.05) for i in range(count)))
+        return list(range(first, first + count))
+
+    def write_users(self, first, count, user_type):
+        password = make_password(self.options['password'])
+        self.write(CustomUser, ('id', 'password', 'last_login', 'is_superuser', 'first_name', 'last_name',
+                                'is_staff', 'is_active', 'date_joined', 'email', 'company', 'position', 'type'), (
+            (first + i, password, None, False, 'Имя', f'Фамилия {first + i}', False, True, self.now,
+             f'{user_type}-{first + i}@bench.test', '', '', user_type) for i in range(count)))
+
+    def categories(self, count, supplier_ids):
+        first = next_id(ProductCategory)
+        self.write(ProductCategory, ('id', 'name'), (
+            (first + i, KINDS[i % len(KINDS)] + ('ы' if i < len(KINDS) else f'ы {i // len(KINDS) + 1}'))
+            for i in range(count)))
+        category_ids = list(range(first, first + count))
+        through = ProductCategory.suppliers.through
+        self.write(through, ('productcategory_id', 'supplier_id'), (
+            (category_id, supplier_id) for category_id in category_ids
+            for supplier_id in self.rng.sample(supplier_ids, min(len(supplier_ids), self.rng.randint(1, 5)))))
+        return category_ids
+
+    def products(self, count, category_ids):
+        """[(id, название, категория, модель, базовая цена)]"""
+
+        rng = self.rng
+        weights = zipf_weights(len(category_ids), 0.8)
+        first = next_id(Product)
+        products = []
+        for i in range(count):
+            category_id = rng.choices(category_ids, cum_weights=weights)[0]
+            kind = KINDS[(category_id - category_ids[0]) % len(KINDS)]
+            brand = rng.choice(BRANDS)
+            series = f'{rng.choice("ABCGMNPSXZ")}{rng.randint(1, 99)}'
+            memory = rng.choice((32, 64, 128, 256, 512))
+            name = f'{kind} {brand} {series} {memory}GB ({rng.choice(COLORS)}) #{first + i}'
+            model = f'{brand}/{series}-{first + i}'.lower()
+            products.append((first + i, name, category_id, model, round(rng.lognormvariate(9.5, 1.0), -1)))
+        self.write(Product, ('id', 'name', 'category_id'), ((pid, name, cid) for pid, name, cid, _, _ in products))
+        return products
+
+    def offers(self, count, products, supplier_ids):
+        """[(id, supplier_id, продукт, external_id, модель, цена, розничная цена, количество)]"""
+
+        rng = self.rng
+        supplier_weights = zipf_weights(len(supplier_ids), 0.9)
+        per_product = count / len(products)
+        first = next_id(ProductSupplier)
+        offers = []
+        external_ids = {}
+        for index, product in enumerate(products):
+            # число поставщиков продукта - геометрическое, но на оставшиеся продукты - хотя бы по одному
+            wanted = min(1 + geometric(rng, per_product - 1), len(supplier_ids),
+                         count - len(offers) - (len(products) - index - 1))
+            chosen = set()
+            for _ in range(wanted * 5):
+                if len(chosen) >= wanted:
+                    break
+                chosen.add(rng.choices(supplier_ids, cum_weights=supplier_weights)[0])
+            if len(chosen) < wanted:
+                chosen.update(rng.sample([s for s in supplier_ids if s not in chosen], wanted - len(chosen)))
+            for supplier_id in chosen:
+                external_id = external_ids[supplier_id] = external_ids.get(supplier_id, 1000000) + rng.randint(1, 9)
+                price = Decimal(str(round(product[4] * rng.uniform(0.85, 1.15), 2))).quantize(Decimal('0.01'))
+                price_rrc = (price * Decimal(str(round(rng.uniform(1.05, 1.25), 2)))).quantize(Decimal('0.01'))
+                quantity = 0 if rng.random() < 0.15 else min(10000, int(rng.lognormvariate(2.5, 1.0)))
+                offers.append((first + len(offers), supplier_id, product, external_id, product[3], price, price_rrc,
+                               quantity))
+
+        self.write(ProductSupplier, ('id', 'product_id', 'supplier_id', 'external_id', 'model', 'price',
+                                     'price_rrc', 'quantity'), (
+            (offer_id, product[0], supplier_id, external_id, model, price, price_rrc, quantity)
+            for offer_id, supplier_id, product, external_id, model, price, price_rrc, quantity in offers))
+
+        first_parameter = next_id(Parameter)
+        existing = dict(Parameter.objects.filter(name__in=PARAMETERS).values_list('name', 'id'))
+        new = [name for name in PARAMETERS if name not in existing]
+        self.write(Parameter, ('id', 'name'), ((first_parameter + i, name) for i, name in enumerate(new)))
+        parameter_ids = {**existing, **{name: first_parameter + i for i, name in enumerate(new)}}
+        per_offer = min(self.options['offer_parameters'], len(PARAMETERS))
+        first = next_id(ProductSupplierParameter)
+        self.offer_parameters = {}
+
+        def parameter_rows():
+            row_id = first
+            for offer in offers:
+                values = {name: PARAMETERS[name](rng) for name in rng.sample(list(PARAMETERS), per_offer)}
+                self.offer_parameters[offer[0]] = values
+                for name, value in values.items():
+                    yield row_id, offer[0], parameter_ids[name], value
+                    row_id += 1
+
+        self.write(ProductSupplierParameter, ('id', 'product_supplier_id', 'parameter_id', 'value'),
+                   parameter_rows())
+        return offers
+
+    def buyers(self, count):
+        rng = self.rng
+        first_user = next_id(CustomUser)
+        self.write_users(first_user, count, 'buyer')
+        first = next_id(Buyer)
+        buyers = []
+        for i in range(count):
+            for _ in range(1 + geometric(rng, 0.3)):
+                buyers.append((first + len(buyers), first_user + i))
+        self.write(Buyer, ('id', 'user_id', 'name', 'person', 'phone', 'region', 'district', 'locality_name',
+                           'street', 'house', 'structure', 'building', 'apartment'), (
+            (buyer_id, user_id, f'Магазин {buyer_id}', f'Покупатель {user_id}', f'+7900{buyer_id:07d}',
+             rng.choice(REGIONS), '', f'Город {rng.randint(1, 500)}', 'Ленина', str(rng.randint(1, 200)), '', '',
+             str(rng.randint(1, 300))) for buyer_id, user_id in buyers))
+        return [buyer_id for buyer_id, _ in buyers]
+
+    def order_state(self, age_days):
+        for limit, states in RECENT_STATES:
+            if age_days < limit:
+                return self.rng.choice(states)
+        return 'canceled' if self.rng.random() < CANCELED_SHARE else 'delivered'
+
+    def orders(self, count, buyer_ids, offers):
+        """Заказы порциями (в памяти - только порция), затем корзины доли basket_share покупателей"""
+
+        rng = self.rng
+        days = self.options['days']
+        mean_items = max(self.options['items_per_order'] - 1, 0)
+        # популярность товаров не зависит от порядка id
+        ranked = [offer[0] for offer in offers]
+        rng.shuffle(ranked)
+        offer_weights = zipf_weights(len(ranked))
+        buyer_weights = zipf_weights(len(buyer_ids), 0.7)
+        order_id, item_id = next_id(Order), next_id(OrderItem)
+        batch_size = self.options['batch_size']
+
+        def items(order_id, mean):
+            chosen = set(rng.choices(ranked, cum_weights=offer_weights, k=1 + geometric(rng, mean)))
+            return [(order_id, offer_id, 1 + geometric(rng, 0.5)) for offer_id in chosen]
+
+        made = 0
+        while made < count:
+            order_rows, item_rows = [], []
+            for _ in range(min(batch_size, count - made)):
+                # недавних заказов больше (рост магазина)
+                age = timedelta(days=days * rng.random() ** 1.5, seconds=rng.randint(0, 86399))
+                created_at = self.now - age
+                state = self.order_state(age.days)
+                updated_at = min(self.now, created_at + timedelta(hours=rng.randint(0, 24 * min(age.days, 10))))
+                order_rows.append((order_id, rng.choices(buyer_ids, cum_weights=buyer_weights)[0], created_at,
+                                   updated_at, state))
+                item_rows += items(order_id, mean_items)
+                order_id += 1
+            made += len(order_rows)
+            self.write(Order, ('id', 'buyer_id', 'created_at', 'updated_at', 'state'), order_rows)
+            self.write(OrderItem, ('id', 'order_id', 'product_supplier_id', 'quantity'), (
+                (item_id + i, *row) for i, row in enumerate(item_rows)))
+            item_id += len(item_rows)
+
+        baskets = rng.sample(buyer_ids, round(len(buyer_ids) * self.options['basket_share']))
+        basket_rows, item_rows = [], []
+        for buyer_id in baskets:
+            basket_rows.append((order_id, buyer_id, self.now, self.now, 'basket'))
+            item_rows += items(order_id, 1.5)
+            order_id += 1
+        self.write(Order, ('id', 'buyer_id', 'created_at', 'updated_at', 'state'), basket_rows)
+        self.write(OrderItem, ('id', 'order_id', 'product_supplier_id', 'quantity'), (
+            (item_id + i, *row) for i, row in enumerate(item_rows)))
+
+    def reset_sequences(self):
+        """Последовательности id после вставки с явными id (на PostgreSQL)"""
+
+        models = [CustomUser, Supplier, ProductCategory, ProductCategory.suppliers.through, Product, ProductSupplier,
+                  Parameter, ProductSupplierParameter, Buyer, Order, OrderItem]
+        connection = connections[DEFAULT_DB_ALIAS]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+    def price_lists(self, count, supplier_ids, offers):
+        """Прайсы поставщиков в формате data/s_test.yaml"""
+
+        directory = Path(self.options['price_list_dir'])
+        directory.mkdir(parents=True, exist_ok=True)
+        names = dict(Supplier.objects.filter(id__in=supplier_ids[:count]).values_list('id', 'name'))
+        categories = dict(ProductCategory.objects.values_list('id', 'name'))
+        by_supplier = {}
+        for offer in offers:
+            if offer[1] in names:
+                by_supplier.setdefault(offer[1], []).append(offer)
+        for supplier_id, supplier_offers in by_supplier.items():
+            used = sorted({offer[2][2] for offer in supplier_offers})
+            data = {
+                'shop': names[supplier_id],
+                'categories': [{'id': category_id, 'name': categories[category_id]} for category_id in used],
+                'goods': [{
+                    'id': external_id, 'category': product[2], 'model': model, 'name': product[1],
+                    'price': float(price), 'price_rrc': float(price_rrc), 'quantity': quantity,
+                    'parameters': self.offer_parameters.get(offer_id, {}),
+                } for offer_id, _, product, external_id, model, price, price_rrc, quantity in supplier_offers],
+            }
+            path = directory / f'supplier_{supplier_id}.yaml'
+            path.write_text(yaml.safe_dump(data, allow_unicode=True, sort_keys=False), encoding='utf-8')
+            self.stdout.write(f'{path}: {len(supplier_offers)} товаров')
+
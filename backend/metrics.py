@@ -0,0 +1,128 @@
+"""
+Метрики в формате Prometheus (prometheus_client): время ответа по представлениям, отказы троттлинга по scope,
+длительность и скорость загрузки прайсов, ожидание в очереди и длительность задач Celery.
+
+Для нескольких процессов (воркеры gunicorn, Celery) переменная окружения PROMETHEUS_MULTIPROC_DIR задает общий
+каталог (очищается перед запуском): каждый процесс пишет значения в свои файлы, /metrics суммирует их.
+Без переменной - метрики только текущего процесса. Запись значения - без обращений к сети и БД,
+поэтому метрики не выключаются. Без prometheus_client функции ничего не делают, /metrics отвечает 404
+(как и без METRICS_TOKEN и METRICS_PUBLIC=on).
+"""
+import hmac
+import os
+import time
+
+from celery.signals import before_task_publish, task_prerun, task_postrun
+from django.conf import settings
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Histogram, CollectorRegistry, multiprocess
+except ImportError:  # без prometheus_client метрики не собираются
+    prometheus_client = None
+
+# Заголовок сообщения Celery со временем постановки задачи в очередь
+ENQUEUED_HEADER = 'enqueued_at'
+
+if prometheus_client is not None:
+    REQUEST_DURATION = Histogram(
+        'apiorders_http_request_duration_seconds', 'Время ответа по представлениям',
+        ['view', 'method', 'status'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    THROTTLE_REJECTIONS = Counter(
+        'apiorders_throttle_rejections_total', 'Отказы троттлинга по scope', ['scope'])
+    IMPORT_DURATION = Histogram(
+        'apiorders_import_duration_seconds', 'Длительность загрузки прайса',
+        buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+    )
+    IMPORT_ROWS = Counter('apiorders_import_rows_total', 'Загружено товаров из прайсов')
+    IMPORT_ROWS_PER_SECOND = Histogram(
+        'apiorders_import_rows_per_second', 'Скорость загрузки прайса, товаров в секунду',
+        buckets=(10, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+    )
+    TASK_QUEUE_LAG = Histogram(
+        'apiorders_celery_task_queue_lag_seconds', 'Ожидание задачи в очереди Celery', ['task'],
+        buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+    )
+    TASK_DURATION = Histogram(
+        'apiorders_celery_task_duration_seconds', 'Длительность задачи Celery', ['task', 'state'],
+        buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+    )
+
+
+def observe_request(view, method, status, duration):
+    if prometheus_client is not None:
+        REQUEST_DURATION.labels(view, method, f'{status // 100}xx').observe(duration)
+
+
+def throttle_rejected(scope):
+    if prometheus_client is not None:
+        THROTTLE_REJECTIONS.labels(scope or '').inc()
+
+
+def observe_import(duration, rows):
+    if prometheus_client is not None:
+        IMPORT_DURATION.observe(duration)
+        IMPORT_ROWS.inc(rows)
+        if duration > 0:
+            IMPORT_ROWS_PER_SECOND.observe(rows / duration)
+
+
+@before_task_publish.connect
+def _mark_enqueued(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(ENQUEUED_HEADER, time.time())
+
+
+@task_prerun.connect
+def _task_started(task=None, **kwargs):
+    if prometheus_client is None or task is None:
+        return
+    task.request.metrics_started_at = time.perf_counter()
+    # пользовательские заголовки сообщения (протокол 2) - атрибуты task.request
+    enqueued_at = getattr(task.request, ENQUEUED_HEADER, None)
+    if enqueued_at is not None:
+        TASK_QUEUE_LAG.labels(task.name).observe(max(time.time() - float(enqueued_at), 0))
+
+
+@task_postrun.connect
+def _task_finished(task=None, state=None, **kwargs):
+    started_at = getattr(getattr(task, 'request', None), 'metrics_started_at', None)
+    if prometheus_client is not None and started_at is not None:
+        TASK_DURATION.labels(task.name, state or '').observe(time.perf_counter() - started_at)
+
+
+def mark_process_dead(pid):
+    """Для хука child_exit gunicorn: удаление файлов метрик завершившегося воркера"""
+
+    if prometheus_client is not None and os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+def render_metrics():
+    """(текст, content type) для /metrics: в режиме нескольких процессов - сумма по всем процессам"""
+
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def metrics_enabled():
+    """/metrics доступен: есть prometheus_client и задан METRICS_TOKEN или METRICS_PUBLIC=on"""
+
+    return prometheus_client is not None and bool(settings.METRICS_TOKEN or settings.METRICS_PUBLIC)
+
+
+def metrics_allowed(request):
+    """
+    С METRICS_TOKEN нужен заголовок Authorization: Bearer (сравнение за постоянное время), без него
+    (METRICS_PUBLIC=on) /metrics открыт
+    """
+
+    return not settings.METRICS_TOKEN or \
+        hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', '').encode(),
+                            f'Bearer {settings.METRICS_TOKEN}'.encode())
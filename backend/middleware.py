@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.exceptions import AuthenticationFailed
+
+from backend import metrics, profiling
+from backend.authentication import CachedTokenAuthentication
+from backend.compression import COMPRESSORS, choose_encoding, compress, compress_stream, is_compressible
+from backend.db_routers import replica_reads
+from backend.request_stats import QueryTimer, fingerprint, request_stats
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплики для GET-запросов к представлениям из settings.REPLICA_READ_URL_NAMES.
+    После успешного изменяющего запроса клиент (токен из Authorization или IP) на REPLICA_STICKY_SECONDS
+    закрепляется за основной БД, чтобы видеть свои записи (корзины, заказы) несмотря на отставание реплики.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    @staticmethod
+    def sticky_key(request):
+        ident = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+        return f'db_sticky:{hashlib.sha1(ident.encode()).hexdigest()}'
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = replica_reads.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            cache.set(self.sticky_key(request), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        token = replica_reads.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            await sync_to_async(cache.set)(self.sticky_key(request), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in SAFE_METHODS
+                and request.resolver_match.view_name in settings.REPLICA_READ_URL_NAMES
+                and not cache.get(self.sticky_key(request))):
+            replica_reads.set(True)
+
+
+class RequestMetricsMiddleware:
+    """
+    Время ответа, число запросов к БД, время в БД и самый медленный SQL по представлениям (backend/request_stats.py).
+    Запросы к БД считаются для доли REQUEST_METRICS_SAMPLE_RATE запросов, остальные - только время ответа.
+    Итоги - в заголовке Server-Timing, в логе backend.middleware (поля в extra['request_metrics']),
+    в request_stats процесса и в гистограмме времени ответа Prometheus (backend/metrics.py).
+    Стоит первым в MIDDLEWARE, чтобы учитывать остальные.
+    Под ASGI запросы к БД считаются в потоке, в котором выполняются синхронные части запроса (sync_to_async).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer() if random.random() < settings.REQUEST_METRICS_SAMPLE_RATE else None
+        start = time.perf_counter()
+        if timer is None:
+            response = self.get_response(request)
+        else:
+            with timer.wrap_connections():
+                response = self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start, timer)
+
+    async def __acall__(self, request):
+        timer = QueryTimer() if random.random() < settings.REQUEST_METRICS_SAMPLE_RATE else None
+        start = time.perf_counter()
+        if timer is None:
+            response = await self.get_response(request)
+        else:
+            connections_wrapped = await sync_to_async(timer.wrap_connections)()
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(connections_wrapped.close)()
+        return self.record(request, response, time.perf_counter() - start, timer)
+
+    def record(self, request, response, duration, timer):
+        """Итоги запроса: статистика, метрика, заголовок Server-Timing и лог"""
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        request_stats.add(view, duration, timer)
+        metrics.observe_request(view, request.method, response.status_code, duration)
+
+        timing = f'app;dur={duration * 1000:.1f}'
+        if timer is not None:
+            timing += f', db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"'
+        response['Server-Timing'] = timing
+
+        slow = duration * 1000 >= settings.REQUEST_METRICS_SLOW_MS
+        if timer is not None or slow:
+            record = {'view': view, 'method': request.method, 'status': response.status_code,
+                      'duration_ms': round(duration * 1000, 2)}
+            if timer is not None:
+                record.update(queries=timer.count, db_ms=round(timer.duration * 1000, 2),
+                              slowest_query_ms=round(timer.slowest * 1000, 2),
+                              slowest_sql=timer.slowest_sql and fingerprint(timer.slowest_sql))
+            logger.log(logging.WARNING if slow else logging.INFO, '%s %s %s: %.1f ms, %s queries',
+                       request.method, view, response.status_code, duration * 1000,
+                       record.get('queries', '-'), extra={'request_metrics': record})
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Профиль запроса (backend/profiling.py): по заголовку X-Profile (значение - режим cprofile или sample, иначе
+    PROFILING_MODE) и для доли PROFILING_SAMPLE_RATE запросов. По заголовку профилирование начинается, только
+    если токен запроса (Authorization: Token) принадлежит сотруднику (is_staff) - пользователь проверяется до
+    представления, остальные запросы с заголовком выполняются без профиля.
+    Без PROFILING=on не подключается. Только синхронный: сэмплер снимает стеки потока запроса.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    @staticmethod
+    def staff_user(request):
+        """Сотрудник по токену из заголовка Authorization или None"""
+
+        try:
+            user_token = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if user_token is None or not user_token[0].is_staff:
+            return None
+        return user_token[0]
+
+    def __call__(self, request):
+        requested = request.META.get('HTTP_X_PROFILE')
+        staff = requested is not None and self.staff_user(request) is not None
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        if not staff and not sampled:
+            return self.get_response(request)
+
+        mode = requested if requested in profiling.MODES else settings.PROFILING_MODE
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with profiling.Profile(mode) as profile, timer.wrap_connections():
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        # Request.user DRF записывает пользователя и в HttpRequest
+        user = getattr(request, 'user', None)
+        match = getattr(request, 'resolver_match', None)
+        name = profiling.save_profile(profile, {
+            'view': match.view_name if match else '<unresolved>', 'method': request.method, 'path': request.path,
+            'user_id': getattr(user, 'id', None), 'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2), 'queries': timer.count, 'db_ms': round(timer.duration * 1000, 2),
+            'slowest_sql': timer.slowest_sql and fingerprint(timer.slowest_sql),
+        })
+        if staff:
+            response['X-Profile-Id'] = name
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжатие ответов (backend/compression.py) с текстовым содержимым (JSON, NDJSON, CSV, схема OpenAPI) не меньше
+    COMPRESSION_MIN_SIZE байт, потоковые выгрузки - по частям. Алгоритм - по Accept-Encoding из
+    COMPRESSION_ENCODINGS, уровень - COMPRESSION_LEVELS. ETag сжатого ответа становится слабым (W/"..."):
+    If-None-Match сравнивается без учета W/, 304 отдается так же. С COMPRESSION=off не подключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.encodings = [encoding for encoding in settings.COMPRESSION_ENCODINGS if encoding in COMPRESSORS]
+
+    def process_response(self, request, response):
+        if (response.has_header('Content-Encoding') or not is_compressible(response.get('Content-Type', ''))
+                or 'no-transform' in response.get('Cache-Control', '')):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ['Accept-Encoding'])
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return response
+
+        level = settings.COMPRESSION_LEVELS[encoding]
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding, level)
+            del response['Content-Length']
+        else:
+            content = compress(response.content, encoding, level)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = encoding
+        return response
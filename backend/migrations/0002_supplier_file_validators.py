@@ -0,0 +1,28 @@
+# Generated by Django 4.1.6 on 2026-10-18 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='file_etag',
+            field=models.CharField(blank=True, max_length=255, verbose_name='ETag файла'),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='file_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Хэш файла'),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='file_last_modified',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Last-Modified файла'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.6 on 2026-10-19 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0002_supplier_file_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSupplierChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('insert', 'Добавлен'), ('update', 'Изменен'), ('retire', 'Снят с продажи'), ('availability', 'Доступность поставщика')], max_length=12, verbose_name='Тип изменения')),
+                ('product_supplier_id', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Товар поставщика')),
+                ('supplier_id', models.PositiveBigIntegerField(verbose_name='Поставщик')),
+                ('product_id', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Продукт')),
+                ('external_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='Внешний ID')),
+                ('model', models.CharField(blank=True, max_length=100, null=True, verbose_name='Модель')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True, verbose_name='Цена')),
+                ('price_rrc', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True, verbose_name='Розничная цена')),
+                ('quantity', models.PositiveIntegerField(blank=True, null=True, verbose_name='Количество')),
+                ('is_available', models.BooleanField(blank=True, null=True, verbose_name='Доступность для заказа')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Изменение каталога',
+                'verbose_name_plural': 'Лента изменений каталога',
+                'ordering': ('id',),
+            },
+        ),
+    ]
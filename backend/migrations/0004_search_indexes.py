@@ -0,0 +1,40 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# Индексы поиска (backend/search.py) - только для PostgreSQL, в состояние моделей не входят
+SEARCH_INDEXES = [
+    ('Product', GinIndex(SearchVector('name', config='russian'), name='product_name_fts')),
+    ('Product', GinIndex(OpClass('name', name='gin_trgm_ops'), name='product_name_trgm')),
+    ('ProductSupplier', GinIndex(OpClass('model', name='gin_trgm_ops'), name='product_supplier_model_trgm')),
+    ('ProductSupplierParameter', GinIndex(SearchVector('value', config='russian'), name='ps_parameter_value_fts')),
+    ('ProductSupplierParameter', GinIndex(OpClass('value', name='gin_trgm_ops'), name='ps_parameter_value_trgm')),
+]
+
+
+def add_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in SEARCH_INDEXES:
+        schema_editor.add_index(apps.get_model('backend', model_name), index)
+
+
+def remove_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in SEARCH_INDEXES:
+        schema_editor.remove_index(apps.get_model('backend', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0003_product_supplier_change'),
+    ]
+
+    operations = [
+        # на других СУБД операция ничего не делает
+        TrigramExtension(),
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
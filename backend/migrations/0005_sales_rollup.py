@@ -0,0 +1,52 @@
+# Generated by Django 4.1.6 on 2026-10-19 00:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0004_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_to', models.DateTimeField(verbose_name='Учтены изменения до')),
+            ],
+            options={
+                'verbose_name': 'Состояние итогов продаж',
+                'verbose_name_plural': 'Состояние итогов продаж',
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('state', models.CharField(choices=[('basket', 'В корзине'), ('new', 'Новый'), ('confirmed', 'Подтвержден'), ('assembled', 'Собран'), ('sent', 'Отправлен'), ('delivered', 'Доставлен'), ('canceled', 'Отменен')], max_length=15, verbose_name='Статус заказа')),
+                ('orders', models.PositiveIntegerField(verbose_name='Заказов')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Количество')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Сумма')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='backend.productcategory', verbose_name='Категория')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='backend.product', verbose_name='Продукт')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='backend.supplier', verbose_name='Поставщик')),
+            ],
+            options={
+                'verbose_name': 'Итоги продаж за день',
+                'verbose_name_plural': 'Итоги продаж по дням',
+                'ordering': ('day',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='salesrollup',
+            index=models.Index(fields=['supplier', 'day'], name='sales_rollup_supplier_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'supplier', 'category', 'product', 'state'), name='unique_sales_rollup'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.1.6 on 2026-10-19 00:24
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def merge_duplicate_baskets(apps, schema_editor):
+    """Лишние корзины покупателя сливаются в самую раннюю (количества одинаковых товаров складываются)"""
+
+    Order = apps.get_model('backend', 'Order')
+    OrderItem = apps.get_model('backend', 'OrderItem')
+    db_alias = schema_editor.connection.alias
+
+    duplicates = Order.objects.using(db_alias).filter(state='basket').values('buyer_id').annotate(
+        baskets=Count('id')).filter(baskets__gt=1).values_list('buyer_id', flat=True)
+    for buyer_id in list(duplicates):
+        basket_id, *extra_ids = Order.objects.using(db_alias).filter(
+            buyer_id=buyer_id, state='basket').order_by('id').values_list('id', flat=True)
+        items = dict(OrderItem.objects.using(db_alias).filter(order_id=basket_id).values_list(
+            'product_supplier_id', 'id'))
+        for item in OrderItem.objects.using(db_alias).filter(order_id__in=extra_ids).order_by('id'):
+            if item.product_supplier_id in items:
+                OrderItem.objects.using(db_alias).filter(id=items[item.product_supplier_id]).update(
+                    quantity=F('quantity') + item.quantity)
+                item.delete()
+            else:
+                item.order_id = basket_id
+                item.save(update_fields=['order'])
+                items[item.product_supplier_id] = item.id
+        Order.objects.using(db_alias).filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0005_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_baskets, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('state', 'basket'), _negated=True), fields=['buyer', 'created_at'], name='order_buyer_placed'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['product_supplier', 'order'], name='order_item_ps_order'),
+        ),
+        migrations.AddIndex(
+            model_name='productsupplier',
+            index=models.Index(fields=['supplier', 'id'], name='product_supplier_supplier_id'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['id'], name='supplier_available'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('state', 'basket')), fields=('buyer',), name='unique_basket_per_buyer'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.1.6 on 2026-10-19 00:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0006_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Создан')),
+                ('updated_at', models.DateTimeField(verbose_name='Изменен')),
+                ('state', models.CharField(choices=[('basket', 'В корзине'), ('new', 'Новый'), ('confirmed', 'Подтвержден'), ('assembled', 'Собран'), ('sent', 'Отправлен'), ('delivered', 'Доставлен'), ('canceled', 'Отменен')], max_length=15, verbose_name='Статус')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Перенесен в архив')),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to='backend.buyer', verbose_name='Покупатель')),
+            ],
+            options={
+                'verbose_name': 'Заказ в архиве',
+                'verbose_name_plural': 'Архив заказов',
+                'ordering': ('created_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_supplier_id', models.PositiveBigIntegerField(verbose_name='Товар поставщика')),
+                ('product_name', models.CharField(max_length=150, verbose_name='Название')),
+                ('external_id', models.PositiveIntegerField(verbose_name='Внешний ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Количество')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=9, verbose_name='Цена')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='backend.archivedorder', verbose_name='Заказ')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_order_items', to='backend.product', verbose_name='Продукт')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_order_items', to='backend.supplier', verbose_name='Поставщик')),
+            ],
+            options={
+                'verbose_name': 'Позиция заказа в архиве',
+                'verbose_name_plural': 'Архив заказанных позиций',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedorderitem',
+            index=models.Index(fields=['supplier', 'order'], name='archived_item_supplier_order'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['buyer', 'created_at'], name='archived_order_buyer'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['created_at'], name='archived_order_created_at'),
+        ),
+    ]
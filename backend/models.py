@@ -140,6 +140,11 @@ class Supplier(models.Model):
     phone = models.CharField(max_length=20, verbose_name='Телефон')
     file_url = models.URLField(null=True, blank=True, verbose_name='Ссылка на файл')
 
+    # Валидаторы последней загруженной версии файла (для условных запросов при плановом обновлении)
+    file_etag = models.CharField(max_length=255, blank=True, verbose_name='ETag файла')
+    file_last_modified = models.CharField(max_length=64, blank=True, verbose_name='Last-Modified файла')
+    file_hash = models.CharField(max_length=64, blank=True, verbose_name='Хэш файла')
+
     # Поставщик может включать и отключать доступность своих товаров для заказа
     is_available = models.BooleanField(default=True, verbose_name='Доступность для заказа')
 
@@ -147,6 +152,10 @@ class Supplier(models.Model):
         verbose_name = 'Поставщик'
         verbose_name_plural = "Список поставщиков"
         ordering = ('-is_available', 'id',)
+        indexes = [
+            # доступные поставщики: соединение каталога с фильтром supplier__is_available=True
+            models.Index(fields=['id'], condition=models.Q(is_available=True), name='supplier_available'),
+        ]
 
     def __str__(self):
         return f'{self.pk}.{self.name}-{self.is_available}-u:{self.user.id}'
@@ -200,11 +209,52 @@ class ProductSupplier(models.Model):
         verbose_name = 'Информация о продукте поставщика'
         verbose_name_plural = 'Информация о продуктах поставщика'
         constraints = [models.UniqueConstraint(fields=['product', 'supplier'], name='unique_product_supplier')]
+        indexes = [
+            # товары поставщика по порядку id (каталог с фильтром supplier_id, загрузка прайса)
+            models.Index(fields=['supplier', 'id'], name='product_supplier_supplier_id'),
+        ]
 
     def __str__(self):
         return f'{self.pk}.p:{self.product_id}-s:{self.supplier_id}'
 
 
+CHANGE_KIND_CHOICES = (
+    ('insert', 'Добавлен'),
+    ('update', 'Изменен'),
+    ('retire', 'Снят с продажи'),
+    ('availability', 'Доступность поставщика'),
+)
+
+
+class ProductSupplierChange(models.Model):
+    """
+    Изменение в каталоге товаров поставщиков (лента изменений, backend/changes.py).
+    id - монотонный номер изменения, курсор для клиентов. Поля значений заполняются только изменившиеся,
+    ссылки на товар и поставщика - без внешних ключей, чтобы записи о снятых товарах сохранялись
+    """
+
+    kind = models.CharField(max_length=12, choices=CHANGE_KIND_CHOICES, verbose_name='Тип изменения')
+    product_supplier_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name='Товар поставщика')
+    supplier_id = models.PositiveBigIntegerField(verbose_name='Поставщик')
+    product_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name='Продукт')
+    external_id = models.PositiveIntegerField(null=True, blank=True, verbose_name='Внешний ID')
+    model = models.CharField(max_length=100, null=True, blank=True, verbose_name='Модель')
+    price = models.DecimalField(max_digits=9, decimal_places=2, null=True, blank=True, verbose_name='Цена')
+    price_rrc = models.DecimalField(max_digits=9, decimal_places=2, null=True, blank=True,
+                                    verbose_name='Розничная цена')
+    quantity = models.PositiveIntegerField(null=True, blank=True, verbose_name='Количество')
+    is_available = models.BooleanField(null=True, blank=True, verbose_name='Доступность для заказа')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+
+    class Meta:
+        verbose_name = 'Изменение каталога'
+        verbose_name_plural = 'Лента изменений каталога'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.pk}.{self.kind}-ps:{self.product_supplier_id}-s:{self.supplier_id}'
+
+
 class Parameter(models.Model):
     """Параметр"""
 
@@ -274,6 +324,16 @@ class Order(models.Model):
         verbose_name = 'Заказ'
         verbose_name_plural = "Список заказов"
         ordering = ('created_at',)
+        constraints = [
+            # у покупателя одна корзина: get_or_create корзины при параллельных запросах не создаст вторую
+            models.UniqueConstraint(fields=['buyer'], condition=models.Q(state='basket'),
+                                    name='unique_basket_per_buyer'),
+        ]
+        indexes = [
+            # размещенные заказы покупателя (история без корзин)
+            models.Index(fields=['buyer', 'created_at'], condition=~models.Q(state='basket'),
+                         name='order_buyer_placed'),
+        ]
 
     def __str__(self):
         return f'{self.pk}. {self.buyer_id} - {self.state}'
@@ -295,6 +355,114 @@ class OrderItem(models.Model):
                                     condition=models.Q(quantity__gt=0),
                                     name='unique_order_item'),
         ]
+        indexes = [
+            # позиции по товарам поставщика (заказы поставщика), order - для соединения с заказом без чтения строк
+            models.Index(fields=['product_supplier', 'order'], name='order_item_ps_order'),
+        ]
 
     def __str__(self):
         return f'{self.pk}. {self.quantity}'
+
+
+class ArchivedOrder(models.Model):
+    """
+    Заказ в архиве (backend/archive.py): завершенные заказы старше ORDER_ARCHIVE_AFTER_DAYS переносятся
+    из Order с тем же id
+    """
+
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    buyer = models.ForeignKey(Buyer, on_delete=models.CASCADE, related_name='archived_orders',
+                              verbose_name='Покупатель')
+    created_at = models.DateTimeField(verbose_name='Создан')
+    updated_at = models.DateTimeField(verbose_name='Изменен')
+    state = models.CharField(max_length=15, choices=STATE_CHOICES, verbose_name='Статус')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Перенесен в архив')
+
+    class Meta:
+        verbose_name = 'Заказ в архиве'
+        verbose_name_plural = 'Архив заказов'
+        ordering = ('created_at',)
+        indexes = [
+            models.Index(fields=['buyer', 'created_at'], name='archived_order_buyer'),
+            models.Index(fields=['created_at'], name='archived_order_created_at'),
+        ]
+
+    def __str__(self):
+        return f'{self.pk}. {self.buyer_id} - {self.state}'
+
+
+class ArchivedOrderItem(models.Model):
+    """
+    Позиция заказа в архиве. Название, внешний id и цена товара сохраняются на момент переноса,
+    товар поставщика - без внешнего ключа, чтобы история не зависела от каталога
+    """
+
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='order_items',
+                              verbose_name='Заказ')
+    product_supplier_id = models.PositiveBigIntegerField(verbose_name='Товар поставщика')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='archived_order_items',
+                                 verbose_name='Поставщик')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_order_items',
+                                verbose_name='Продукт')
+    product_name = models.CharField(max_length=150, verbose_name='Название')
+    external_id = models.PositiveIntegerField(verbose_name='Внешний ID')
+    quantity = models.PositiveIntegerField(verbose_name='Количество')
+    price = models.DecimalField(max_digits=9, decimal_places=2, verbose_name='Цена')
+
+    class Meta:
+        verbose_name = 'Позиция заказа в архиве'
+        verbose_name_plural = 'Архив заказанных позиций'
+        indexes = [
+            models.Index(fields=['supplier', 'order'], name='archived_item_supplier_order'),
+        ]
+
+    def __str__(self):
+        return f'{self.pk}. {self.quantity}'
+
+
+class SalesRollup(models.Model):
+    """
+    Дневные итоги продаж (backend/analytics.py): заказанные позиции за день создания заказа
+    по поставщику, категории, продукту и статусу заказа
+    """
+
+    day = models.DateField(verbose_name='День')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='sales_rollups',
+                                 verbose_name='Поставщик')
+    category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, related_name='sales_rollups',
+                                 verbose_name='Категория')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_rollups',
+                                verbose_name='Продукт')
+    state = models.CharField(max_length=15, choices=STATE_CHOICES, verbose_name='Статус заказа')
+    orders = models.PositiveIntegerField(verbose_name='Заказов')
+    quantity = models.PositiveIntegerField(verbose_name='Количество')
+    amount = models.DecimalField(max_digits=14, decimal_places=2, verbose_name='Сумма')
+
+    class Meta:
+        verbose_name = 'Итоги продаж за день'
+        verbose_name_plural = 'Итоги продаж по дням'
+        ordering = ('day',)
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'supplier', 'category', 'product', 'state'],
+                                    name='unique_sales_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['supplier', 'day'], name='sales_rollup_supplier_day'),
+        ]
+
+    def __str__(self):
+        return f'{self.day}-s:{self.supplier_id}-p:{self.product_id}-{self.state}'
+
+
+class SalesRollupState(models.Model):
+    """Состояние пересчета итогов продаж: учтены изменения заказов до updated_to (одна запись)"""
+
+    updated_to = models.DateTimeField(verbose_name='Учтены изменения до')
+
+    class Meta:
+        verbose_name = 'Состояние итогов продаж'
+        verbose_name_plural = 'Состояние итогов продаж'
+
+    def __str__(self):
+        return f'{self.updated_to}'
@@ -0,0 +1,157 @@
+"""
+Профили отдельных запросов (ProfilingMiddleware, подключается при PROFILING=on): по заголовку X-Profile от
+сотрудника (is_staff, токен проверяется до начала профилирования) и для доли PROFILING_SAMPLE_RATE всех запросов.
+
+Режимы: cprofile - cProfile (файл .prof для pstats или snakeviz) и стеки сэмплера; sample - только
+статистический сэмплер (стек потока запроса каждые PROFILING_INTERVAL с, накладные расходы меньше).
+Стеки сохраняются в свернутом формате (.folded, строки "кадр;кадр;кадр число") для flamegraph.pl, speedscope
+или inferno, рядом - .json с именем URL, статусом, временем и запросами к БД. В PROFILING_DIR хранятся
+последние PROFILING_KEEP профилей.
+"""
+import io
+import json
+import os
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+MODES = ('cprofile', 'sample')
+
+# Файлы профиля: расширение - тип содержимого
+FILE_TYPES = {
+    'json': 'application/json',
+    'folded': 'text/plain; charset=utf-8',
+    'prof': 'application/octet-stream',
+}
+
+NAME = re.compile(r'^[\w-]+$')
+_unsafe = re.compile(r'[^\w-]+')
+
+
+class Sampler:
+    """Стеки потока по sys._current_frames() из фонового потока: {'кадр;кадр;...': число выборок}"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+class Profile:
+    """Профиль кода внутри with в текущем потоке"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.profiler = None
+        if mode == 'cprofile':
+            import cProfile  # при профилировании: backend.profiling загружается при запуске каждого процесса
+            self.profiler = cProfile.Profile()
+        self.sampler = Sampler(threading.get_ident(), settings.PROFILING_INTERVAL)
+
+    def __enter__(self):
+        self.sampler.start()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.sampler.stop()
+
+
+def save_profile(profile, meta):
+    """Запись файлов профиля в PROFILING_DIR, возвращает имя профиля"""
+
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    created_at = datetime.now(timezone.utc)
+    name = f'{created_at:%Y%m%d-%H%M%S}-{_unsafe.sub("_", meta.get("view", ""))[:60]}-{uuid.uuid4().hex[:8]}'
+    path = os.path.join(directory, name)
+
+    files = ['json', 'folded']
+    with open(f'{path}.folded', 'w', encoding='utf-8') as file:
+        file.writelines(f'{stack} {count}\n' for stack, count in profile.sampler.stacks.most_common())
+    if profile.profiler is not None:
+        profile.profiler.dump_stats(f'{path}.prof')
+        files.append('prof')
+    meta = {'name': name, 'created_at': created_at.isoformat(), 'mode': profile.mode,
+            'samples': sum(profile.sampler.stacks.values()), 'files': files, **meta}
+    with open(f'{path}.json', 'w', encoding='utf-8') as file:
+        json.dump(meta, file, ensure_ascii=False)
+
+    prune(directory, settings.PROFILING_KEEP)
+    return name
+
+
+def prune(directory, keep):
+    """Удаление профилей сверх keep последних (имя начинается со времени создания)"""
+
+    names = sorted(entry[:-len('.json')] for entry in os.listdir(directory) if entry.endswith('.json'))
+    for name in names[:max(len(names) - keep, 0)]:
+        for extension in FILE_TYPES:
+            try:
+                os.remove(os.path.join(directory, f'{name}.{extension}'))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Описания сохраненных профилей, новые - первыми"""
+
+    directory = settings.PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in sorted(os.listdir(directory), reverse=True):
+        if entry.endswith('.json'):
+            try:
+                with open(os.path.join(directory, entry), encoding='utf-8') as file:
+                    profiles.append(json.load(file))
+            except (OSError, ValueError):  # удален или еще записывается
+                continue
+    return profiles
+
+
+def profile_path(name, extension):
+    """Путь к файлу профиля или None (имя проверяется: файлы только из PROFILING_DIR)"""
+
+    if not NAME.match(name) or extension not in FILE_TYPES:
+        return None
+    path = os.path.join(settings.PROFILING_DIR, f'{name}.{extension}')
+    return path if os.path.isfile(path) else None
+
+
+def stats_text(path, limit=50):
+    """Функции с наибольшим суммарным временем (pstats) текстом"""
+
+    import pstats
+
+    stream = io.StringIO()
+    pstats.Stats(path, stream=stream).sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
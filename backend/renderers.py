@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import math
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # без orjson работают стандартные JSONRenderer / JSONParser
+    orjson = None
+
+# Типы, которые orjson не сериализует сам (Decimal, timedelta, ленивые строки, QuerySet...),
+# преобразуются так же, как в стандартном JSONRenderer DRF
+_encoder_default = JSONEncoder().default
+
+
+def _has_non_finite(data):
+    """Есть ли в данных NaN или Infinity (orjson выводит их как null)"""
+
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_has_non_finite(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_has_non_finite(value) for value in data)
+    return False
+
+
+def dumps(data):
+    """Компактный JSON в байтах, как у JSONRenderer без отступов"""
+
+    if orjson is None:
+        ret = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode()
+    else:
+        ret = orjson.dumps(data, default=_encoder_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        # как json.dumps(allow_nan=False) в JSONRenderer; данные проверяются, только если в ответе есть null
+        if b'null' in ret and _has_non_finite(data):
+            raise ValueError('Out of range float values are not JSON compliant')
+    # как в JSONRenderer: U+2028 и U+2029 допустимы в JSON, но не в JavaScript
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Результат совпадает со стандартным рендерером
+    (компактный UTF-8, datetime в ISO 8601 с 'Z' для UTC, Decimal/прочие типы - как в DRF).
+    Запросы с отступом (Accept: application/json; indent=4) обрабатывает стандартный рендерер.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser на orjson (только для UTF-8, иначе - стандартный разбор)"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    NDJSON для выгрузок (backend/exports.py). Сами выгрузки отдаются потоком (StreamingHttpResponse),
+    рендерер нужен для выбора формата (?format=ndjson или Accept) и ответов с ошибками - одна строка JSON
+    """
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return dumps(data) + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV для выгрузок. Ответ с ошибкой (словарь) - заголовок из ключей и одна строка значений"""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not data:
+            return b''
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(data.keys())
+        writer.writerow(data.values())
+        return buffer.getvalue().encode()
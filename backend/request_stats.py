@@ -0,0 +1,114 @@
+"""
+Статистика запросов по представлениям (имя URL, например backend:buyer-basket): число запросов,
+время ответа, число запросов к БД, время в БД и самый медленный SQL (отпечаток - текст запроса без
+параметров, списки IN (...) свернуты).
+
+Время ответа считается для каждого запроса, запросы к БД - только для доли REQUEST_METRICS_SAMPLE_RATE
+запросов (обертка connection.execute_wrapper на все соединения). Заполняется RequestMetricsMiddleware,
+хранится в памяти процесса.
+"""
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+_in_list = re.compile(r'IN \((?:%s, )*%s\)')
+_spaces = re.compile(r'\s+')
+
+# Длина отпечатка SQL
+FINGERPRINT_LENGTH = 200
+
+
+def fingerprint(sql):
+    """Текст запроса без параметров, одинаковый для запросов с разным числом значений в IN (...)"""
+
+    return _spaces.sub(' ', _in_list.sub('IN (...)', sql)).strip()[:FINGERPRINT_LENGTH]
+
+
+class QueryTimer:
+    """Обертка выполнения SQL (connection.execute_wrapper): число запросов, общее время и самый медленный"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if duration > self.slowest:
+                self.slowest, self.slowest_sql = duration, sql
+
+    def wrap_connections(self):
+        """Контекст, в котором учитываются запросы ко всем БД (основная и реплика) текущего потока"""
+
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+
+class RequestStats:
+    """Итоги по представлениям с момента запуска процесса (или reset)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def add(self, view, duration, timer=None):
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = {
+                    'requests': 0, 'duration': 0.0, 'max_duration': 0.0,
+                    'sampled': 0, 'queries': 0, 'db_duration': 0.0, 'max_queries': 0,
+                    'slowest_query': 0.0, 'slowest_sql': None,
+                }
+            stats['requests'] += 1
+            stats['duration'] += duration
+            stats['max_duration'] = max(stats['max_duration'], duration)
+            if timer is None:
+                return
+            stats['sampled'] += 1
+            stats['queries'] += timer.count
+            stats['db_duration'] += timer.duration
+            stats['max_queries'] = max(stats['max_queries'], timer.count)
+            if timer.slowest > stats['slowest_query']:
+                stats['slowest_query'] = timer.slowest
+                stats['slowest_sql'] = fingerprint(timer.slowest_sql)
+
+    def snapshot(self):
+        """Итоги по представлениям: средние по всем запросам (время) и по выборке (БД), время в мс"""
+
+        with self._lock:
+            views = {view: stats.copy() for view, stats in self._views.items()}
+        result = {}
+        for view, stats in sorted(views.items()):
+            sampled = stats['sampled'] or 1
+            result[view] = {
+                'requests': stats['requests'],
+                'avg_ms': round(stats['duration'] * 1000 / stats['requests'], 2),
+                'max_ms': round(stats['max_duration'] * 1000, 2),
+                'sampled': stats['sampled'],
+                'avg_queries': round(stats['queries'] / sampled, 2),
+                'max_queries': stats['max_queries'],
+                'avg_db_ms': round(stats['db_duration'] * 1000 / sampled, 2),
+                'slowest_query_ms': round(stats['slowest_query'] * 1000, 2),
+                'slowest_sql': stats['slowest_sql'],
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+
+request_stats = RequestStats()
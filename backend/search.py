@@ -0,0 +1,68 @@
+"""
+Поиск товаров поставщиков по названию продукта, модели и значениям параметров.
+
+PostgreSQL: полнотекстовый поиск с русской морфологией (название, значения параметров) и триграммное
+сходство запроса со словами текста для опечаток (название, модель, значения параметров). Выражения условий совпадают с выражениями
+GIN-индексов из миграции 0004_search_indexes, поэтому поиск идет по индексам. Релевантность - ts_rank
+по названию плюс триграммное сходство названия и модели.
+
+Другие СУБД (SQLite в тестах и локальной разработке): все слова запроса должны встречаться
+в названии, модели или параметрах (без учета регистра), релевантность - по числу совпадений в названии
+и модели. Сравнение выполняется в Python, поэтому подходит только для небольших каталогов.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connections, router
+from django.db.models import Case, When, Q, Value, IntegerField
+
+from backend.models import Product, ProductSupplier, ProductSupplierParameter
+
+SEARCH_CONFIG = 'russian'
+
+
+def search_offers(query, queryset=None):
+    """Queryset товаров поставщиков, подходящих под запрос, по убыванию релевантности"""
+
+    if queryset is None:
+        queryset = ProductSupplier.objects.filter(supplier__is_available=True)
+    if connections[router.db_for_read(ProductSupplier)].vendor == 'postgresql':
+        return _postgres_search(query, queryset)
+    return _fallback_search(query, queryset)
+
+
+def _postgres_search(query, queryset):
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+
+    products = Product.objects.annotate(
+        document=SearchVector('name', config=SEARCH_CONFIG)
+    ).filter(Q(document=search_query) | Q(name__trigram_word_similar=query)).values('id')
+    parameters = ProductSupplierParameter.objects.annotate(
+        document=SearchVector('value', config=SEARCH_CONFIG)
+    ).filter(Q(document=search_query) | Q(value__trigram_word_similar=query)).values('product_supplier_id')
+
+    return queryset.filter(
+        Q(product_id__in=products) | Q(model__trigram_word_similar=query) | Q(id__in=parameters)
+    ).annotate(
+        rank=SearchRank(SearchVector('product__name', config=SEARCH_CONFIG), search_query)
+        + TrigramWordSimilarity(query, 'product__name')
+        + TrigramWordSimilarity(query, 'model') * Value(0.5)
+    ).order_by('-rank', 'id')
+
+
+def _fallback_search(query, queryset):
+    terms = query.casefold().split()
+    parameters = {}
+    for product_supplier_id, value in ProductSupplierParameter.objects.filter(
+            product_supplier__in=queryset.values('id')).values_list('product_supplier_id', 'value'):
+        parameters.setdefault(product_supplier_id, []).append(value.casefold())
+
+    ranks = {}
+    for ps_id, name, model in queryset.values_list('id', 'product__name', 'model'):
+        name, model = name.casefold(), model.casefold()
+        fields = [name, model] + parameters.get(ps_id, [])
+        if all(any(term in field for field in fields) for term in terms):
+            ranks[ps_id] = sum(2 * (term in name) + (term in model) for term in terms)
+
+    return queryset.filter(id__in=list(ranks)).annotate(
+        rank=Case(*[When(id=ps_id, then=Value(rank)) for ps_id, rank in ranks.items()],
+                  default=Value(0), output_field=IntegerField())
+    ).order_by('-rank', 'id')
@@ -1,3 +1,7 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from backend.models import *
 
@@ -67,6 +71,50 @@ class PriceListUpdateSerializer(serializers.Serializer):
     file_url = serializers.URLField()
 
 
+class StockUpdateSerializer(serializers.Serializer):
+
+    supplier_id = serializers.IntegerField()
+    # строки проверяются в backend/stock.py (быстрее полей сериализатора на тысячах строк)
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_items(self, value):
+        if len(value) > settings.STOCK_UPDATE_MAX_ROWS:
+            raise serializers.ValidationError(f'Не более {settings.STOCK_UPDATE_MAX_ROWS} строк за запрос')
+        return value
+
+
+class OrderHistoryQuerySerializer(serializers.Serializer):
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if 'date_from' in data and 'date_to' in data and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError('date_from позже date_to')
+        return data
+
+
+class SalesAnalyticsQuerySerializer(serializers.Serializer):
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    supplier_id = serializers.IntegerField(required=False)
+    category_id = serializers.IntegerField(required=False)
+    state = serializers.MultipleChoiceField(choices=[state for state, _ in STATE_CHOICES if state != 'basket'],
+                                            required=False)
+    top = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, data):
+        date_to = data.setdefault('date_to', timezone.localdate())
+        date_from = data.setdefault('date_from', date_to - timedelta(days=settings.SALES_ANALYTICS_DEFAULT_DAYS - 1))
+        if date_from > date_to:
+            raise serializers.ValidationError('date_from позже date_to')
+        if (date_to - date_from).days >= settings.SALES_ANALYTICS_MAX_DAYS:
+            raise serializers.ValidationError(f'Период - не более {settings.SALES_ANALYTICS_MAX_DAYS} дней')
+        return data
+
+
 class ProductSerializer(serializers.ModelSerializer):
 
     category = serializers.StringRelatedField()
@@ -0,0 +1,140 @@
+"""
+Быстрое обновление цен и остатков поставщика без загрузки прайса.
+
+Строки {external_id, price, price_rrc, quantity} (любое непустое подмножество полей, кроме external_id)
+проверяются валидаторами полей модели, товары поставщика читаются одним запросом (порциями) с блокировкой,
+изменившиеся товары обновляются одним UPDATE ... FROM (VALUES ...) на порцию отдельно для каждого набора полей
+(на других СУБД - bulk_update). Все изменения - в одной транзакции, изменения пишутся в ленту (backend/changes.py).
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction, connections, router
+
+from backend.autocomplete import catalog_changed
+from backend.changes import offer_change, record_changes, lock_changes
+from backend.models import ProductSupplier
+
+STOCK_FIELDS = ('price', 'price_rrc', 'quantity')
+
+# Размер порции для IN (...) и bulk_update
+BATCH_SIZE = 500
+
+
+def clean_row(row):
+    """Проверенные значения строки или ошибки (словарь поле - список сообщений)"""
+
+    if not isinstance(row, dict):
+        return None, {'non_field_errors': ['Ожидается объект']}
+
+    errors = {}
+    unknown = set(row) - {'external_id', *STOCK_FIELDS}
+    if unknown:
+        errors['non_field_errors'] = [f'Неизвестные поля: {", ".join(sorted(map(str, unknown)))}']
+    if not any(field in row for field in STOCK_FIELDS):
+        errors.setdefault('non_field_errors', []).append(f'Нужно хотя бы одно из полей: {", ".join(STOCK_FIELDS)}')
+
+    values = {}
+    for name in ('external_id', *STOCK_FIELDS):
+        if name not in row:
+            continue
+        try:
+            values[name] = ProductSupplier._meta.get_field(name).clean(row[name], None)
+        except ValidationError as e:
+            errors[name] = e.messages
+            continue
+        # ограничение PositiveIntegerField на уровне БД есть не везде (SQLite), цены тоже не отрицательные
+        if values[name] < 0:
+            errors[name] = ['Значение не может быть отрицательным.']
+    if 'external_id' not in row:
+        errors['external_id'] = ['Обязательное поле.']
+    return values, errors
+
+
+def update_offers(offers, fields):
+    """UPDATE товаров по id значениями полей fields из объектов offers"""
+
+    connection = connections[router.db_for_write(ProductSupplier)]
+    if not (connection.vendor == 'postgresql' or connection.vendor == 'sqlite' and
+            connection.Database.sqlite_version_info >= (3, 33)):
+        ProductSupplier.objects.bulk_update(offers, fields, batch_size=BATCH_SIZE)
+        return
+
+    model_fields = [ProductSupplier._meta.get_field(field) for field in fields]
+    qn = connection.ops.quote_name
+    table = qn(ProductSupplier._meta.db_table)
+    columns = ', '.join(qn(field.column) for field in model_fields)
+    assignments = ', '.join(f'{qn(field.column)} = v.{qn(field.column)}' for field in model_fields)
+    row_sql = '(' + ', '.join(['%s'] * (len(fields) + 1)) + ')'
+    with connection.cursor() as cursor:
+        for start in range(0, len(offers), BATCH_SIZE):
+            batch = offers[start:start + BATCH_SIZE]
+            params = []
+            for offer in batch:
+                params.append(offer.pk)
+                params.extend(field.get_db_prep_save(getattr(offer, field.attname), connection)
+                              for field in model_fields)
+            cursor.execute(
+                f'WITH v (id, {columns}) AS (VALUES {", ".join([row_sql] * len(batch))}) '
+                f'UPDATE {table} SET {assignments} FROM v WHERE {table}.{qn("id")} = v.id',
+                params,
+            )
+
+
+def apply_stock_updates(supplier_id, rows):
+    """
+    Обновление товаров поставщика по external_id. Возвращает результаты по строкам в порядке запроса:
+    {'external_id', 'status': updated | unchanged | not_found | invalid, 'errors' (для invalid)}
+    """
+
+    results = []
+    valid = {}
+    for row in rows:
+        values, errors = clean_row(row)
+        external_id = row.get('external_id') if isinstance(row, dict) else None
+        if not errors and values['external_id'] in valid:
+            errors = {'external_id': ['Повтор external_id в запросе.']}
+        if errors:
+            results.append({'external_id': external_id, 'status': 'invalid', 'errors': errors})
+            continue
+        external_id = values.pop('external_id')
+        valid[external_id] = values
+        results.append({'external_id': external_id, 'status': None})
+
+    with transaction.atomic():
+        # лента изменений блокируется до чтения товаров: параллельный импорт не вклинится между ними
+        lock_changes()
+        offers = {}
+        external_ids = list(valid)
+        for start in range(0, len(external_ids), BATCH_SIZE):
+            for offer in ProductSupplier.objects.select_for_update().filter(
+                    supplier_id=supplier_id, external_id__in=external_ids[start:start + BATCH_SIZE]):
+                offers.setdefault(offer.external_id, []).append(offer)
+
+        # товары группируются по набору изменившихся полей - один bulk_update на группу
+        groups = {}
+        changes = []
+        statuses = {}
+        for external_id, values in valid.items():
+            if external_id not in offers:
+                statuses[external_id] = 'not_found'
+                continue
+            statuses[external_id] = 'unchanged'
+            for offer in offers[external_id]:
+                changed = tuple(field for field, value in values.items() if getattr(offer, field) != value)
+                if not changed:
+                    continue
+                for field in changed:
+                    setattr(offer, field, values[field])
+                groups.setdefault(changed, []).append(offer)
+                changes.append(offer_change('update', offer, changed))
+                statuses[external_id] = 'updated'
+
+        for fields, group in groups.items():
+            update_offers(group, fields)
+        record_changes(changes)
+        if changes:
+            catalog_changed()
+
+    for result in results:
+        if result['status'] is None:
+            result['status'] = statuses[result['external_id']]
+    return results
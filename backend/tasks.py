@@ -1,15 +1,29 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+import yaml
 from celery import shared_task
 from django.core.mail import EmailMultiAlternatives
 from django.db import transaction
 from django.dispatch import receiver
 from django_rest_passwordreset.signals import reset_password_token_created
-from rest_framework import status
-from rest_framework.response import Response
 
 from apiorders import settings
+from backend.analytics import update_sales_rollups
+from backend.archive import archive_orders
+from backend.autocomplete import catalog_changed
+from backend.changes import offer_change, record_changes
+from backend.metrics import observe_import
 from backend.models import CustomUser, Order, ConfirmEmailToken, Supplier, ProductCategory, ProductSupplier, Product, \
     Parameter, ProductSupplierParameter
 
+logger = logging.getLogger(__name__)
+
 
 def get_order_info(order_id):
     order = Order.objects.get(id=order_id)
@@ -105,14 +119,26 @@ def send_email_password_reset_task(email, token):
     msg.send()
 
 
+# Поля товара поставщика и соответствующие им ключи в прайсе
+IMPORT_FIELDS = (('external_id', 'id'), ('model', 'model'), ('price', 'price'), ('price_rrc', 'price_rrc'),
+                 ('quantity', 'quantity'))
+
+
 @shared_task()
-def do_import_task(supplier_id, file_url, y_data):
+def do_import_task(supplier_id, file_url, y_data, validators=None):
+    """
+    Импорт прайса поставщика. validators (file_etag, file_last_modified, file_hash) сохраняются в той же
+    транзакции, только при успешном импорте - иначе следующее плановое обновление загрузит файл снова.
+    Возвращает {'error': ...}, если прайс не этого поставщика
+    """
 
+    started_at = time.perf_counter()
     with transaction.atomic():
         updated = Supplier.objects.filter(id=supplier_id, name=y_data.get('shop')).update(file_url=file_url)
         if not updated:
-            return Response({'error': f"Нет поставщика с именем {y_data.get('shop')}"},
-                            status=status.HTTP_400_BAD_REQUEST)
+            logger.warning('Прайс %s не импортирован: нет поставщика %s с именем %r',
+                           file_url, supplier_id, y_data.get('shop'))
+            return {'error': f"Нет поставщика с именем {y_data.get('shop')}"}
 
         y_categories = y_data.get('categories')
         if y_categories:
@@ -123,27 +149,148 @@ def do_import_task(supplier_id, file_url, y_data):
                 category.suppliers.add(supplier_id)
                 category.save()
 
-        ProductSupplier.objects.filter(supplier_id=supplier_id).delete()
+        # Товары обновляются на месте (id товаров поставщика не меняются), изменения пишутся в ленту
+        offers = {offer.product_id: offer for offer in ProductSupplier.objects.filter(supplier_id=supplier_id)}
+        changes = []
+        listed = set()
 
         y_products = y_data.get('goods')
         if y_products:
             for item in y_products:
                 product, _ = Product.objects.get_or_create(name=item.get('name'),
                                                            category_id=item.get('category'))
+                values = {field: ProductSupplier._meta.get_field(field).to_python(item.get(field_name))
+                          for field, field_name in IMPORT_FIELDS}
+
+                product_supplier = offers.get(product.id)
+                if product_supplier is None:
+                    # запись в ленту - сигналом post_save (backend.changes)
+                    product_supplier = ProductSupplier.objects.create(product_id=product.id,
+                                                                      supplier_id=supplier_id,
+                                                                      **values)
+                    offers[product.id] = product_supplier
+                else:
+                    changed = {field: value for field, value in values.items()
+                               if getattr(product_supplier, field) != value}
+                    if changed:
+                        ProductSupplier.objects.filter(id=product_supplier.id).update(**changed)
+                        for field, value in changed.items():
+                            setattr(product_supplier, field, value)
+                        changes.append(offer_change('update', product_supplier, changed))
+                listed.add(product_supplier.id)
+
+                parameters = item.get('parameters') or {}
+                for name, value in parameters.items():
+                    parameter, _ = Parameter.objects.get_or_create(name=name)
+                    ProductSupplierParameter.objects.update_or_create(product_supplier_id=product_supplier.id,
+                                                                      parameter_id=parameter.id,
+                                                                      defaults={'value': value})
+                ProductSupplierParameter.objects.filter(product_supplier_id=product_supplier.id).exclude(
+                    parameter__name__in=list(parameters)).delete()
+
+        record_changes(changes)
+        # товары, которых нет в новом прайсе, снимаются с продажи (запись в ленту - сигналом post_delete)
+        ProductSupplier.objects.filter(supplier_id=supplier_id).exclude(id__in=listed).delete()
+        catalog_changed()
+        if validators:
+            Supplier.objects.filter(id=supplier_id).update(**validators)
+    observe_import(time.perf_counter() - started_at, len(y_products or ()))
+
+
+_sessions = threading.local()
+
+
+def _get_session():
+    """HTTP-сессия на поток (requests.Session не потокобезопасна), соединения переиспользуются"""
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
+
+
+def fetch_price_list(supplier, host_limits, timeout):
+    """
+    Условное скачивание прайса поставщика (If-None-Match / If-Modified-Since).
+    Возвращает None, если файл не изменился, иначе словарь с данными YAML и новыми валидаторами.
+    Число одновременных запросов к одному хосту ограничивается семафором из host_limits.
+    """
+    headers = {}
+    if supplier.file_etag:
+        headers['If-None-Match'] = supplier.file_etag
+    if supplier.file_last_modified:
+        headers['If-Modified-Since'] = supplier.file_last_modified
+
+    with host_limits[urlsplit(supplier.file_url).netloc]:
+        response = _get_session().get(supplier.file_url, headers=headers, timeout=timeout)
+
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+
+    # Сервер может не поддерживать условные запросы - тогда сравниваем содержимое
+    file_hash = hashlib.sha256(response.content).hexdigest()
+    if file_hash == supplier.file_hash:
+        return None
+
+    return {'y_data': yaml.safe_load(response.content),
+            'file_etag': response.headers.get('ETag', ''),
+            'file_last_modified': response.headers.get('Last-Modified', ''),
+            'file_hash': file_hash,
+            }
 
-                product_supplier, _ = ProductSupplier.objects.get_or_create(product_id=product.id,
-                                                                            supplier_id=supplier_id,
-                                                                            external_id=item.get('id'),
-                                                                            model=item.get('model'),
-                                                                            price=item.get('price'),
-                                                                            price_rrc=item.get('price_rrc'),
-                                                                            quantity=item.get('quantity')
-                                                                            )
-                parameters = item.get('parameters')
-                if parameters:
-                    for name, value in parameters.items():
-                        parameter, _ = Parameter.objects.get_or_create(name=name)
-                        ProductSupplierParameter.objects.update_or_create(product_supplier_id=product_supplier.id,
-                                                                          parameter_id=parameter.id,
-                                                                          defaults={'value': value})
 
+@shared_task()
+def refresh_price_lists_task():
+    """
+    Плановое обновление прайсов всех доступных поставщиков.
+    Файлы скачиваются параллельно (пул потоков, ограничение на хост, таймауты, условные запросы),
+    в очередь импорта отправляются только изменившиеся.
+    """
+
+    suppliers = list(Supplier.objects.filter(is_available=True, file_url__isnull=False).exclude(file_url=''))
+    host_limits = {urlsplit(supplier.file_url).netloc:
+                   threading.BoundedSemaphore(settings.PRICE_LIST_REFRESH_PER_HOST) for supplier in suppliers}
+
+    result = {'updated': [], 'unchanged': [], 'failed': []}
+    if not suppliers:
+        return result
+
+    with ThreadPoolExecutor(max_workers=settings.PRICE_LIST_REFRESH_WORKERS) as executor:
+        futures = {executor.submit(fetch_price_list, supplier, host_limits, settings.PRICE_LIST_REFRESH_TIMEOUT):
+                   supplier for supplier in suppliers}
+        for future in as_completed(futures):
+            supplier = futures[future]
+            try:
+                data = future.result()
+            except (requests.exceptions.RequestException, yaml.YAMLError) as e:
+                logger.warning('Ошибка обновления прайса поставщика %s (%s): %s', supplier.id, supplier.file_url, e)
+                result['failed'].append(supplier.id)
+                continue
+            if data is None:
+                result['unchanged'].append(supplier.id)
+                continue
+
+            do_import_task.delay(supplier.id, supplier.file_url, data['y_data'], validators={
+                'file_etag': data['file_etag'], 'file_last_modified': data['file_last_modified'],
+                'file_hash': data['file_hash']})
+            result['updated'].append(supplier.id)
+
+    return result
+
+
+@shared_task()
+def update_sales_rollups_task(full=False):
+    """
+    Пересчет дневных итогов продаж по заказам, измененным после прошлого запуска (full=True - полный пересчет)
+    """
+
+    return update_sales_rollups(full)
+
+
+@shared_task()
+def archive_orders_task():
+    """
+    Перенос в архив заказов в конечных статусах, не менявшихся дольше ORDER_ARCHIVE_AFTER_DAYS дней
+    """
+
+    return archive_orders()
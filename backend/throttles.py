@@ -1,17 +1,151 @@
-from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+import logging
+import time
 
+import redis
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle, ScopedRateThrottle, BaseThrottle
 
-class AnonShortRateThrottle(AnonRateThrottle):
+from backend.metrics import throttle_rejected
+
+logger = logging.getLogger(__name__)
+
+
+class CountRejectionsMixin:
+    """Отказы по scope - в метрики (backend/metrics.py)"""
+
+    def throttle_failure(self):
+        throttle_rejected(self.scope)
+        return super().throttle_failure()
+
+
+class AnonShortRateThrottle(CountRejectionsMixin, AnonRateThrottle):
     scope = "anon_short"
 
 
-class AnonLongRateThrottle(AnonRateThrottle):
+class AnonLongRateThrottle(CountRejectionsMixin, AnonRateThrottle):
     scope = "anon_long"
 
 
-class UserShortRateThrottle(UserRateThrottle):
+class UserShortRateThrottle(CountRejectionsMixin, UserRateThrottle):
     scope = "user_short"
 
 
-class UserLongRateThrottle(UserRateThrottle):
-    scope = "user_long"
\ No newline at end of file
+class UserLongRateThrottle(CountRejectionsMixin, UserRateThrottle):
+    scope = "user_long"
+
+
+class ViewScopeRateThrottle(CountRejectionsMixin, ScopedRateThrottle):
+    """Лимит по throttle_scope представления (export, price_list_update, stock_update)"""
+
+
+# Скользящее окно (взвешенная сумма счетчиков текущего и предыдущего фиксированных окон) сразу для нескольких scope.
+# KEYS: пары (предыдущее окно, текущее окно) для каждого scope; ARGV: now, затем пары (limit, window).
+# Счетчики увеличиваются, только если запрос проходит по всем scope.
+# Возвращает {1, 0, 0} или {0, время ожидания в мс, номер scope, по которому отказано}.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local scopes = #KEYS / 2
+for i = 1, scopes do
+    local limit = tonumber(ARGV[2 * i])
+    local window = tonumber(ARGV[2 * i + 1])
+    local elapsed = now % window
+    local prev = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+    local cur = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+    local weight = (window - elapsed) / window
+    if prev * weight + cur + 1 > limit then
+        local wait = window - elapsed
+        if cur + 1 <= limit and prev > 0 then
+            wait = wait - (limit - 1 - cur) * window / prev
+        end
+        return {0, math.ceil(wait * 1000), i}
+    end
+end
+for i = 1, scopes do
+    local window = tonumber(ARGV[2 * i + 1])
+    redis.call('INCR', KEYS[2 * i])
+    redis.call('EXPIRE', KEYS[2 * i], math.ceil(window * 2))
+end
+return {1, 0, 0}
+"""
+
+_client = None
+_script = None
+
+
+def get_redis_script():
+    global _client, _script
+    if _script is None:
+        _client = redis.Redis.from_url(settings.THROTTLE_REDIS_URL,
+                                       socket_timeout=settings.THROTTLE_REDIS_TIMEOUT,
+                                       socket_connect_timeout=settings.THROTTLE_REDIS_TIMEOUT)
+        _script = _client.register_script(SLIDING_WINDOW_SCRIPT)
+    return _script
+
+
+def parse_rate(rate):
+    """'60/min' -> (60, 60). Формат как у DRF: <число>/<s|m|h|d...>"""
+    num, period = rate.split('/')
+    return int(num), {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+
+
+class RedisScopedRateThrottle(BaseThrottle):
+    """
+    Троттлинг с общими для всех воркеров счетчиками в Redis.
+    Заменяет четыре класса выше: все применимые к запросу scope (anon_* или user_*, а также
+    throttle_scope представления, например price_list_update) проверяются и обновляются
+    одним атомарным Lua-скриптом за одно обращение к Redis.
+    При недоступности Redis запрос пропускается (fail open).
+    """
+
+    anon_scopes = ('anon_short', 'anon_long')
+    user_scopes = ('user_short', 'user_long')
+
+    def __init__(self):
+        self.rates = api_settings.DEFAULT_THROTTLE_RATES
+        self._wait = None
+        self.failed_scope = None
+
+    def get_scopes(self, request, view):
+        """Список (scope, идентификатор клиента) для запроса"""
+
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+            scopes = list(self.user_scopes)
+        else:
+            ident = f'anon:{self.get_ident(request)}'
+            scopes = list(self.anon_scopes)
+        view_scope = getattr(view, 'throttle_scope', None)
+        if view_scope:
+            scopes.append(view_scope)
+        return [(scope, ident) for scope in scopes if self.rates.get(scope)]
+
+    def allow_request(self, request, view):
+        scopes = self.get_scopes(request, view)
+        if not scopes:
+            return True
+
+        now = time.time()
+        keys, args = [], [now]
+        for scope, ident in scopes:
+            limit, window = parse_rate(self.rates[scope])
+            current = int(now // window)
+            # hash tag {ident} - все ключи клиента в одном слоте Redis Cluster
+            keys += [f'throttle:{{{ident}}}:{scope}:{current - 1}', f'throttle:{{{ident}}}:{scope}:{current}']
+            args += [limit, window]
+
+        try:
+            allowed, wait_ms, failed_index = get_redis_script()(keys=keys, args=args)
+        except redis.exceptions.RedisError as e:
+            logger.warning('Троттлинг недоступен: %s', e)
+            return True
+
+        if allowed:
+            return True
+        self._wait = wait_ms / 1000
+        self.failed_scope = scopes[failed_index - 1][0]
+        throttle_rejected(self.failed_scope)
+        return False
+
+    def wait(self):
+        return self._wait
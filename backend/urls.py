@@ -18,9 +18,21 @@ urlpatterns = [
     path('user/profile/', UserProfileView.as_view(), name='user-profile'),
     path('category/', ProductCategoryView.as_view(), name='category'),
     path('supplier/price-list/', PriceListUpdateView.as_view(), name='supplier-price-list'),
+    path('supplier/stock/', SupplierStockView.as_view(), name='supplier-stock'),
     path('supplier/products/', ProductSupplierView.as_view(), name='supplier-products'),
+    path('supplier/products/search/', ProductSupplierSearchView.as_view(), name='supplier-products-search'),
+    path('supplier/products/autocomplete/', ProductSupplierAutocompleteView.as_view(),
+         name='supplier-products-autocomplete'),
+    path('supplier/products/changes/', ProductSupplierChangesView.as_view(), name='supplier-products-changes'),
     path('buyer/basket/', BasketView.as_view(), name='buyer-basket'),
     path('buyer/order/', BuyerOrderView.as_view(), name='buyer-order'),
     path('supplier/order/', SupplierOrderGetView.as_view(), name='supplier-order'),
+    path('export/catalog/', CatalogExportView.as_view(), name='export-catalog'),
+    path('buyer/order/export/', BuyerOrderExportView.as_view(), name='buyer-order-export'),
+    path('supplier/order/export/', SupplierOrderExportView.as_view(), name='supplier-order-export'),
+    path('supplier/analytics/', SupplierSalesAnalyticsView.as_view(), name='supplier-analytics'),
+    path('profiles/', ProfileListView.as_view(), name='profiles'),
+    path('profiles/<slug:name>/<slug:kind>/', ProfileFileView.as_view(), name='profile-file'),
+    path('request-stats/', RequestStatsView.as_view(), name='request-stats'),
 ]
 urlpatterns += router.urls
@@ -1,12 +1,21 @@
-import requests
+import hashlib
+import os
+from functools import cached_property
+
+import httpx
 import yaml
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
-from django.db.models import Q, Sum, F
+from django.db.models import Q, Sum, F, Case, When
+from django.http import StreamingHttpResponse, HttpResponse, Http404, FileResponse
+from django.urls import reverse
+from django.utils import timezone
 from drf_social_oauth2.views import ConvertTokenView
 from drf_spectacular.utils import extend_schema
 from rest_framework import generics, views, viewsets, status
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.db import IntegrityError
@@ -14,13 +23,27 @@ from rest_framework.authentication import TokenAuthentication, BasicAuthenticati
 from yaml import SafeLoader
 
 from apiorders.schema import extend_schema_data
+from backend.analytics import sales_report
+from backend.archive import archive_needed
+from backend.async_views import AsyncAPIView
+from backend.authentication import set_snapshot
+from backend.autocomplete import complete
+from backend.changes import get_changes, get_last_cursor
+from backend.exports import CATALOG_FIELDS, ORDER_ITEM_FIELDS, catalog_rows, order_item_rows, ndjson_lines, \
+    csv_lines, buffered
+from backend import metrics, profiling
+from backend.fast_read import product_supplier_rows, basket_rows, buyer_order_rows, supplier_order_rows
 from backend.models import CustomUser, Buyer, ConfirmEmailToken, Supplier, ProductCategory, ProductSupplier, \
-    Order, OrderItem
+    Order, OrderItem, SalesRollup, ArchivedOrderItem
 from backend.permissions import *
+from backend.renderers import NDJSONRenderer, CSVRenderer
+from backend.request_stats import request_stats
 from backend.serializers import RegisterAccountSerializer, UserProfileSerializer, BuyerSerializer, SupplierSerializer, \
-    ProductCategorySerializer, PriceListUpdateSerializer, ProductSupplierSerializer, OrderItemSerializer, \
-    BasketGetSerializer, BuyerOrderGetSerializer, SupplierOrdertGetSerializer, BasketPostRequestSerializer, \
-    BasketDeletetRequestSerializer, BuyerOrderPostRequestSerializer
+    ProductCategorySerializer, PriceListUpdateSerializer, OrderItemSerializer, BasketPostRequestSerializer, \
+    BasketDeletetRequestSerializer, BuyerOrderPostRequestSerializer, StockUpdateSerializer, \
+    SalesAnalyticsQuerySerializer, OrderHistoryQuerySerializer
+from backend.search import search_offers
+from backend.stock import apply_stock_updates
 from backend.signals import user_registered, new_orders_to_user, new_orders_to_admin
 from backend.tasks import send_email_new_order_task, send_email_user_register_task, do_import_task
 from django.contrib.auth.password_validation import validate_password
@@ -123,6 +146,8 @@ class LoginView(views.APIView):
             return Response({'error': 'Неверный пароль'},
                             status=status.HTTP_401_UNAUTHORIZED)
         token, _ = Token.objects.get_or_create(user=user)
+        # Обновляем снимок пользователя в кэше аутентификации
+        set_snapshot(token.key, user)
         return Response({'success': 'Успешный вход. Используйте токен в дальнейших запросах',
                          'token': token.key}, status=status.HTTP_200_OK)
 
@@ -133,17 +158,21 @@ class UserProfileView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsOwner, IsAuthenticated]
     serializer_class = UserProfileSerializer
 
+    def get_object(self):
+        # request.user от CachedTokenAuthentication содержит только снимок полей, профиль загружаем целиком
+        return CustomUser.objects.get(pk=self.request.user.pk)
+
     def get(self, request, *args, **kwargs):
         """Просмотр профиля"""
 
-        user = request.user
+        user = self.get_object()
         serializer = self.get_serializer(user)
         return Response(serializer.data)
 
     def update(self, request, *args, **kwargs):
         """Обновление профиля"""
 
-        user = request.user
+        user = self.get_object()
         serializer = self.get_serializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
 
@@ -152,6 +181,7 @@ class UserProfileView(generics.RetrieveUpdateDestroyAPIView):
             user.email = request.data['email']
             user.email_confirmed = False
             user.save()
+            # удаление токенов сбрасывает и их кэш аутентификации (backend.authentication.token_deleted)
             Token.objects.filter(user=user).delete()
             send_email_user_register_task(user.id)
             # user_registered.send(sender=self.__class__, instance=user)
@@ -175,9 +205,10 @@ class UserProfileView(generics.RetrieveUpdateDestroyAPIView):
     def delete(self, request, *args, **kwargs):
         """Удаление профиля. Не физическое удаление, а is_active=False, что для пользователя равносильно удалению"""
 
-        user = request.user
+        user = self.get_object()
         user.is_active = False
         user.save()
+        # удаление токенов сбрасывает и их кэш аутентификации (backend.authentication.token_deleted)
         Token.objects.filter(user=user).delete()
         return Response({'success': 'Аккаунт удален'}, status=status.HTTP_200_OK)
 
@@ -221,10 +252,11 @@ class ProductCategoryView(generics.ListAPIView):
 
 
 
-class PriceListUpdateView(views.APIView):
+class PriceListUpdateView(AsyncAPIView):
     """
     Обновление из файла. Пользователь отправляет post-запрос.
     Обязательные поля: supplier_id и file_url
+    Файл загружается без блокировки потока (httpx.AsyncClient), импорт - в потоке запроса
     """
 
     permission_classes = [IsAuthenticated, IsSupplier]
@@ -233,16 +265,14 @@ class PriceListUpdateView(views.APIView):
     @extend_schema(
         request=extend_schema_data['PriceListUpdateView']['request'],
     )
-    def post(self, request):
+    async def post(self, request):
         serializer = PriceListUpdateSerializer(data=request.data)
         if serializer.is_valid():
             file_url = serializer.validated_data['file_url']
             supplier_id = serializer.validated_data['supplier_id']
             user_id = request.user.id
 
-            try:
-                supplier = Supplier.objects.get(id=supplier_id, user_id=user_id)
-            except Supplier.DoesNotExist:
+            if not await Supplier.objects.filter(id=supplier_id, user_id=user_id).aexists():
                 return Response({'error': f'У пользователя нет поставщика с id={supplier_id}'},
                                 status=status.HTTP_400_BAD_REQUEST)
 
@@ -251,22 +281,62 @@ class PriceListUpdateView(views.APIView):
                                 status=status.HTTP_400_BAD_REQUEST)
 
             try:
-                response = requests.get(file_url)
+                async with httpx.AsyncClient(timeout=settings.PRICE_LIST_REFRESH_TIMEOUT,
+                                             follow_redirects=True) as client:
+                    response = await client.get(file_url)
                 response.raise_for_status()
                 # y_data = yaml.load(response.content, Loader=SafeLoader)
                 y_data = yaml.safe_load(response.content)
-            except (requests.exceptions.RequestException, yaml.YAMLError) as e:
+            except (httpx.HTTPError, yaml.YAMLError) as e:
                 return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
                 # return Response({'error': 'Некорректный  YAML-файл'}, status=status.HTTP_400_BAD_REQUEST)
 
-            do_import_task(supplier_id, file_url, y_data)
+            # Версия файла сохраняется с импортом, чтобы плановое обновление не импортировало его повторно
+            result = await sync_to_async(do_import_task)(supplier_id, file_url, y_data, validators={
+                'file_etag': response.headers.get('ETag', ''),
+                'file_last_modified': response.headers.get('Last-Modified', ''),
+                'file_hash': hashlib.sha256(response.content).hexdigest(),
+            })
+            if result and 'error' in result:
+                return Response(result, status=status.HTTP_400_BAD_REQUEST)
 
             return Response({'success': True}, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProductSupplierView(views.APIView):
+class SupplierStockView(views.APIView):
+    """
+    Обновление цен и остатков товаров поставщика по external_id без загрузки прайса.
+    Формат запроса: {"supplier_id": <id>, "items": [{"external_id": <id>, "price": ..., "price_rrc": ..., "quantity": ...}, ...]}
+    (в строке - external_id и любые из остальных полей). Результат - по каждой строке.
+    """
+
+    permission_classes = [IsAuthenticated, IsSupplier]
+    throttle_scope = 'stock_update'
+
+    @extend_schema(
+        request=extend_schema_data['SupplierStockView']['request'],
+        responses=extend_schema_data['SupplierStockView']['responses'],
+    )
+    def post(self, request):
+        serializer = StockUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        supplier_id = serializer.validated_data['supplier_id']
+        if not Supplier.objects.filter(id=supplier_id, user_id=request.user.id).exists():
+            return Response({'error': f'У пользователя нет поставщика с id={supplier_id}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = apply_stock_updates(supplier_id, serializer.validated_data['items'])
+        counts = {key: 0 for key in ('updated', 'unchanged', 'not_found', 'invalid')}
+        for result in results:
+            counts[result['status']] += 1
+        return Response({**counts, 'results': results}, status=status.HTTP_200_OK)
+
+
+class ProductSupplierView(AsyncAPIView):
     """
     Просмотр товаров доступных поставщиков c возможностью выбора (через параметры запроса)
     по отдельным категориям, поставщикам, продуктам ('category_id, 'supplier_id, product_id)
@@ -276,7 +346,7 @@ class ProductSupplierView(views.APIView):
         responses=extend_schema_data['ProductSupplierView']['responses'],
         parameters=extend_schema_data['ProductSupplierView']['parameters'],
     )
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
 
         # Если в запросе есть параметры supplier_id или category_id или product_id
         supplier_id = request.query_params.get('supplier_id')
@@ -290,31 +360,100 @@ class ProductSupplierView(views.APIView):
             query &= Q(product__category_id=category_id)
         if product_id:
             query &= Q(product_id=product_id)
-        # Queryset c оптимизацией запросов к базе данных
-        # select_related - когда выбираем один объект, prefetch_related - при выдаче нескольких объектов)
-        queryset = ProductSupplier.objects.filter(
-            query
-        ).select_related(
-            'supplier', 'product__category'
-        ).prefetch_related(
-            'p_parameters__parameter'
-        ).distinct()
-
-        serializer = ProductSupplierSerializer(queryset, many=True)
-        return Response(serializer.data)
+        # Строки собираются напрямую из .values_list() (backend/fast_read.py), формат - ProductSupplierSerializer
+        queryset = ProductSupplier.objects.filter(query).order_by('id')
+        return Response(await sync_to_async(product_supplier_rows)(queryset))
 
 
-class BasketView(views.APIView):
-    """Корзины покупателей: просмотр, создание/изменение, удаление"""
+class ProductSupplierChangesView(views.APIView):
+    """
+    Лента изменений каталога: ?since=<cursor> - изменения после курсора (сжатые до последнего состояния товара).
+    Без since возвращается только текущий курсор: клиент запоминает его, загружает каталог полностью
+    (ProductSupplierView или выгрузка) и дальше запрашивает изменения с этого курсора
+    """
+
+    @extend_schema(
+        responses=extend_schema_data['ProductSupplierChangesView']['responses'],
+        parameters=extend_schema_data['ProductSupplierChangesView']['parameters'],
+    )
+    def get(self, request, *args, **kwargs):
+        since = request.query_params.get('since')
+        limit = request.query_params.get('limit', settings.CHANGES_FEED_LIMIT)
+        try:
+            limit = min(int(limit), settings.CHANGES_FEED_LIMIT)
+            since = None if since is None else int(since)
+        except ValueError:
+            return Response({'error': 'since и limit должны быть целыми числами'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1 or since is not None and since < 0:
+            return Response({'error': 'Некорректные значения since или limit'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if since is None:
+            return Response({'cursor': get_last_cursor(), 'has_more': False, 'changes': []})
+        changes, cursor, has_more = get_changes(since, limit)
+        return Response({'cursor': cursor, 'has_more': has_more, 'changes': changes})
+
+
+class ProductSupplierSearchView(generics.GenericAPIView):
+    """
+    Поиск товаров доступных поставщиков (?q=) по названию продукта, модели и значениям параметров,
+    по убыванию релевантности, с разбивкой на страницы (?page=). Формат строк - как у ProductSupplierView
+    """
+
+    @extend_schema(
+        responses=extend_schema_data['ProductSupplierSearchView']['responses'],
+        parameters=extend_schema_data['ProductSupplierSearchView']['parameters'],
+    )
+    def get(self, request, *args, **kwargs):
+        query = ' '.join(request.query_params.get('q', '').split())
+        if not settings.SEARCH_QUERY_MIN_LENGTH <= len(query) <= settings.SEARCH_QUERY_MAX_LENGTH:
+            return Response({'error': f'Длина запроса q - от {settings.SEARCH_QUERY_MIN_LENGTH} '
+                                      f'до {settings.SEARCH_QUERY_MAX_LENGTH} символов'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        page_ids = self.paginate_queryset(search_offers(query).values_list('id', flat=True))
+        # строки страницы в порядке релевантности
+        queryset = ProductSupplier.objects.filter(id__in=page_ids).order_by(
+            Case(*[When(id=ps_id, then=position) for position, ps_id in enumerate(page_ids)]))
+        return self.get_paginated_response(product_supplier_rows(queryset))
+
+
+class ProductSupplierAutocompleteView(views.APIView):
+    """
+    Подсказки при вводе (?q=) - названия продуктов и модели, начинающиеся с q (с начала любого слова).
+    Сначала подсказки с товаром в наличии у доступных поставщиков, затем по убыванию остатка (?limit= - число подсказок)
+    """
+
+    @extend_schema(
+        responses=extend_schema_data['ProductSupplierAutocompleteView']['responses'],
+        parameters=extend_schema_data['ProductSupplierAutocompleteView']['parameters'],
+    )
+    def get(self, request, *args, **kwargs):
+        query = ' '.join(request.query_params.get('q', '').split())
+        if not settings.SEARCH_QUERY_MIN_LENGTH <= len(query) <= settings.SEARCH_QUERY_MAX_LENGTH:
+            return Response({'error': f'Длина запроса q - от {settings.SEARCH_QUERY_MIN_LENGTH} '
+                                      f'до {settings.SEARCH_QUERY_MAX_LENGTH} символов'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', settings.AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit должен быть целым числом'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limit <= settings.AUTOCOMPLETE_MAX_LIMIT:
+            return Response({'error': f'limit - от 1 до {settings.AUTOCOMPLETE_MAX_LIMIT}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'suggestions': complete(query, limit)})
+
+
+class BasketView(AsyncAPIView):
+    """Корзины покупателей: просмотр (async), создание/изменение, удаление"""
 
     permission_classes = [IsAuthenticated, IsBuyer]
 
-    def setup(self, request, *args, **kwargs):
-        """Initialize attributes shared by all view methods."""
-        super().setup(request, *args, **kwargs)
-        self.product_supplier_map = {}
-        for ps in ProductSupplier.objects.filter(supplier__is_available=True):
-            self.product_supplier_map[(ps.product_id, ps.supplier_id)] = ps
+    @cached_property
+    def product_supplier_map(self):
+        """Товары доступных поставщиков по (product_id, supplier_id) - для post"""
+        return {(ps.product_id, ps.supplier_id): ps
+                for ps in ProductSupplier.objects.filter(supplier__is_available=True)}
 
     def _is_valid_values(self, items):
         """
@@ -363,6 +502,7 @@ class BasketView(views.APIView):
                 return Response({'error': f'Некорректный {buyer_id=}'}, status=status.HTTP_400_BAD_REQUEST)
             if not self._is_valid_values(items):
                 return Response({'error': f'Некорректные значения в items для {buyer_id=}'}, status=status.HTTP_400_BAD_REQUEST)
+            # корзина у покупателя одна (unique_basket_per_buyer): при гонке get_or_create получит созданную
             order, _ = Order.objects.get_or_create(buyer_id=buyer_id, state='basket')
             objects_added = 0
             for item in items:
@@ -438,106 +578,33 @@ class BasketView(views.APIView):
             return Response(response_data, status=status.HTTP_206_PARTIAL_CONTENT)
 
     @extend_schema(responses=extend_schema_data['BasketView']['responses'])
-    def get(self, request):
+    async def get(self, request):
         """Просмотр корзины каждого покупателя, созданного пользователем"""
 
-        user = request.user
-        buyers = user.buyers.all()
-        orders = Order.objects.filter(buyer__in=buyers, state='basket').select_related('buyer')
-
-        data = []
-        # Цикл по корзинам (по сути по покупателям, т.к. у одного покупателя только одна корзина)
-        for order in orders:
-            order_items = OrderItem.objects.filter(order=order).select_related('product_supplier')
-
-            order_items_data = []
-            order_sum = 0
-
-            # Цикл по позициям корзины покупателя
-            for order_item in order_items:
-                product_supplier = order_item.product_supplier
-                item_sum = product_supplier.price * order_item.quantity
-                order_item_data = {
-                    'id': order_item.id,
-                    'product_supplier_id': product_supplier.id,
-                    'product_name': product_supplier.product.name,
-                    'quantity': order_item.quantity,
-                    'sum': item_sum
-                }
-                # добавляем данные по отдельной позиции корзины
-                order_items_data.append(order_item_data)
-                order_sum += item_sum
-
-            # добавляем блок данных по корзине покупателя
-            data.append({
-                'buyer_id': order.buyer.id,
-                'order_id': order.id,
-                'order_sum': order_sum,
-                'order_items': order_items_data,
-            })
-        serializer = BasketGetSerializer(data, many=True)
-        return Response(serializer.data)
+        # формат - BasketGetSerializer, данные собираются без сериализатора (backend/fast_read.py)
+        return Response(await sync_to_async(basket_rows)(request.user))
 
 
-class BuyerOrderView(views.APIView):
+class BuyerOrderView(AsyncAPIView):
     """
     Получение и размещение заказов покупателей пользователем
     """
 
     permission_classes = [IsAuthenticated, IsBuyer]
 
-    @extend_schema(responses=extend_schema_data['BuyerOrderView']['responses'])
-    def get(self, request):
-        """Просмотр заказов покупателей"""
+    @extend_schema(
+        responses=extend_schema_data['BuyerOrderView']['responses'],
+        parameters=extend_schema_data['OrderHistory']['parameters'],
+    )
+    async def get(self, request):
+        """Просмотр заказов покупателей (?date_from=&date_to= - по дате создания, старые заказы - из архива)"""
 
-        user = request.user
-        buyers = user.buyers.all()
-
-        buyer_data = []
-        # Цикл по покупателям, созданных пользователем
-        for buyer in buyers:
-            orders = Order.objects.filter(buyer=buyer).exclude(state='basket')
-
-            orders_data = []
-            buyer_sum = 0
-            # Цикл по заказам покупателя
-            for order in orders:
-                order_items = OrderItem.objects.filter(order=order)
-
-                order_items_data = []
-                order_sum = 0
-                # Цикл по позициям заказа
-                for order_item in order_items:
-                    product_supplier = order_item.product_supplier
-                    item_sum = product_supplier.price * order_item.quantity
-                    order_item_data = {
-                        'id': order_item.id,
-                        'product_supplier_id': product_supplier.id,
-                        'product_name': product_supplier.product.name,
-                        'quantity': order_item.quantity,
-                        'sum': item_sum
-                    }
-                    # добавляем данные по отдельной позиции заказа
-                    order_items_data.append(order_item_data)
-                    order_sum += item_sum
-
-                # добавляем блок данных по заказу
-                orders_data.append({
-                    'id': order.id,
-                    'state': order.state,
-                    'order_sum': order_sum,
-                    'order_items': order_items_data,
-                })
-                buyer_sum += order_sum
-
-            # добавляем блок данных по покупателю
-            buyer_data.append({
-                'buyer_id': buyer.id,
-                'buyer_sum': buyer_sum,
-                'orders': orders_data,
-            })
-        serializer = BuyerOrderGetSerializer(buyer_data, many=True)
-        return Response(serializer.data)
+        serializer = OrderHistoryQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        # формат - BuyerOrderGetSerializer, данные собираются без сериализатора (backend/fast_read.py)
+        return Response(await sync_to_async(buyer_order_rows)(
+            request.user, archive=archive_needed(params.get('date_from')), **params))
 
     @extend_schema(
                     request=extend_schema_data['BuyerOrderView_POST']['request'],
@@ -572,7 +639,8 @@ class BuyerOrderView(views.APIView):
         if not to_place_orders_ids:
             return Response({'error': f'Некорректные значения id: {r_orders_ids}'}, status=status.HTTP_400_BAD_REQUEST)
         placed_orders = Order.objects.filter(id__in=to_place_orders_ids)
-        updated = placed_orders.update(state='new')
+        # update() не обновляет auto_now поля: updated_at нужен для пересчета итогов продаж
+        updated = placed_orders.update(state='new', updated_at=timezone.now())
         # updated = Order.objects.filter(id__in=to_place_orders_ids).update(state='new')
 
         if updated:
@@ -590,71 +658,186 @@ class BuyerOrderView(views.APIView):
         return Response({'error': f'Проблемы с обновлением'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class SupplierOrderGetView(views.APIView):
+class SupplierOrderGetView(AsyncAPIView):
     """
     Получения поставщиками информации о заказанных позициях (по товарам из их прайса)
     """
 
     permission_classes = [IsAuthenticated, IsSupplier]
 
-    @extend_schema(responses=extend_schema_data['SupplierOrderGetView']['responses'])
-    def get(self, request):
-        """Просмотр заказов покупателей"""
+    @extend_schema(
+        responses=extend_schema_data['SupplierOrderGetView']['responses'],
+        parameters=extend_schema_data['OrderHistory']['parameters'],
+    )
+    async def get(self, request):
+        """Просмотр заказов покупателей (?date_from=&date_to= - по дате создания, старые заказы - из архива)"""
 
-        user = request.user
-        suppliers = user.suppliers.all()
-
-        supplier_data = []
-        # Цикл по поставщикам пользователя
-        for supplier in suppliers:
-            orders = Order.objects.filter(
-                order_items__product_supplier__supplier=supplier).exclude(
-                state='basket').distinct()
-
-            orders_data = []
-            supplier_sum = 0
-            # Цикл по заказам покупателя
-            for order in orders:
-                order_items = OrderItem.objects.filter(order=order)
-
-                order_items_data = []
-                order_sum = 0
-                # Цикл по позициям заказа
-                for order_item in order_items:
-                    product_supplier = order_item.product_supplier
-
-                    if product_supplier.supplier.id != supplier.id:
-                        continue
-                    item_sum = product_supplier.price * order_item.quantity
-                    order_item_data = {
-                        'product_supplier_id': product_supplier.id,
-                        'product_name': product_supplier.product.name,
-                        'external_id': product_supplier.external_id,
-                        'quantity': order_item.quantity,
-                        'sum': item_sum
-                    }
-                    # добавляем данные по отдельной позиции заказа
-                    order_items_data.append(order_item_data)
-                    order_sum += item_sum
-
-                # добавляем блок данных по заказу
-                orders_data.append({
-                    'id': order.id,
-                    'buyer_id': order.buyer.id,
-                    'state': order.state,
-                    'order_sum': order_sum,
-                    'order_items': order_items_data,
-                })
-                supplier_sum += order_sum
-
-            # добавляем блок данных по покупателю
-            supplier_data.append({
-                'supplier_id': supplier.id,
-                'supplier_sum': supplier_sum,
-                'orders': orders_data,
-            })
-        serializer = SupplierOrdertGetSerializer(supplier_data, many=True)
-        return Response(serializer.data)
+        serializer = OrderHistoryQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        # формат - SupplierOrdertGetSerializer, данные собираются без сериализатора (backend/fast_read.py)
+        return Response(await sync_to_async(supplier_order_rows)(
+            request.user, archive=archive_needed(params.get('date_from')), **params))
+
+
+class SupplierSalesAnalyticsView(views.APIView):
+    """
+    Аналитика продаж по товарам поставщиков пользователя (по дневным итогам, backend/analytics.py):
+    итоги по дням, неделям или месяцам, по категориям и лучшие продукты по сумме.
+    Без state учитываются все статусы, кроме отмененных
+    """
+
+    permission_classes = [IsAuthenticated, IsSupplier]
+
+    @extend_schema(
+        responses=extend_schema_data['SupplierSalesAnalyticsView']['responses'],
+        parameters=extend_schema_data['SupplierSalesAnalyticsView']['parameters'],
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = SalesAnalyticsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        rollups = SalesRollup.objects.filter(supplier__user=request.user)
+        if 'supplier_id' in params:
+            rollups = rollups.filter(supplier_id=params['supplier_id'])
+        if 'category_id' in params:
+            rollups = rollups.filter(category_id=params['category_id'])
+        if params.get('state'):
+            rollups = rollups.filter(state__in=params['state'])
+        else:
+            rollups = rollups.exclude(state='canceled')
+        return Response(sales_report(rollups, params['date_from'], params['date_to'], params['interval'],
+                                     params['top']))
+
+
+class ExportView(views.APIView):
+    """
+    Базовый класс потоковых выгрузок: формат выбирается параметром ?format=ndjson|csv или заголовком Accept
+    (по умолчанию NDJSON), строки отдаются по мере чтения из БД. Строки читаются синхронно, под ASGI
+    такие запросы выполняет WSGI-обработчик в отдельном потоке (apiorders.asgi)
+    """
+
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    throttle_scope = 'export'
+    fields = ()
+    filename = 'export'
+
+    def get_rows(self, request):
+        raise NotImplementedError
+
+    @extend_schema(
+        responses=extend_schema_data['ExportView']['responses'],
+        parameters=extend_schema_data['ExportView']['parameters'],
+    )
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        rows = self.get_rows(request)
+        if renderer.format == 'csv':
+            lines = csv_lines(rows, self.fields)
+        else:
+            lines = ndjson_lines(rows)
+
+        response = StreamingHttpResponse(buffered(lines), content_type=renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.{renderer.format}"'
+        return response
+
+
+class CatalogExportView(ExportView):
+    """Выгрузка товаров доступных поставщиков (фильтры как у ProductSupplierView)"""
+
+    fields = CATALOG_FIELDS
+    filename = 'catalog'
+
+    @extend_schema(
+        responses=extend_schema_data['ExportView']['responses'],
+        parameters=extend_schema_data['ExportView']['parameters'] + extend_schema_data['ProductSupplierView'][
+            'parameters'],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_rows(self, request):
+        query = Q(supplier__is_available=True)
+        for param, lookup in (('supplier_id', 'supplier_id'), ('category_id', 'product__category_id'),
+                              ('product_id', 'product_id')):
+            value = request.query_params.get(param)
+            if value:
+                query &= Q(**{lookup: value})
+        return catalog_rows(ProductSupplier.objects.filter(query))
+
+
+class BuyerOrderExportView(ExportView):
+    """Выгрузка позиций всех заказов покупателей пользователя (без корзин)"""
+
+    permission_classes = [IsAuthenticated, IsBuyer]
+    fields = ORDER_ITEM_FIELDS
+    filename = 'buyer_orders'
+
+    def get_rows(self, request):
+        return order_item_rows(OrderItem.objects.filter(order__buyer__user=request.user).exclude(
+            order__state='basket'), ArchivedOrderItem.objects.filter(order__buyer__user=request.user))
+
+
+class SupplierOrderExportView(ExportView):
+    """Выгрузка заказанных позиций по товарам поставщиков пользователя"""
+
+    permission_classes = [IsAuthenticated, IsSupplier]
+    fields = ORDER_ITEM_FIELDS
+    filename = 'supplier_orders'
+
+    def get_rows(self, request):
+        return order_item_rows(OrderItem.objects.filter(product_supplier__supplier__user=request.user).exclude(
+            order__state='basket'), ArchivedOrderItem.objects.filter(supplier__user=request.user))
+
+
+class ProfileListView(views.APIView):
+    """Сохраненные профили запросов (backend/profiling.py), новые - первыми. Только для сотрудников"""
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(exclude=True)
+    def get(self, request, *args, **kwargs):
+        profiles = profiling.list_profiles()
+        for profile in profiles:
+            profile['urls'] = {kind: request.build_absolute_uri(reverse(
+                'backend:profile-file', args=[profile['name'], kind])) for kind in profile['files']}
+            if 'prof' in profile['files']:
+                profile['urls']['stats'] = request.build_absolute_uri(reverse(
+                    'backend:profile-file', args=[profile['name'], 'stats']))
+        return Response(profiles)
+
+
+class ProfileFileView(views.APIView):
+    """
+    Файл профиля: json - описание, folded - стеки для flamegraph, prof - cProfile (pstats),
+    stats - функции с наибольшим суммарным временем текстом
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(exclude=True)
+    def get(self, request, name, kind, *args, **kwargs):
+        path = profiling.profile_path(name, 'prof' if kind == 'stats' else kind)
+        if path is None:
+            raise Http404
+        if kind == 'stats':
+            return HttpResponse(profiling.stats_text(path), content_type='text/plain; charset=utf-8')
+        return FileResponse(open(path, 'rb'), as_attachment=kind == 'prof', filename=f'{name}.{kind}',
+                            content_type=profiling.FILE_TYPES[kind])
+
+
+class RequestStatsView(views.APIView):
+    """
+    Итоги запросов по представлениям (backend/request_stats.py) процесса, обработавшего запрос: при нескольких
+    воркерах - только одного из них. Только для сотрудников
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(exclude=True)
+    def get(self, request, *args, **kwargs):
+        return Response({'pid': os.getpid(), 'views': request_stats.snapshot()})
 
 
 class CustomConvertTokenView(ConvertTokenView):
@@ -667,3 +850,13 @@ class CustomConvertTokenView(ConvertTokenView):
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
+
+def metrics_view(request):
+    """Метрики Prometheus (backend/metrics.py), без троттлинга и аутентификации DRF"""
+
+    if not metrics.metrics_enabled():
+        raise Http404
+    if not metrics.metrics_allowed(request):
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    data, content_type = metrics.render_metrics()
+    return HttpResponse(data, content_type=content_type)
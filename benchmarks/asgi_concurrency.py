@@ -0,0 +1,214 @@
+"""
+Одновременные запросы под ASGI (uvicorn, async-представления) и WSGI (gunicorn gthread) при равной памяти.
+
+Оба сервера - один процесс-обработчик: uvicorn с одним воркером и gunicorn с одним воркером и --threads
+потоками. Под WSGI число одновременно обрабатываемых запросов ограничено потоками (каждый поток - стек и
+соединение с БД), async-представление под ASGI ждет БД и внешний HTTP без занятого потока. Для каждого
+сценария и уровня --concurrency клиенты (httpx.AsyncClient) отправляют запросы --duration секунд; итог -
+запросов в секунду, p50/p95 (мс), ошибки и RSS процессов сервера после прогона, МБ (сравнимость памяти).
+
+Сценарии: products - каталог, basket - корзина, orders - история заказов, price-list - загрузка прайса,
+файл которого локальный HTTP-сервер отдает с задержкой --fetch-delay (медленный сервер поставщика).
+БД - из переменных POSTGRES_* (мигрирована), пользователи теста создаются и удаляются бенчмарком,
+троттлинг выключен (THROTTLING=off), DEBUG=off.
+
+    python -m benchmarks.asgi_concurrency
+    python -m benchmarks.asgi_concurrency --scenario price-list --concurrency 8,32,128 --threads 8 --save asgi.json
+"""
+import argparse
+import asyncio
+import functools
+import http.server
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import setup_django, summary, print_table
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    'products': ('GET', '/api/v1/supplier/products/', 'buyer'),
+    'basket': ('GET', '/api/v1/buyer/basket/', 'buyer'),
+    'orders': ('GET', '/api/v1/buyer/order/', 'buyer'),
+    'price-list': ('POST', '/api/v1/supplier/price-list/', 'supplier'),
+}
+
+
+def server_command(server, port, threads):
+    if server == 'asgi':
+        return [sys.executable, '-m', 'uvicorn', 'apiorders.asgi:application', '--port', str(port),
+                '--workers', '1', '--no-access-log', '--log-level', 'warning']
+    return [sys.executable, '-m', 'gunicorn', 'apiorders.wsgi:application', '--bind', f'127.0.0.1:{port}',
+            '--workers', '1', '--worker-class', 'gthread', '--threads', str(threads), '--log-level', 'warning']
+
+
+def start_server(server, port, threads):
+    env = {**os.environ, 'THROTTLING': 'off', 'DEBUG': 'off'}
+    process = subprocess.Popen(server_command(server, port, threads), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    host = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            if httpx.get(f'{host}/api/v1/category/', timeout=1).status_code == 200:
+                return process, host
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{server}: сервер не запустился')
+
+
+def tree_rss(pid):
+    """RSS процесса и его потомков (gunicorn: мастер и воркер), МБ. Только Linux (/proc)"""
+
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as file:
+                ppid = int(file.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status') as file:
+                total += next(int(line.split()[1]) for line in file if line.startswith('VmRSS:'))
+        except (OSError, StopIteration):
+            continue
+    return round(total / 1024, 1)
+
+
+class SlowHandler(http.server.SimpleHTTPRequestHandler):
+    delay = 0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_price_lists(directory, delay):
+    """Прайсы с задержкой ответа delay, с. Возвращает (сервер, адрес)"""
+
+    handler = type('Handler', (SlowHandler,), {'delay': delay})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(handler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def create_users(run_id, price_dir, price_host):
+    """Покупатель и поставщик с токенами (напрямую в БД), прайс поставщика без товаров"""
+
+    from rest_framework.authtoken.models import Token
+    from backend.models import Buyer, CustomUser, Supplier
+
+    buyer_user = CustomUser.objects.create_user(email=f'asgi-{run_id}-buyer@bench.test', password=run_id,
+                                                is_active=True, type='buyer')
+    Buyer.objects.create(user=buyer_user, name=f'asgi {run_id}')
+    supplier_user = CustomUser.objects.create_user(email=f'asgi-{run_id}-supplier@bench.test', password=run_id,
+                                                   is_active=True, type='supplier')
+    supplier = Supplier.objects.create(user=supplier_user, name=f'asgi {run_id}')
+    Path(price_dir, f'{run_id}.yaml').write_text(f'shop: asgi {run_id}\ncategories: []\ngoods: []\n',
+                                                 encoding='utf-8')
+    return {
+        'buyer': {'token': Token.objects.create(user=buyer_user).key},
+        'supplier': {'token': Token.objects.create(user=supplier_user).key,
+                     'body': {'supplier_id': supplier.id, 'file_url': f'{price_host}/{run_id}.yaml'}},
+    }, [buyer_user, supplier_user]
+
+
+async def load(host, scenario, users, concurrency, duration):
+    """concurrency клиентов duration секунд: (длительности, мс; ошибки; время прогона, с)"""
+
+    method, path, who = SCENARIOS[scenario]
+    headers = {'Authorization': f'Token {users[who]["token"]}'}
+    body = users[who].get('body')
+    timings, errors = [], 0
+
+    async def worker(client, deadline):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, host + path, json=body, headers=headers)
+                errors += response.status_code >= 400
+            except httpx.HTTPError:
+                errors += 1
+            timings.append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, started + duration) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return timings, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='по умолчанию - все')
+    parser.add_argument('--server', action='append', choices=['asgi', 'wsgi'], help='по умолчанию - оба')
+    parser.add_argument('--concurrency', default='1,16,64', help='уровни одновременных клиентов через запятую')
+    parser.add_argument('--duration', type=float, default=10, help='секунд на уровень')
+    parser.add_argument('--threads', type=int, default=8, help='потоков gunicorn (WSGI)')
+    parser.add_argument('--fetch-delay', type=float, default=0.2, help='задержка ответа сервера прайсов, с')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--save', help='сохранить результаты в JSON')
+    args = parser.parse_args()
+
+    setup_django()
+    run_id = uuid.uuid4().hex[:8]
+    levels = [int(level) for level in args.concurrency.split(',')]
+    rows = []
+    with tempfile.TemporaryDirectory() as price_dir:
+        price_server, price_host = serve_price_lists(price_dir, args.fetch_delay)
+        users, created = create_users(run_id, price_dir, price_host)
+        try:
+            for server in args.server or ['asgi', 'wsgi']:
+                process, host = start_server(server, args.port, args.threads)
+                try:
+                    for scenario in args.scenario or list(SCENARIOS):
+                        asyncio.run(load(host, scenario, users, 1, 1))  # прогрев
+                        for concurrency in levels:
+                            timings, errors, elapsed = asyncio.run(
+                                load(host, scenario, users, concurrency, args.duration))
+                            result = summary(timings)
+                            rows.append({'scenario': scenario, 'server': server, 'concurrency': concurrency,
+                                         'rps': round(result['count'] / elapsed, 1), 'p50': result['p50'],
+                                         'p95': result['p95'], 'errors': errors, 'rss_mb': tree_rss(process.pid)})
+                            print(rows[-1])
+                finally:
+                    process.terminate()
+                    process.wait()
+        finally:
+            price_server.shutdown()
+            for user in created:
+                user.delete()
+
+    print()
+    rows.sort(key=lambda row: (row['scenario'], row['concurrency'], row['server']))
+    print_table(rows, ['scenario', 'concurrency', 'server', 'rps', 'p50', 'p95', 'errors', 'rss_mb'])
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump({'threads': args.threads, 'fetch_delay': args.fetch_delay, 'results': rows}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Общие функции для бенчмарков (запуск: python -m benchmarks.<имя> из корня проекта)"""
+import os
+import statistics
+
+
+def setup_django(disable_throttling=True):
+    """Инициализация Django вне manage.py. Троттлинг отключается до импорта представлений"""
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'apiorders.settings')
+    import django
+    from django.conf import settings
+
+    django.setup()
+    if disable_throttling:
+        from rest_framework.settings import api_settings
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}
+        api_settings.reload()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summary(timings_ms):
+    """Сводка по списку длительностей (мс)"""
+    return {
+        'count': len(timings_ms),
+        'mean': round(statistics.fmean(timings_ms), 3) if timings_ms else 0.0,
+        'p50': round(percentile(timings_ms, 50), 3),
+        'p95': round(percentile(timings_ms, 95), 3),
+        'p99': round(percentile(timings_ms, 99), 3),
+    }
+
+
+def print_table(rows, columns):
+    """Печать списка словарей в виде таблицы"""
+    widths = {c: max(len(c), *(len(str(r.get(c, ''))) for r in rows)) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print('  '.join(str(row.get(c, '')).ljust(widths[c]) for c in columns))
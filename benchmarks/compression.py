@@ -0,0 +1,69 @@
+"""
+Сжатие ответов (backend/compression.py): процессор против трафика. Для каталога и истории заказов (JSON,
+как в benchmarks.json_rendering) и выгрузки каталога (NDJSON частями по 64 КБ с sync flush, как у потоковых
+ответов) по каждому доступному алгоритму и уровню: размер, степень сжатия, время сжатия (лучшее из --repeat),
+скорость, МБ/с, и время передачи по каналу --link-mbit вместе со сжатием. * - уровни из настроек
+COMPRESSION_LEVELS.
+
+    python -m benchmarks.compression
+    python -m benchmarks.compression --offers 20000 --link-mbit 2 --link-mbit 50
+"""
+import argparse
+import json
+
+from benchmarks.common import setup_django, print_table
+from benchmarks.json_rendering import catalog_payload, orders_payload, measure
+
+LEVELS = {'gzip': [1, 3, 6, 9], 'zstd': [1, 3, 6, 12], 'br': [1, 4, 6, 9]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--offers', type=int, default=10000)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--link-mbit', type=float, action='append',
+                        help='скорость канала, Мбит/с (по умолчанию 2 и 20)')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from backend.compression import COMPRESSORS, compress, compress_stream
+    from backend.exports import buffered
+    from backend.renderers import dumps
+
+    catalog = catalog_payload(args.offers)
+    payloads = {
+        'catalog': [dumps(catalog)],
+        'orders': [dumps(orders_payload(args.orders))],
+        'catalog.ndjson': list(buffered(json.dumps(row, ensure_ascii=False).encode() + b'\n' for row in catalog)),
+    }
+    links = args.link_mbit or [2, 20]
+
+    rows = []
+    for name, chunks in payloads.items():
+        size = sum(len(chunk) for chunk in chunks)
+        row = {'payload': name, 'encoding': '-', 'size_kb': round(size / 1024), 'ratio': 1.0, 'ms': 0.0, 'mb_s': '-'}
+        row.update({f'{link:g}mbit_ms': round(size * 8 / (link * 1000), 1) for link in links})
+        rows.append(row)
+        for encoding in COMPRESSORS:
+            for level in LEVELS[encoding]:
+                if len(chunks) == 1:
+                    run = lambda: compress(chunks[0], encoding, level)
+                else:
+                    run = lambda: b''.join(compress_stream(chunks, encoding, level))
+                compressed = len(run())
+                ms = measure(run, args.repeat)
+                current = '*' if settings.COMPRESSION_LEVELS[encoding] == level else ''
+                row = {'payload': name, 'encoding': f'{encoding}-{level}{current}',
+                       'size_kb': round(compressed / 1024), 'ratio': round(size / compressed, 1), 'ms': ms,
+                       'mb_s': round(size / 1024 / 1024 / (ms / 1000))}
+                row.update({f'{link:g}mbit_ms': round(ms + compressed * 8 / (link * 1000), 1) for link in links})
+                rows.append(row)
+
+    print_table(rows, ['payload', 'encoding', 'size_kb', 'ratio', 'ms', 'mb_s',
+                       *(f'{link:g}mbit_ms' for link in links)])
+
+
+if __name__ == '__main__':
+    main()
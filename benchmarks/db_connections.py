@@ -0,0 +1,81 @@
+"""
+Сравнение задержки запросов при разных режимах соединений с БД (DB_CONN_MODE).
+
+Каждый режим запускается в отдельном процессе против локального PostgreSQL из переменных POSTGRES_*
+(база должна быть мигрирована). Запросы идут через полный цикл Django (тестовый клиент). Тестовый клиент
+отключает close_old_connections от сигналов request_started/request_finished, поэтому вокруг каждого запроса
+она вызывается явно, как обработчиком WSGI на сервере: без этого все режимы переиспользуют одно соединение.
+connections - сколько соединений с БД открыто за прогон.
+
+    python -m benchmarks.db_connections --requests 500
+    python -m benchmarks.db_connections --pooler-port 6432   # + режим pooled через PgBouncer
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import setup_django, summary, print_table
+
+
+def run_mode(url_name, requests_count):
+    setup_django()
+    from django.db import close_old_connections, connection
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+    from django.urls import reverse
+
+    client = Client()
+    url = reverse(url_name)
+    client.get(url)  # прогрев: импорт представлений, первое соединение
+    close_old_connections()
+
+    connects = []
+    connection_created.connect(lambda **kwargs: connects.append(1), weak=False)
+    timings = []
+    for _ in range(requests_count):
+        start = time.perf_counter()
+        close_old_connections()  # request_started
+        response = client.get(url)
+        close_old_connections()  # request_finished
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+
+    result = summary(timings)
+    result['connections'] = len(connects)
+    result['mode'] = os.environ['DB_CONN_MODE']
+    result['vendor'] = connection.vendor
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--url-name', default='backend:category')
+    parser.add_argument('--pooler-port', help='порт PgBouncer (transaction pooling) для режима pooled')
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        return run_mode(args.url_name, args.requests)
+
+    modes = [('none', {}), ('persistent', {})]
+    if args.pooler_port:
+        modes.append(('pooled', {'POSTGRES_PORT': args.pooler_port}))
+
+    rows = []
+    for mode, extra_env in modes:
+        env = {**os.environ, 'DB_CONN_MODE': mode, **extra_env}
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.db_connections', '--run-mode', mode,
+             '--requests', str(args.requests), '--url-name', args.url_name],
+            env=env, check=True, capture_output=True, text=True).stdout
+        rows.append(json.loads(output.strip().splitlines()[-1]))
+
+    print_table(rows, ['mode', 'vendor', 'count', 'connections', 'mean', 'p50', 'p95', 'p99'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Сравнение ProductSupplierSerializer и быстрого чтения (backend/fast_read.py) на каталоге.
+
+Данные создаются во временной тестовой БД (как у pytest-django) и удаляются после замера,
+время включает запросы к БД и сборку ответа (без рендеринга JSON).
+
+    python -m benchmarks.fast_read --offers 10000
+"""
+import argparse
+from decimal import Decimal
+
+from benchmarks.common import setup_django, print_table
+from benchmarks.json_rendering import measure
+
+
+def fill(offers):
+    from backend.models import CustomUser, Supplier, ProductCategory, Product, ProductSupplier, Parameter, \
+        ProductSupplierParameter
+
+    user = CustomUser.objects.create_user(email='bench@test.te', password='b-12345Qwer', is_active=True,
+                                          type='supplier')
+    supplier = Supplier.objects.create(user=user, name='Связной', person='Иванов', phone='+79990000000')
+    category = ProductCategory.objects.create(name='Смартфоны')
+    parameters = [Parameter.objects.create(name=name) for name in ('Диагональ (дюйм)', 'Разрешение (пикс)',
+                                                                    'Встроенная память (Гб)', 'Цвет')]
+    products = Product.objects.bulk_create(
+        Product(name=f'Смартфон Apple iPhone XS Max {i} GB (золотистый)', category=category) for i in range(offers))
+    offers = ProductSupplier.objects.bulk_create(
+        ProductSupplier(product=product, supplier=supplier, external_id=i, model='apple/iphone/xs-max',
+                        price=Decimal(110000 + i), price_rrc=Decimal(116990), quantity=i % 40)
+        for i, product in enumerate(products))
+    ProductSupplierParameter.objects.bulk_create(
+        ProductSupplierParameter(product_supplier=offer, parameter=parameter, value=str(i))
+        for offer in offers for i, parameter in enumerate(parameters))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--offers', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from backend.fast_read import product_supplier_rows
+    from backend.models import ProductSupplier
+    from backend.serializers import ProductSupplierSerializer
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        fill(args.offers)
+
+        def serializer():
+            return ProductSupplierSerializer(ProductSupplier.objects.select_related(
+                'supplier', 'product__category').prefetch_related('p_parameters__parameter').order_by('id'),
+                many=True).data
+
+        def fast():
+            return product_supplier_rows(ProductSupplier.objects.order_by('id'))
+
+        assert fast() == serializer()
+        row = {
+            'offers': args.offers,
+            'vendor': connection.vendor,
+            'serializer_ms': measure(serializer, args.repeat),
+            'fast_read_ms': measure(fast, args.repeat),
+        }
+        row['speedup'] = round(row['serializer_ms'] / row['fast_read_ms'], 1)
+        print_table([row], ['offers', 'vendor', 'serializer_ms', 'fast_read_ms', 'speedup'])
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Сравнение JSONRenderer/JSONParser DRF и ORJSONRenderer/ORJSONParser на типичных ответах:
+каталог (ProductSupplierView) и история заказов (BuyerOrderView / SupplierOrderGetView).
+
+    python -m benchmarks.json_rendering --offers 10000 --orders 2000
+"""
+import argparse
+import io
+import time
+from decimal import Decimal
+
+from benchmarks.common import setup_django, print_table
+
+
+def catalog_payload(offers):
+    return [{
+        'product': {'id': i, 'name': f'Смартфон Apple iPhone XS Max {i} GB (золотистый)', 'category': '224.Смартфоны'},
+        'model': 'apple/iphone/xs-max',
+        'supplier': i % 50 + 1,
+        'quantity': i % 40,
+        'price': f'{110000 + i}.00',
+        'p_parameters': ['Диагональ (дюйм): 6.5', 'Разрешение (пикс): 2688x1242', 'Встроенная память (Гб): 512',
+                         'Цвет: золотистый'],
+    } for i in range(offers)]
+
+
+def orders_payload(orders, items_per_order=5):
+    return [{
+        'buyer_id': 1,
+        'buyer_sum': Decimal('123456789.00'),
+        'orders': [{
+            'id': o,
+            'buyer_id': 1,
+            'state': 'new',
+            'order_sum': f'{550000 + o}.00',
+            'order_items': [{'id': o * 10 + i, 'product_supplier_id': i, 'product_name': f'Смартфон {i}',
+                             'external_id': 4216292 + i, 'quantity': 3, 'sum': '330000.00'}
+                            for i in range(items_per_order)],
+        } for o in range(orders)],
+    }]
+
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--offers', type=int, default=10000)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from backend.renderers import ORJSONRenderer, ORJSONParser
+
+    rows = []
+    for name, payload in (('catalog', catalog_payload(args.offers)), ('orders', orders_payload(args.orders))):
+        body = JSONRenderer().render(payload)
+        assert ORJSONRenderer().render(payload) == body
+        row = {
+            'payload': name,
+            'size_kb': round(len(body) / 1024),
+            'render_drf_ms': measure(lambda: JSONRenderer().render(payload), args.repeat),
+            'render_orjson_ms': measure(lambda: ORJSONRenderer().render(payload), args.repeat),
+            'parse_drf_ms': measure(lambda: JSONParser().parse(io.BytesIO(body)), args.repeat),
+            'parse_orjson_ms': measure(lambda: ORJSONParser().parse(io.BytesIO(body)), args.repeat),
+        }
+        row['render_speedup'] = round(row['render_drf_ms'] / row['render_orjson_ms'], 1)
+        row['parse_speedup'] = round(row['parse_drf_ms'] / row['parse_orjson_ms'], 1)
+        rows.append(row)
+
+    print_table(rows, ['payload', 'size_kb', 'render_drf_ms', 'render_orjson_ms', 'render_speedup',
+                       'parse_drf_ms', 'parse_orjson_ms', 'parse_speedup'])
+
+
+if __name__ == '__main__':
+    main()
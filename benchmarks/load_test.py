@@ -0,0 +1,399 @@
+"""
+Нагрузочный тест API по коллекции запросов requests.txt.
+
+Запросы берутся из requests.txt по заголовкам (метод, путь, параметры, заголовки, тело), в тело и параметры
+подставляются данные теста. Пользователи с токенами создаются напрямую в БД (регистрация требует подтверждения
+по email), покупатели и поставщики - через API, прайсы поставщиков (копии data/s_test.yaml) раздаются локальным
+HTTP-сервером и загружаются через API. Затем одновременно работают виртуальные пользователи:
+- покупатели: каталог, поиск, подсказки, корзина, размещение заказа, история заказов;
+- посетители без авторизации: каталог, поиск, подсказки;
+- поставщики: остатки, заказы, аналитика, периодически - загрузка прайса.
+Итог по каждому запросу: число, запросов в секунду, доля ошибок (статус >= 400 или нет ответа), p50/p95/p99, мс.
+
+Сервер - уже запущенный (--host, БД из тех же переменных POSTGRES_*, троттлинг выключен: THROTTLING=off)
+или запускается тестом (--start-server: migrate и runserver с THROTTLING=off, для SQLite - POSTGRES_ENGINE
+и POSTGRES_DB как в tests). С SQLite одновременные записи (корзины, остатки) частично завершаются ошибкой
+"database is locked" - для сравнимых цифр нужен PostgreSQL. Данные теста удаляются после запуска (кроме --keep-data).
+
+    python -m benchmarks.load_test --start-server --buyers 20 --suppliers 2 --duration 60
+    python -m benchmarks.load_test --duration 60 --save results.json
+    python -m benchmarks.load_test --duration 60 --baseline results.json --tolerance 20
+"""
+import argparse
+import functools
+import http.server
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+import yaml
+
+from benchmarks.common import setup_django, summary, print_table
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Запросы коллекции, используемые сценариями
+BUYER_CREATE = 'Покупатель: создание нового покупателя'
+SUPPLIER_CREATE = 'Поставщик: создание нового поставщика'
+PRICE_LIST = 'Обновление прайс-листа'
+CATEGORIES = 'Категории товаров: просмотр всех категорий'
+PRODUCTS = 'Просмотр доступных для заказа товаров'
+SEARCH = 'Поиск товаров'
+AUTOCOMPLETE = 'Подсказки при вводе'
+BASKET_ADD = 'Создание корзины (или корзин, если пользователь создал несколько покупателей)'
+BASKET = 'Просмотр корзины'
+ORDER_PLACE = 'Размещение заказов из корзин(ы)'
+ORDERS = 'Просмотр размещенных заказов'
+STOCK = 'Обновление цен и остатков по external_id'
+SUPPLIER_ORDERS = 'Получить список заказов для поставщиков'
+ANALYTICS = 'Аналитика продаж поставщика по неделям'
+
+
+class Template:
+    """Запрос из коллекции: метод, путь ({{Host}} - адрес API), параметры, заголовки и тело"""
+
+    def __init__(self, title, method, url, headers, body):
+        self.title = title
+        self.method = method
+        parts = urlsplit(url.replace('{{Host}}', ''))
+        self.path = parts.path
+        self.params = dict(parse_qsl(parts.query))
+        self.headers = {name: value for name, value in headers.items() if name.lower() != 'authorization'}
+        self.body = body
+        self.label = f'{method} {self.path}'
+
+    def json(self):
+        """Тело запроса из коллекции (в коллекции есть и некорректный JSON - тогда None)"""
+
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+
+def parse_collection(path):
+    """Заголовок (после ###) -> Template"""
+
+    templates = {}
+    text = Path(path).read_text(encoding='utf-8').replace('\r\n', '\n')
+    for block in re.split(r'^### ', text, flags=re.M)[1:]:
+        lines = block.split('\n')
+        title = lines[0].strip()
+        method, url = lines[1].strip().split(maxsplit=1)
+        headers = {}
+        index = 2
+        while index < len(lines) and lines[index].strip():
+            name, _, value = lines[index].partition(':')
+            headers[name.strip()] = value.strip()
+            index += 1
+        templates[title] = Template(title, method, url, headers, '\n'.join(lines[index:]).strip())
+    return templates
+
+
+class Recorder:
+    def __init__(self):
+        self.records = []
+
+    def add(self, label, status, duration_ms):
+        # list.append атомарен, блокировка не нужна
+        self.records.append((label, status, duration_ms))
+
+    def report(self, elapsed):
+        endpoints = {}
+        for label, status, duration_ms in self.records:
+            endpoint = endpoints.setdefault(label, {'timings': [], 'errors': 0})
+            endpoint['timings'].append(duration_ms)
+            endpoint['errors'] += status is None or status >= 400
+        rows = []
+        for label, endpoint in sorted(endpoints.items()):
+            row = {'endpoint': label, **summary(endpoint['timings'])}
+            row['rps'] = round(row['count'] / elapsed, 1)
+            row['errors'] = endpoint['errors']
+            row['error_rate'] = round(endpoint['errors'] * 100 / row['count'], 2)
+            rows.append(row)
+        return rows
+
+
+class Client:
+    """Виртуальный пользователь: сессия requests с токеном, запросы по шаблонам коллекции"""
+
+    def __init__(self, host, templates, recorder, token=None):
+        self.host = host.rstrip('/')
+        self.templates = templates
+        self.recorder = recorder
+        self.session = requests.Session()
+        if token:
+            self.session.headers['Authorization'] = f'Token {token}'
+
+    def call(self, title, path_args=None, params=None, body=None, expect=None):
+        template = self.templates[title]
+        path = template.path.format(**path_args) if path_args else template.path
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                template.method, self.host + path, params={**template.params, **(params or {})},
+                json=body if body is not None else template.json(), headers=template.headers, timeout=60)
+        except requests.RequestException:
+            self.recorder.add(template.label, None, (time.perf_counter() - start) * 1000)
+            return None
+        self.recorder.add(template.label, response.status_code, (time.perf_counter() - start) * 1000)
+        if expect and response.status_code != expect:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+
+def results(data):
+    """Строки ответа с пагинацией DRF или без нее"""
+
+    return data.get('results', []) if isinstance(data, dict) else data or []
+
+
+def buyer_scenario(client, rng, context):
+    client.call(CATEGORIES)
+    offers = results(client.call(PRODUCTS, params={'page': rng.randint(1, context['pages'])}))
+    word = rng.choice(context['words'])
+    client.call(SEARCH, params={'q': word, 'page': 1})
+    client.call(AUTOCOMPLETE, params={'q': word[:rng.randint(2, 4)]})
+    if not offers:
+        return
+    chosen = rng.sample(offers, min(len(offers), rng.randint(1, 3)))
+    client.call(BASKET_ADD, body=[{'buyer_id': client.buyer_id, 'items': [
+        {'product_id': offer['product']['id'], 'supplier_id': offer['supplier'], 'quantity': rng.randint(1, 3)}
+        for offer in chosen]}])
+    baskets = client.call(BASKET) or []
+    # заказ размещает примерно каждый второй покупатель, остальные продолжают выбирать
+    if baskets and rng.random() < 0.5:
+        client.call(ORDER_PLACE, body={'orders_ids': [basket['order_id'] for basket in baskets]})
+    client.call(ORDERS)
+
+
+def browser_scenario(client, rng, context):
+    client.call(CATEGORIES)
+    client.call(PRODUCTS, params={'page': rng.randint(1, context['pages'])})
+    word = rng.choice(context['words'])
+    client.call(AUTOCOMPLETE, params={'q': word[:rng.randint(2, 4)]})
+    client.call(SEARCH, params={'q': word, 'page': 1})
+
+
+def supplier_scenario(client, rng, context):
+    client.iteration = getattr(client, 'iteration', 0) + 1
+    items = [{'external_id': external_id, 'quantity': rng.randint(0, 50)}
+             for external_id in rng.sample(context['external_ids'], min(5, len(context['external_ids'])))]
+    client.call(STOCK, body={'supplier_id': client.supplier_id, 'items': items})
+    client.call(SUPPLIER_ORDERS)
+    today = date.today()
+    client.call(ANALYTICS, params={'date_from': str(today - timedelta(days=30)), 'date_to': str(today)})
+    if client.iteration % context['import_every'] == 0:
+        client.call(PRICE_LIST, body={'supplier_id': client.supplier_id, 'file_url': client.file_url})
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_directory(directory):
+    """Локальный HTTP-сервер для прайсов поставщиков. Возвращает (сервер, адрес)"""
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def start_server(port):
+    env = {**os.environ, 'THROTTLING': 'off'}
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--no-input', '-v', '0'], cwd=ROOT, env=env, check=True)
+    process = subprocess.Popen([sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload'],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    host = f'http://127.0.0.1:{port}/api/v1'
+    for _ in range(100):
+        try:
+            if requests.get(f'{host}/category/', timeout=1).status_code == 200:
+                return process, host
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('Сервер не запустился')
+
+
+def create_users(run_id, user_type, count):
+    """Пользователи с токенами (без регистрации через API): [(user_id, token)]"""
+
+    from rest_framework.authtoken.models import Token
+    from backend.models import CustomUser
+
+    users = []
+    for i in range(count):
+        user = CustomUser.objects.create_user(email=f'load-{run_id}-{user_type}-{i}@load.test', password=run_id,
+                                              is_active=True, type=user_type)
+        users.append((user.id, Token.objects.create(user=user).key))
+    return users
+
+
+def prepare(args, templates, recorder, host, price_dir, price_host, run_id):
+    """Покупатели, поставщики и их прайсы через API. Возвращает (клиенты, контекст сценариев)"""
+
+    price_list = yaml.safe_load((ROOT / args.price_list).read_text(encoding='utf-8'))
+    context = {
+        'external_ids': [item['id'] for item in price_list['goods']],
+        'words': sorted({word for item in price_list['goods'] for word in re.findall(r'\w{3,}', item['name'])}),
+        'pages': max(1, args.suppliers * len(price_list['goods']) // 50),
+        'import_every': args.import_every,
+    }
+
+    clients = []
+    for i, (_, token) in enumerate(create_users(run_id, 'supplier', args.suppliers)):
+        client = Client(host, templates, recorder, token)
+        name = f'{price_list["shop"]} {run_id}-{i}'
+        supplier = client.call(SUPPLIER_CREATE, body={**(templates[SUPPLIER_CREATE].json() or {}), 'name': name},
+                               expect=201)
+        if supplier is None:
+            raise RuntimeError('Не удалось создать поставщика')
+        client.supplier_id = supplier['id']
+        Path(price_dir, f'{run_id}-{i}.yaml').write_text(
+            yaml.safe_dump({**price_list, 'shop': name}, allow_unicode=True), encoding='utf-8')
+        client.file_url = f'{price_host}/{run_id}-{i}.yaml'
+        if client.call(PRICE_LIST, body={'supplier_id': client.supplier_id, 'file_url': client.file_url},
+                       expect=200) is None:
+            raise RuntimeError('Не удалось загрузить прайс')
+        clients.append((supplier_scenario, client))
+
+    for _, token in create_users(run_id, 'buyer', args.buyers):
+        client = Client(host, templates, recorder, token)
+        buyer = client.call(BUYER_CREATE, expect=201)
+        if buyer is None:
+            raise RuntimeError('Не удалось создать покупателя')
+        client.buyer_id = buyer['id']
+        clients.append((buyer_scenario, client))
+
+    clients += [(browser_scenario, Client(host, templates, recorder)) for _ in range(args.browsers)]
+    return clients, context
+
+
+def cleanup(run_id):
+    from backend.models import CustomUser
+
+    CustomUser.objects.filter(email__startswith=f'load-{run_id}-').delete()
+
+
+def run(clients, context, duration, think, seed):
+    """Виртуальные пользователи в потоках до истечения duration секунд. Возвращает фактическую длительность"""
+
+    deadline = time.monotonic() + duration
+
+    def worker(scenario, client, rng):
+        while time.monotonic() < deadline:
+            scenario(client, rng, context)
+            if think:
+                time.sleep(rng.uniform(0, think))
+
+    threads = [threading.Thread(target=worker, args=(scenario, client, random.Random(seed + i)))
+               for i, (scenario, client) in enumerate(clients)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.monotonic() - start
+
+
+def compare(rows, baseline, tolerance):
+    """Регрессии относительно сохраненного запуска: p95 хуже на tolerance % (и на 5 мс), доля ошибок выше"""
+
+    base = {row['endpoint']: row for row in baseline['endpoints']}
+    regressions = []
+    for row in rows:
+        old = base.get(row['endpoint'])
+        if old is None:
+            continue
+        if row['p95'] > old['p95'] * (1 + tolerance / 100) and row['p95'] - old['p95'] > 5:
+            regressions.append(f'{row["endpoint"]}: p95 {old["p95"]} -> {row["p95"]} мс')
+        if row['error_rate'] > old['error_rate'] + 1:
+            regressions.append(f'{row["endpoint"]}: ошибки {old["error_rate"]} -> {row["error_rate"]} %')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='http://127.0.0.1:8000/api/v1', help='адрес API ({{Host}} коллекции)')
+    parser.add_argument('--start-server', action='store_true', help='запустить runserver для теста')
+    parser.add_argument('--port', type=int, default=8765, help='порт сервера для --start-server')
+    parser.add_argument('--collection', default='requests.txt')
+    parser.add_argument('--price-list', default='data/s_test.yaml', help='прайс-образец для поставщиков')
+    parser.add_argument('--buyers', type=int, default=10)
+    parser.add_argument('--browsers', type=int, default=5)
+    parser.add_argument('--suppliers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=30, help='длительность нагрузки, с')
+    parser.add_argument('--think', type=float, default=0.0, help='пауза между сценариями (случайная до), с')
+    parser.add_argument('--import-every', type=int, default=10, help='загрузка прайса раз в N сценариев поставщика')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', help='сохранить результаты в JSON')
+    parser.add_argument('--baseline', help='JSON прошлого запуска для сравнения')
+    parser.add_argument('--tolerance', type=float, default=20, help='допустимое ухудшение p95, %%')
+    parser.add_argument('--keep-data', action='store_true')
+    args = parser.parse_args()
+
+    templates = parse_collection(ROOT / args.collection)
+    missing = [title for title in (BUYER_CREATE, SUPPLIER_CREATE, PRICE_LIST, CATEGORIES, PRODUCTS, SEARCH,
+                                   AUTOCOMPLETE, BASKET_ADD, BASKET, ORDER_PLACE, ORDERS, STOCK, SUPPLIER_ORDERS,
+                                   ANALYTICS) if title not in templates]
+    if missing:
+        parser.error(f'нет запросов в коллекции: {missing}')
+
+    setup_django(disable_throttling=False)
+    server, host = start_server(args.port) if args.start_server else (None, args.host)
+    run_id = uuid.uuid4().hex[:8]
+    price_server = None
+    try:
+        with tempfile.TemporaryDirectory() as price_dir:
+            price_server, price_host = serve_directory(price_dir)
+            setup_recorder = Recorder()
+            clients, context = prepare(args, templates, setup_recorder, host, price_dir, price_host, run_id)
+            recorder = Recorder()
+            for _, client in clients:
+                client.recorder = recorder
+            elapsed = run(clients, context, args.duration, args.think, args.seed)
+    finally:
+        if price_server:
+            price_server.shutdown()
+        if not args.keep_data:
+            cleanup(run_id)
+        if server:
+            server.terminate()
+            server.wait()
+
+    rows = recorder.report(elapsed)
+    total = {'endpoint': 'TOTAL', **summary([duration_ms for _, _, duration_ms in recorder.records])}
+    total['rps'] = round(total['count'] / elapsed, 1)
+    total['errors'] = sum(row['errors'] for row in rows)
+    total['error_rate'] = round(total['errors'] * 100 / max(total['count'], 1), 2)
+    print_table(rows + [total], ['endpoint', 'count', 'rps', 'errors', 'error_rate', 'p50', 'p95', 'p99', 'mean'])
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({'duration': round(elapsed, 1), 'users': len(clients),
+                                               'endpoints': rows + [total]}, ensure_ascii=False, indent=2))
+    if args.baseline:
+        regressions = compare(rows + [total], json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print('РЕГРЕССИЯ', regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Время запуска процесса: `manage.py check` и загрузка WSGI-приложения вместе с URLconf (как перед первым
+запросом воркера). Каждая цель запускается --repeat раз в отдельном процессе с python -X importtime:
+медианы времени процесса и суммарного времени импорта, время импорта по пакетам (собственное время модулей
+пакета). Медиана времени процесса больше бюджета (--budget цель=мс) или вывод в stdout при загрузке
+WSGI-приложения - код выхода 1 (для CI).
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 10 --budget check=2500 --budget wsgi=1500 --top 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from benchmarks.common import print_table
+
+WSGI_CODE = '''
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'apiorders.settings')
+from apiorders.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+'''
+
+TARGETS = {
+    'check': ['manage.py', 'check'],
+    'wsgi': ['-c', WSGI_CODE],
+}
+
+# Бюджет по умолчанию - медиана времени процесса, мс
+BUDGETS = {'check': 3000, 'wsgi': 2000}
+
+
+def parse_importtime(stderr):
+    """Строки -X importtime: [(вложенность, собственное время, общее время (мкс), модуль)]"""
+
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        rows.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def run(target):
+    """Один запуск цели: (время процесса, с; строки importtime; stdout)"""
+
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', *TARGETS[target]], capture_output=True,
+                            text=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': ''})
+    duration = time.perf_counter() - started
+    if result.returncode:
+        sys.exit(f'{target}: код выхода {result.returncode}\n{result.stderr[-2000:]}')
+    return duration, parse_importtime(result.stderr), result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', choices=sorted(TARGETS), help='по умолчанию - все')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', action='append', default=[], metavar='ЦЕЛЬ=МС',
+                        help=f'бюджет медианы времени процесса, по умолчанию {BUDGETS}')
+    parser.add_argument('--top', type=int, default=15, help='пакетов с наибольшим временем импорта')
+    args = parser.parse_args()
+
+    budgets = dict(BUDGETS)
+    for item in args.budget:
+        target, _, value = item.partition('=')
+        budgets[target] = float(value)
+
+    failures = []
+    for target in args.target or sorted(TARGETS):
+        run(target)  # прогрев: .pyc и файловый кэш
+        durations, imports, packages = [], [], Counter()
+        for _ in range(args.repeat):
+            duration, rows, stdout = run(target)
+            durations.append(duration * 1000)
+            imports.append(sum(cumulative for depth, _, cumulative, _ in rows if depth == 0) / 1000)
+            for _, self_us, _, name in rows:
+                packages[name.split('.')[0]] += self_us / 1000 / args.repeat
+        if target == 'wsgi' and stdout:
+            failures.append(f'wsgi: вывод в stdout при загрузке: {stdout[:200]!r}')
+
+        wall, imported = statistics.median(durations), statistics.median(imports)
+        print(f'\n{target}: процесс {wall:.0f} мс (бюджет {budgets[target]:.0f}), импорт {imported:.0f} мс, '
+              f'модулей {len(rows)}')
+        if args.top:
+            print_table([{'package': name, 'ms': round(ms, 1)} for name, ms in packages.most_common(args.top)],
+                        ['package', 'ms'])
+        if wall > budgets[target]:
+            failures.append(f'{target}: {wall:.0f} мс больше бюджета {budgets[target]:.0f} мс')
+
+    if failures:
+        print('\n' + '\n'.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+
+from apiorders.database import get_database
+
+
+@pytest.fixture
+def postgres_env(monkeypatch):
+    monkeypatch.setenv('POSTGRES_ENGINE', 'django.db.backends.postgresql')
+    monkeypatch.setenv('POSTGRES_DB', 'apiorders')
+    monkeypatch.delenv('DB_CONN_MODE', raising=False)
+    monkeypatch.delenv('DB_CONN_MAX_AGE', raising=False)
+
+
+def test_default_mode_closes_connections(postgres_env):
+    database = get_database()
+
+    assert database['CONN_MAX_AGE'] == 0
+    assert not database['CONN_HEALTH_CHECKS']
+    assert 'DISABLE_SERVER_SIDE_CURSORS' not in database
+
+
+def test_persistent_mode(postgres_env, monkeypatch):
+    monkeypatch.setenv('DB_CONN_MODE', 'persistent')
+    monkeypatch.setenv('DB_CONN_MAX_AGE', '120')
+    database = get_database()
+
+    assert database['CONN_MAX_AGE'] == 120
+    assert database['CONN_HEALTH_CHECKS']
+    assert 'DISABLE_SERVER_SIDE_CURSORS' not in database
+
+
+def test_pooled_mode_disables_server_side_cursors(postgres_env, monkeypatch):
+    monkeypatch.setenv('DB_CONN_MODE', 'pooled')
+    monkeypatch.setenv('DB_CONNECT_TIMEOUT', '3')
+    database = get_database()
+
+    assert database['CONN_MAX_AGE'] == 60
+    assert database['CONN_HEALTH_CHECKS']
+    assert database['DISABLE_SERVER_SIDE_CURSORS']
+    assert database['OPTIONS'] == {'connect_timeout': 3}
+
+
+def test_unknown_mode(postgres_env, monkeypatch):
+    monkeypatch.setenv('DB_CONN_MODE', 'pgpool')
+
+    with pytest.raises(ValueError):
+        get_database()
+
+
+@pytest.mark.django_db
+def test_pooled_mode_iterator_without_named_cursor(settings, django_user_model):
+    # за пулером .iterator() не должен открывать серверный (именованный) курсор
+    if connection.vendor != 'postgresql':
+        pytest.skip('Серверные курсоры есть только в PostgreSQL')
+    connection.settings_dict['DISABLE_SERVER_SIDE_CURSORS'] = True
+    try:
+        django_user_model.objects.create_user(email='pool@test.te', password='1-12345Qwer')
+        assert [u.email for u in django_user_model.objects.iterator(chunk_size=1)] == ['pool@test.te']
+        assert connection.chunked_cursor().name is None
+    finally:
+        connection.settings_dict.pop('DISABLE_SERVER_SIDE_CURSORS')
@@ -0,0 +1,95 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from backend.analytics import update_sales_rollups
+from backend.models import Supplier, ProductSupplier, Buyer, Order, OrderItem, SalesRollup
+
+D1, D2 = date(2026, 10, 1), date(2026, 10, 2)
+
+
+@pytest.fixture
+def orders(user, user_s, user_s2, model_factory, settings):
+    settings.SALES_ROLLUP_LAG = 0
+    supplier = model_factory(Supplier, user=user_s)
+    offers = [model_factory(ProductSupplier, supplier=supplier, price=price, _fill_optional=['product'])
+              for price in (Decimal('100'), Decimal('50'))]
+    foreign_offer = model_factory(ProductSupplier, supplier=model_factory(Supplier, user=user_s2), price=1000,
+                                  _fill_optional=['product'])
+    buyer = model_factory(Buyer, user=user)
+
+    orders = {}
+    for name, day, state, items in (('o1', D1, 'new', [(offers[0], 2), (offers[1], 1), (foreign_offer, 1)]),
+                                    ('o2', D2, 'delivered', [(offers[0], 1)]),
+                                    ('o3', D2, 'canceled', [(offers[1], 5)]),
+                                    ('basket', D2, 'basket', [(offers[0], 10)])):
+        order = orders[name] = model_factory(Order, buyer=buyer, state=state)
+        for offer, quantity in items:
+            model_factory(OrderItem, order=order, product_supplier=offer, quantity=quantity)
+        Order.objects.filter(id=order.id).update(created_at=datetime.combine(day, datetime.min.time(), timezone.utc))
+    return offers, orders
+
+
+def get_report(client, **params):
+    response = client.get(reverse('backend:supplier-analytics'), {'date_from': D1, 'date_to': D2, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_sales_analytics(client_with_credentials_user_s, orders):
+    offers, _ = orders
+    assert update_sales_rollups() == 2
+
+    data = get_report(client_with_credentials_user_s)
+
+    # без корзин, отмененных заказов и чужих товаров
+    assert data['totals'] == {'quantity': 4, 'amount': '350.00'}
+    assert data['series'] == [{'period': '2026-10-01', 'quantity': 3, 'amount': '250.00'},
+                              {'period': '2026-10-02', 'quantity': 1, 'amount': '100.00'}]
+    assert [(p['id'], p['orders'], p['quantity'], p['amount']) for p in data['top_products']] == [
+        (offers[0].product_id, 2, 3, '300.00'), (offers[1].product_id, 1, 1, '50.00')]
+    assert get_report(client_with_credentials_user_s, interval='month', state='canceled')['series'] == [
+        {'period': '2026-10-01', 'quantity': 5, 'amount': '250.00'}]
+
+
+@pytest.mark.django_db
+def test_sales_rollups_incremental(user, client_with_credentials_user_s, orders, django_assert_max_num_queries):
+    offers, orders = orders
+    update_sales_rollups()
+    rollup_ids = set(SalesRollup.objects.filter(day=D1).values_list('id', flat=True))
+
+    order = Order.objects.get(id=orders['o3'].id)
+    order.state = 'delivered'
+    order.save()
+    # размещение заказа через API тоже меняет updated_at
+    buyer_client = APIClient()
+    buyer_client.force_authenticate(user=user)
+    response = buyer_client.post(reverse('backend:buyer-order'), {'orders_ids': [orders['basket'].id]})
+    assert response.status_code == 201
+
+    with django_assert_max_num_queries(8):
+        assert update_sales_rollups() == 1
+    # итоги других дней не пересчитываются
+    assert set(SalesRollup.objects.filter(day=D1).values_list('id', flat=True)) == rollup_ids
+    data = get_report(client_with_credentials_user_s, date_from=D2)
+    assert data['totals'] == {'quantity': 16, 'amount': '1350.00'}
+
+    assert update_sales_rollups() == 0
+
+
+@pytest.mark.django_db
+def test_sales_analytics_bad_params(client_with_credentials_user_s):
+    url = reverse('backend:supplier-analytics')
+
+    assert client_with_credentials_user_s.get(url, {'date_from': D2, 'date_to': D1}).status_code == 400
+    assert client_with_credentials_user_s.get(url, {'interval': 'year'}).status_code == 400
+    assert client_with_credentials_user_s.get(url, {'state': 'basket'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_sales_analytics_buyer_403(client_with_credentials):
+    assert client_with_credentials.get(reverse('backend:supplier-analytics')).status_code == 403
@@ -0,0 +1,117 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from django.core.management import call_command, CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from backend.analytics import update_sales_rollups
+from backend.models import Supplier, ProductSupplier, Buyer, Order, OrderItem, ArchivedOrder, ArchivedOrderItem, \
+    SalesRollup
+
+OLD, RECENT = date(2020, 3, 1), date.today() - timedelta(days=10)
+
+
+@pytest.fixture
+def orders(user, user_s, model_factory, settings):
+    settings.ORDER_ARCHIVE_AFTER_DAYS = 365
+    settings.SALES_ROLLUP_LAG = 0
+    supplier = model_factory(Supplier, user=user_s)
+    offer = model_factory(ProductSupplier, supplier=supplier, price=100, _fill_optional=['product'])
+    buyer = model_factory(Buyer, user=user)
+
+    orders = {}
+    for name, day, state in (('old_delivered', OLD, 'delivered'), ('old_canceled', OLD, 'canceled'),
+                             ('old_sent', OLD, 'sent'), ('recent_delivered', RECENT, 'delivered')):
+        order = orders[name] = model_factory(Order, buyer=buyer, state=state)
+        model_factory(OrderItem, order=order, product_supplier=offer, quantity=2)
+        moment = datetime.combine(day, datetime.min.time(), timezone.utc)
+        Order.objects.filter(id=order.id).update(created_at=moment, updated_at=moment)
+    return orders
+
+
+def order_ids(client, url_name, **params):
+    response = client.get(reverse(url_name), params)
+    assert response.status_code == 200
+    data = response.json()
+    if url_name == 'backend:buyer-order':
+        return {order['id'] for buyer in data for order in buyer['orders']}
+    return {order['id'] for supplier in data for order in supplier['orders']}
+
+
+@pytest.mark.django_db
+def test_archive_orders(orders):
+    call_command('archive_orders', batch_size=1)
+
+    # в архив - только старые заказы в конечных статусах, с теми же id
+    archived = {orders['old_delivered'].id, orders['old_canceled'].id}
+    assert set(ArchivedOrder.objects.values_list('id', flat=True)) == archived
+    assert not Order.objects.filter(id__in=archived).exists()
+    assert not OrderItem.objects.filter(order_id__in=archived).exists()
+    item = ArchivedOrderItem.objects.get(order_id=orders['old_delivered'].id)
+    assert (item.quantity, item.price) == (2, 100)
+
+    call_command('archive_orders')
+    assert ArchivedOrder.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_archive_orders_days_below_horizon(user, orders):
+    # заказы моложе ORDER_ARCHIVE_AFTER_DAYS не архивируются: история за недавний период читает только
+    # оперативные таблицы
+    with pytest.raises(CommandError):
+        call_command('archive_orders', days=1)
+    assert not ArchivedOrder.objects.exists()
+
+    buyer_client = APIClient()
+    buyer_client.force_authenticate(user=user)
+    assert order_ids(buyer_client, 'backend:buyer-order', date_from=RECENT) == {orders['recent_delivered'].id}
+
+
+@pytest.mark.django_db
+def test_order_history_reads_archive(user, client_with_credentials_user_s, orders):
+    call_command('archive_orders')
+    buyer_client = APIClient()
+    buyer_client.force_authenticate(user=user)
+    live = {orders['old_sent'].id, orders['recent_delivered'].id}
+    everything = live | {orders['old_delivered'].id, orders['old_canceled'].id}
+
+    # без периода - вся история с архивом, за недавний период - только оперативные таблицы
+    assert order_ids(buyer_client, 'backend:buyer-order') == everything
+    assert order_ids(client_with_credentials_user_s, 'backend:supplier-order') == everything
+    assert order_ids(buyer_client, 'backend:buyer-order', date_from=RECENT) == {orders['recent_delivered'].id}
+    # за старый период - вместе с архивом
+    assert order_ids(buyer_client, 'backend:buyer-order', date_from=OLD) == everything
+    assert order_ids(buyer_client, 'backend:buyer-order', date_from=OLD, date_to=OLD) == everything - {
+        orders['recent_delivered'].id}
+    assert order_ids(client_with_credentials_user_s, 'backend:supplier-order', date_from=OLD) == everything
+
+    response = buyer_client.get(reverse('backend:buyer-order'), {'date_from': RECENT, 'date_to': OLD})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_order_export_includes_archive(user, client_with_credentials_user_s, orders):
+    call_command('archive_orders')
+    buyer_client = APIClient()
+    buyer_client.force_authenticate(user=user)
+    # архивные заказы старше оперативных recent_delivered, old_sent - того же дня: порядок по дате создания и id
+    expected = sorted(orders.values(), key=lambda order: (orders['recent_delivered'].id == order.id, order.id))
+
+    for client, url_name in ((buyer_client, 'backend:buyer-order-export'),
+                             (client_with_credentials_user_s, 'backend:supplier-order-export')):
+        response = client.get(reverse(url_name))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        assert [row['order_id'] for row in rows] == [order.id for order in expected]
+        assert {(row['quantity'], row['price'], row['sum']) for row in rows} == {(2, '100.00', '200.00')}
+
+
+@pytest.mark.django_db
+def test_sales_rollups_after_archive(orders):
+    update_sales_rollups()
+    before = set(SalesRollup.objects.values_list('day', 'state', 'orders', 'quantity', 'amount'))
+
+    call_command('archive_orders')
+    update_sales_rollups(full=True)
+    assert set(SalesRollup.objects.values_list('day', 'state', 'orders', 'quantity', 'amount')) == before
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+from backend import views
+from backend.models import Buyer, Order, OrderItem, Product, ProductSupplier, Supplier
+
+
+def asgi_get(path, token=None):
+    """GET через ASGI-обработчик (как под uvicorn)"""
+
+    async def get():
+        headers = {'authorization': f'Token {token.key}'} if token else {}
+        return await AsyncClient().get(path, **headers)
+
+    return async_to_sync(get)()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_under_asgi(client, user, get_token, model_factory, settings):
+    settings.REQUEST_METRICS_SAMPLE_RATE = 1
+    buyer = model_factory(Buyer, user=user)
+    product_supplier = model_factory(ProductSupplier, product=model_factory(Product), supplier__is_available=True,
+                                     price=10, quantity=5)
+    model_factory(OrderItem, order=model_factory(Order, buyer=buyer, state='basket'),
+                  product_supplier=product_supplier, quantity=2)
+    client.force_authenticate(user=user)
+
+    for name in ('supplier-products', 'buyer-basket', 'buyer-order'):
+        response = asgi_get(reverse(f'backend:{name}'), get_token)
+        assert response.status_code == 200
+        assert response.json() == client.get(reverse(f'backend:{name}')).json()
+        # запросы к БД учтены, хотя выполнялись в потоке sync_to_async
+        assert 'queries"' in response['Server-Timing'] and 'desc="0 queries"' not in response['Server-Timing']
+
+    assert asgi_get(reverse('backend:supplier-order'), get_token).status_code == 403
+    assert asgi_get(reverse('backend:buyer-basket')).status_code == 401
+
+
+@pytest.mark.django_db
+def test_price_list_async_fetch(client, user_s, monkeypatch):
+    supplier = Supplier.objects.create(name='Связной', user=user_s)
+    client.force_authenticate(user=user_s)
+    content = 'shop: Связной\ncategories: []\ngoods: []\n'.encode()
+    requested = []
+
+    async def get(http_client, url, **kwargs):
+        requested.append(url)
+        return SimpleNamespace(content=content, headers={'ETag': '"v1"'}, raise_for_status=lambda: None)
+
+    monkeypatch.setattr(views.httpx.AsyncClient, 'get', get)
+    response = client.post(reverse('backend:supplier-price-list'),
+                           {'supplier_id': supplier.id, 'file_url': 'http://files.test/price.yaml'})
+    assert response.status_code == 200 and requested == ['http://files.test/price.yaml']
+    supplier.refresh_from_db()
+    assert supplier.file_etag == '"v1"' and supplier.file_hash
+
+    # прайс другого поставщика: ошибка, версия файла не сохраняется
+    other = Supplier.objects.create(name='Другой', user=user_s)
+    response = client.post(reverse('backend:supplier-price-list'),
+                           {'supplier_id': other.id, 'file_url': 'http://files.test/price.yaml'})
+    assert response.status_code == 400 and 'Связной' in response.json()['error']
+    other.refresh_from_db()
+    assert other.file_etag == '' and other.file_hash == ''
+
+    async def fail(http_client, url, **kwargs):
+        raise httpx.ConnectError('connection refused')
+
+    monkeypatch.setattr(views.httpx.AsyncClient, 'get', fail)
+    response = client.post(reverse('backend:supplier-price-list'),
+                           {'supplier_id': supplier.id, 'file_url': 'http://files.test/price.yaml'})
+    assert response.status_code == 400 and response.json() == {'error': 'connection refused'}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_under_asgi(client, user, get_token, model_factory):
+    from apiorders.asgi import application
+
+    buyer = model_factory(Buyer, user=user)
+    product_supplier = model_factory(ProductSupplier, product=model_factory(Product), supplier__is_available=True,
+                                     price=10)
+    model_factory(OrderItem, order=model_factory(Order, buyer=buyer, state='new'),
+                  product_supplier=product_supplier, quantity=2)
+    client.force_authenticate(user=user)
+
+    async def get(path):
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as http_client:
+            return await http_client.get(path, headers={'Authorization': f'Token {get_token.key}'})
+
+    # строки выгрузки читаются из БД вне цикла событий, остальные запросы - через ASGI-обработчик
+    for name in ('buyer-order-export', 'buyer-order'):
+        response = async_to_sync(get)(reverse(f'backend:{name}'))
+        expected = client.get(reverse(f'backend:{name}'))
+        assert response.status_code == 200
+        content = b''.join(expected.streaming_content) if expected.streaming else expected.content
+        assert response.content == content
@@ -0,0 +1,56 @@
+import pytest
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
+from rest_framework.test import APIRequestFactory
+
+from backend.authentication import CachedTokenAuthentication
+
+
+def token_request(key):
+    return APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {key}')
+
+
+@pytest.mark.django_db
+def test_cached_authentication_without_queries(get_token, django_assert_num_queries):
+    token = get_token
+    CachedTokenAuthentication().authenticate(token_request(token.key))
+
+    with django_assert_num_queries(0):
+        user, auth = CachedTokenAuthentication().authenticate(token_request(token.key))
+
+    assert user.pk == token.user.pk
+    assert user.type == 'buyer'
+    assert user.email == token.user.email
+    assert auth.key == token.key
+
+
+@pytest.mark.django_db
+def test_cached_authentication_invalid_token(get_token):
+    with pytest.raises(Exception) as e:
+        CachedTokenAuthentication().authenticate(token_request('wrong'))
+
+    assert e.value.status_code == HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_cache_invalidated_on_profile_delete(client, get_token):
+    token = get_token
+    client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+    url = reverse('backend:user-profile')
+
+    assert client.get(url).status_code == HTTP_200_OK
+    assert client.delete(url).status_code == HTTP_200_OK
+    assert client.get(url).status_code == HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_cache_invalidated_on_type_change(client, get_token):
+    token = get_token
+    client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    assert client.get(reverse('backend:buyer-basket')).status_code == HTTP_200_OK
+
+    client.patch(reverse('backend:user-profile'), {'type': 'supplier'})
+
+    assert client.get(reverse('backend:buyer-basket')).status_code == HTTP_403_FORBIDDEN
+    assert client.get(reverse('backend:supplier-order')).status_code == HTTP_200_OK
@@ -0,0 +1,92 @@
+import pytest
+from django.urls import reverse
+
+from backend import autocomplete
+from backend.models import Supplier, Product, ProductSupplier
+from backend.tasks import do_import_task
+
+
+@pytest.fixture(autouse=True)
+def index(monkeypatch, settings):
+    # индекс процесса строится по ленте изменений, а после отката транзакции теста номера в ленте повторяются
+    settings.AUTOCOMPLETE_REFRESH_INTERVAL = 3600
+    monkeypatch.setattr(autocomplete, 'index', autocomplete.AutocompleteIndex())
+
+
+@pytest.fixture
+def supplier(user_s, model_factory):
+    return model_factory(Supplier, user=user_s, name='Связной')
+
+
+def offer(supplier, name, model, quantity, model_factory):
+    return ProductSupplier.objects.create(supplier=supplier, product=model_factory(Product, name=name), model=model,
+                                          external_id=1, price=100, price_rrc=100, quantity=quantity)
+
+
+def suggest(client, q, **params):
+    response = client.get(reverse('backend:supplier-products-autocomplete'), {'q': q, **params})
+    assert response.status_code == 200
+    return [(row['text'], row['quantity']) for row in response.json()['suggestions']]
+
+
+@pytest.mark.django_db
+def test_autocomplete_ranking(client, supplier, user_s2, model_factory, django_assert_num_queries):
+    offer(supplier, 'Смартфон Apple iPhone XS', 'apple/iphone/xs', 0, model_factory)
+    offer(supplier, 'Смартфон Apple iPhone XR', 'apple/iphone/xr', 5, model_factory)
+    unavailable = model_factory(Supplier, user=user_s2, is_available=False)
+    offer(unavailable, 'Смартфон Apple iPhone 11', 'apple/iphone/11', 100, model_factory)
+
+    # в наличии у доступного поставщика - первыми, остальные - по алфавиту
+    assert suggest(client, 'СМАРТФОН apple') == [
+        ('Смартфон Apple iPhone XR', 5), ('Смартфон Apple iPhone 11', 0), ('Смартфон Apple iPhone XS', 0)]
+    # префикс любого слова названия или модели
+    assert suggest(client, 'iphone', limit=2) == [('Смартфон Apple iPhone XR', 5), ('apple/iphone/xr', 5)]
+    assert suggest(client, 'xs') == [('apple/iphone/xs', 0), ('Смартфон Apple iPhone XS', 0)]
+    # без изменений каталога подсказки отдаются из памяти, без запросов к БД
+    with django_assert_num_queries(0):
+        suggest(client, 'apple')
+
+
+@pytest.mark.django_db
+def test_autocomplete_refresh_after_import(client, supplier, django_capture_on_commit_callbacks):
+    price_list = {
+        'shop': 'Связной',
+        'categories': [{'id': 224, 'name': 'Смартфоны'}],
+        'goods': [{'id': 1, 'category': 224, 'model': 'apple/iphone/xs-max', 'name': 'Смартфон Apple iPhone XS Max',
+                   'price': 110000, 'price_rrc': 116990, 'quantity': 14, 'parameters': {}}],
+    }
+    with django_capture_on_commit_callbacks(execute=True):
+        do_import_task(supplier.id, None, price_list)
+    assert suggest(client, 'iphone') == [('Смартфон Apple iPhone XS Max', 14), ('apple/iphone/xs-max', 14)]
+
+    price_list['goods'][0].update(id=2, model='apple/iphone/xr', name='Смартфон Apple iPhone XR', quantity=3)
+    with django_capture_on_commit_callbacks(execute=True):
+        do_import_task(supplier.id, None, price_list)
+    # после загрузки прайса индекс обновлен по метке версии, не дожидаясь интервала проверки
+    assert suggest(client, 'iphone') == [('Смартфон Apple iPhone XR', 3), ('apple/iphone/xr', 3)]
+
+
+@pytest.mark.django_db
+def test_autocomplete_stock_and_availability(client_with_credentials_user_s, supplier, model_factory, settings):
+    offer(supplier, 'Наушники Apple AirPods Pro', 'airpods-pro', 2, model_factory)
+    offer(supplier, 'Наушники Apple AirPods', 'airpods', 1, model_factory).save()
+    assert suggest(client_with_credentials_user_s, 'наушники') == [
+        ('Наушники Apple AirPods Pro', 2), ('Наушники Apple AirPods', 1)]
+
+    settings.AUTOCOMPLETE_REFRESH_INTERVAL = 0
+    ProductSupplier.objects.filter(model='airpods').get().delete()
+    assert suggest(client_with_credentials_user_s, 'наушники') == [('Наушники Apple AirPods Pro', 2)]
+
+    client_with_credentials_user_s.patch(reverse('backend:supplier-detail', args=[supplier.id]),
+                                         {'is_available': False})
+    assert suggest(client_with_credentials_user_s, 'airpods') == [
+        ('Наушники Apple AirPods Pro', 0), ('airpods-pro', 0)]
+
+
+@pytest.mark.django_db
+def test_autocomplete_bad_params(client):
+    url = reverse('backend:supplier-products-autocomplete')
+
+    assert client.get(url).status_code == 400
+    assert client.get(url, {'q': 'ip', 'limit': 'abc'}).status_code == 400
+    assert client.get(url, {'q': 'ip', 'limit': 0}).status_code == 400
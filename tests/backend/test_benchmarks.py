@@ -0,0 +1,247 @@
+"""
+Бенчмарк эндпоинтов backend/urls.py на сгенерированных данных (generate_dataset) растущего размера:
+число запросов к БД ограничено сверху одинаково для всех размеров (N+1 - ошибка теста), время ответа -
+медиана --bench-repeat повторов GET-запроса. Размер наборов, сохранение результатов в JSON и сравнение
+с прошлым запуском - опции pytest (tests/conftest.py):
+
+    pytest tests/backend/test_benchmarks.py --bench-sizes 1,4,16 --bench-save bench.json
+    pytest tests/backend/test_benchmarks.py --bench-sizes 1,4,16 --bench-baseline bench.json --bench-tolerance 30
+"""
+import json
+import platform
+import statistics
+import time
+from io import StringIO
+from types import SimpleNamespace
+
+import django
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+from django_rest_passwordreset.models import ResetPasswordToken
+from rest_framework.views import APIView
+
+from backend import profiling, urls, views
+from backend.models import CustomUser, ConfirmEmailToken, Supplier, ProductSupplier, Order, OrderItem
+
+# время ниже этого прироста (мс) не считается замедлением: шум на быстрых запросах
+SLACK_MS = 5
+
+
+def new_offers(d):
+    """Товары в наличии, которых нет в корзине покупателя (число растет с размером данных)"""
+
+    in_basket = OrderItem.objects.filter(order__buyer=d.buyer, order__state='basket').values('product_supplier')
+    return ProductSupplier.objects.filter(supplier__is_available=True, quantity__gte=1).exclude(
+        id__in=in_basket).order_by('id')[:5 * d.size]
+
+
+def basket_items(d):
+    items = [{'product_id': offer.product_id, 'supplier_id': offer.supplier_id, 'quantity': 1}
+             for offer in new_offers(d)]
+    return [{'buyer_id': d.buyer.id, 'items': items}]
+
+
+def basket_delete(d):
+    basket = d.buyer.orders.get(state='basket')
+    OrderItem.objects.bulk_create(
+        OrderItem(order=basket, product_supplier=offer, quantity=1) for offer in new_offers(d))
+    return [{'buyer_id': buyer.id, 'items': list(OrderItem.objects.filter(
+        order__buyer=buyer, order__state='basket').values_list('id', flat=True))} for buyer in d.buyers]
+
+
+def stock_items(d):
+    external_ids = d.supplier.s_products.order_by('id').values_list('external_id', flat=True)[:10 * d.size]
+    return {'supplier_id': d.supplier.id, 'items': [
+        {'external_id': external_id, 'quantity': 5} for external_id in external_ids]}
+
+
+def inactive_user_token(d):
+    user = CustomUser.objects.create_user(email='bench-new@bench.test', password='Bench-12345Qwer')
+    return {'email': user.email, 'token': ConfirmEmailToken.objects.get_or_create(user=user)[0].email_token}
+
+
+def saved_profile(d):
+    with profiling.Profile('cprofile') as profile:
+        sum(range(1000))
+    return profiling.save_profile(profile, {'view': 'backend:category'})
+
+
+COMPANY = {'name': 'Т.Видео', 'person': 'Тест Тина', 'phone': '+79686325124', 'locality_name': 'д.Тесто'}
+
+# (метод, имя url, пользователь, максимум запросов к БД, аргументы url и данные запроса).
+# Пакетные вставки и каскадное удаление на больших размерах делятся на части - у таких границ запас
+CASES = [
+    ('get', 'api-root', None, 0, lambda d: ((), {})),
+    ('post', 'user-register', None, 9, lambda d: (
+        (), {'email': 'bench-new@bench.test', 'password': 'Bench-12345Qwer', 'type': 'buyer'})),
+    ('post', 'user-register-confirm', None, 5, lambda d: ((), inactive_user_token(d))),
+    ('post', 'user-login', None, 6, lambda d: ((), {'email': d.buyer_user.email, 'password': d.password})),
+    ('post', 'password-reset', None, 4, lambda d: ((), {'email': d.buyer_user.email})),
+    ('post', 'password_reset-confirm', None, 6, lambda d: (
+        (), {'token': ResetPasswordToken.objects.create(user=d.buyer_user).key, 'password': 'New_password_123'})),
+    ('get', 'user-profile', 'buyer_user', 2, lambda d: ((), {})),
+    ('patch', 'user-profile', 'buyer_user', 4, lambda d: ((), {'first_name': 'Бенч'})),
+    ('delete', 'user-profile', 'buyer_user', 4, lambda d: ((), {})),
+    ('get', 'buyer-list', 'buyer_user', 2, lambda d: ((), {})),
+    ('post', 'buyer-list', 'buyer_user', 1, lambda d: ((), COMPANY)),
+    ('get', 'buyer-detail', 'buyer_user', 2, lambda d: ((d.buyer.id,), {})),
+    ('patch', 'buyer-detail', 'buyer_user', 3, lambda d: ((d.buyer.id,), {'person': 'Бенч'})),
+    ('delete', 'buyer-detail', 'buyer_user', 10, lambda d: ((d.buyer.id,), {})),
+    ('get', 'supplier-list', None, 2, lambda d: ((), {})),
+    ('post', 'supplier-list', 'supplier_user', 1, lambda d: ((), COMPANY)),
+    ('get', 'supplier-detail', None, 1, lambda d: ((d.supplier.id,), {})),
+    ('patch', 'supplier-detail', 'supplier_user', 4, lambda d: ((d.supplier.id,), {'person': 'Бенч'})),
+    ('delete', 'supplier-detail', 'supplier_user', 20, lambda d: ((d.supplier.id,), {})),
+    ('get', 'category', None, 7, lambda d: ((), {})),
+    ('post', 'supplier-price-list', 'supplier_user', 30, lambda d: (
+        (), {'supplier_id': d.supplier.id, 'file_url': 'http://bench.test/price.yaml'})),
+    ('post', 'supplier-stock', 'supplier_user', 10, lambda d: ((), stock_items(d))),
+    ('get', 'supplier-products', None, 2, lambda d: ((), {})),
+    ('get', 'supplier-products-search', None, 6, lambda d: ((), {'q': 'смартфон'})),
+    ('get', 'supplier-products-autocomplete', None, 4, lambda d: ((), {'q': 'смар'})),
+    ('get', 'supplier-products-changes', None, 1, lambda d: ((), {'since': 0})),
+    ('get', 'buyer-basket', 'buyer_user', 3, lambda d: ((), {})),
+    ('post', 'buyer-basket', 'buyer_user', 10, lambda d: ((), basket_items(d))),
+    ('delete', 'buyer-basket', 'buyer_user', 6, lambda d: ((), basket_delete(d))),
+    ('get', 'buyer-order', 'buyer_user', 5, lambda d: ((), {})),
+    ('post', 'buyer-order', 'buyer_user', 3, lambda d: ((), {'orders_ids': list(
+        Order.objects.filter(buyer__in=d.buyers, state='basket').values_list('id', flat=True))})),
+    ('get', 'supplier-order', 'supplier_user', 3, lambda d: ((), {})),
+    ('get', 'export-catalog', None, 2, lambda d: ((), {})),
+    ('get', 'buyer-order-export', 'buyer_user', 2, lambda d: ((), {})),
+    ('get', 'supplier-order-export', 'supplier_user', 2, lambda d: ((), {})),
+    ('get', 'supplier-analytics', 'supplier_user', 4, lambda d: ((), {})),
+    ('get', 'profiles', 'staff_user', 0, lambda d: ((), {})),
+    ('get', 'profile-file', 'staff_user', 0, lambda d: ((saved_profile(d), 'stats'), {})),
+    ('get', 'request-stats', 'staff_user', 0, lambda d: ((), {})),
+]
+
+# Известные N+1: запросы растут с данными. Граница - цель после исправления, strict - тест упадет,
+# когда запросов станет меньше границы (отметку нужно снять)
+KNOWN_N_PLUS_ONE = {
+    ('post', 'buyer-basket'): 'BasketView.post: проверка и сохранение OrderItemSerializer на каждую позицию',
+    ('delete', 'buyer-basket'): 'BasketView.delete: delete() на каждую позицию',
+    ('post', 'supplier-price-list'): 'do_import_task: запросы на каждую строку прайса',
+    ('delete', 'supplier-detail'): 'каскадное удаление товаров поставщика с сигналами по каждому объекту',
+}
+
+PARAMS = [pytest.param(*case, id=f'{case[0]}-{case[1]}', marks=[
+    pytest.mark.xfail(strict=True, reason=KNOWN_N_PLUS_ONE[case[:2]])] if case[:2] in KNOWN_N_PLUS_ONE else [])
+    for case in CASES]
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption('bench_sizes').split(',')]
+        metafunc.parametrize('size', sizes, ids=[f'x{size}' for size in sizes])
+
+
+class Timings:
+    """Результаты запуска (--bench-save) и сравнение с прошлым (--bench-baseline)"""
+
+    def __init__(self, config):
+        self.save = config.getoption('bench_save')
+        self.tolerance = config.getoption('bench_tolerance')
+        baseline = config.getoption('bench_baseline')
+        self.baseline = {}
+        if baseline:
+            with open(baseline, encoding='utf-8') as file:
+                self.baseline = json.load(file)['results']
+        self.results = {}
+
+    def add(self, key, queries, runs):
+        """Запись результата, возвращает список регрессий относительно baseline"""
+
+        result = self.results[key] = {
+            'queries': queries, 'median_ms': round(statistics.median(runs) * 1000, 3),
+            'runs_ms': [round(run * 1000, 3) for run in runs],
+        }
+        base = self.baseline.get(key)
+        if base is None:
+            return []
+        problems = []
+        if result['queries'] > base['queries']:
+            problems.append(f'{key}: запросов к БД {result["queries"]}, было {base["queries"]}')
+        limit = max(base['median_ms'] * (1 + self.tolerance / 100), base['median_ms'] + SLACK_MS)
+        if result['median_ms'] > limit:
+            problems.append(f'{key}: {result["median_ms"]} мс, было {base["median_ms"]} мс')
+        return problems
+
+    def write(self):
+        if not self.save:
+            return
+        meta = {'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                'django': django.get_version(), 'database': connection.vendor}
+        with open(self.save, 'w', encoding='utf-8') as file:
+            json.dump({'meta': meta, 'results': self.results}, file, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope='module')
+def timings(request):
+    timings = Timings(request.config)
+    yield timings
+    timings.write()
+
+
+@pytest.fixture
+def dataset(size, settings, tmp_path, monkeypatch):
+    # время ответа без хеширования паролей и без троттлинга
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    settings.PROFILING_DIR = str(tmp_path / 'profiles')
+    monkeypatch.setattr(APIView, 'throttle_classes', [])
+    password = 'Bench-12345'
+    call_command('generate_dataset', '--suppliers', '3', '--categories', '5', '--products', str(20 * size),
+                 '--offers', str(50 * size), '--buyer-users', '3', '--orders', str(30 * size), '--basket-share', '1',
+                 '--password', password, '--price-lists', '1', '--price-list-dir', str(tmp_path), '--rollups',
+                 stdout=StringIO())
+
+    # прайс крупнейшего поставщика - ответ на запрос файла при загрузке
+    path, = tmp_path.glob('supplier_*.yaml')
+    content = path.read_bytes()
+    async def get(client, url, **kwargs):
+        return SimpleNamespace(content=content, headers={}, raise_for_status=lambda: None)
+
+    monkeypatch.setattr(views.httpx.AsyncClient, 'get', get)
+    supplier = Supplier.objects.get(id=int(path.stem.split('_')[1]))
+    Supplier.objects.filter(id=supplier.id).update(is_available=True)
+
+    buyer_user = CustomUser.objects.filter(type='buyer').annotate(
+        orders=Count('buyers__orders')).order_by('-orders', 'id').first()
+    buyers = list(buyer_user.buyers.order_by('id'))
+    staff_user = CustomUser.objects.create_user(email='bench-staff@bench.test', password=password, is_staff=True)
+    return SimpleNamespace(size=size, password=password, supplier=supplier, supplier_user=supplier.user,
+                           buyer_user=buyer_user, buyers=buyers, buyer=buyers[0], staff_user=staff_user)
+
+
+def test_all_endpoints_covered():
+    names = {pattern.name for pattern in urls.urlpatterns}
+    assert names == {name for _, name, *_ in CASES}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('method, name, who, limit, make', PARAMS)
+def test_endpoint(method, name, who, limit, make, size, dataset, client, timings, request,
+                  django_assert_max_num_queries):
+    args, data = make(dataset)
+    url = reverse(f'backend:{name}', args=args)
+    if who:
+        client.force_authenticate(getattr(dataset, who))
+    send = getattr(client, method)
+    options = {} if method == 'get' else {'format': 'json'}
+
+    runs, queries = [], 0
+    for _ in range(request.config.getoption('bench_repeat') if method == 'get' else 1):
+        with django_assert_max_num_queries(limit) as captured:
+            started = time.perf_counter()
+            response = send(url, data, **options)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            runs.append(time.perf_counter() - started)
+        queries = max(queries, len(captured))
+        assert response.status_code < 300, response.content[:500]
+
+    problems = timings.add(f'{method.upper()} {name} x{size}', queries, runs)
+    assert not problems, '\n'.join(problems)
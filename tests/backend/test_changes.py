@@ -0,0 +1,93 @@
+import pytest
+from django.urls import reverse
+
+from backend.models import Supplier, ProductSupplier, ProductSupplierChange
+from backend.tasks import do_import_task
+
+
+def price_list(shop, goods):
+    return {
+        'shop': shop,
+        'categories': [{'id': 224, 'name': 'Смартфоны'}],
+        'goods': [{'id': external_id, 'category': 224, 'model': 'apple/iphone/xs-max', 'name': name, 'price': price,
+                   'price_rrc': 116990, 'quantity': quantity, 'parameters': {'Цвет': 'золотистый'}}
+                  for external_id, name, price, quantity in goods],
+    }
+
+
+@pytest.fixture
+def supplier(user_s, model_factory):
+    return model_factory(Supplier, user=user_s, name='Связной')
+
+
+def get_feed(client, **params):
+    response = client.get(reverse('backend:supplier-products-changes'), params)
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_import_records_changes(client, supplier):
+    do_import_task(supplier.id, None, price_list('Связной', [(1, 'iPhone XS', 110000, 14),
+                                                             (2, 'iPhone XR', 65000, 9)]))
+    offer_ids = dict(ProductSupplier.objects.values_list('external_id', 'id'))
+    cursor = get_feed(client, since=0)['cursor']
+
+    new_price_list = price_list('Связной', [(1, 'iPhone XS', 99990.5, 14), (3, 'iPhone 11', 70000, 2)])
+    do_import_task(supplier.id, None, new_price_list)
+
+    # id товаров при повторной загрузке не меняются
+    assert ProductSupplier.objects.get(external_id=1).id == offer_ids[1]
+    assert not ProductSupplier.objects.filter(id=offer_ids[2]).exists()
+    feed = get_feed(client, since=cursor)
+    changes = {change.pop('kind'): change for change in feed['changes']}
+    assert changes.keys() == {'insert', 'update', 'retire'}
+    assert changes['update'] == {'seq': changes['update']['seq'], 'id': offer_ids[1], 'supplier_id': supplier.id,
+                                 'price': '99990.50'}
+    assert changes['insert']['external_id'] == 3 and changes['insert']['quantity'] == 2
+    assert changes['retire'] == {'seq': changes['retire']['seq'], 'id': offer_ids[2], 'supplier_id': supplier.id}
+    assert feed['cursor'] == ProductSupplierChange.objects.last().id and not feed['has_more']
+
+    # повторная загрузка того же прайса ничего не меняет
+    do_import_task(supplier.id, None, new_price_list)
+    assert get_feed(client, since=feed['cursor'])['changes'] == []
+
+
+@pytest.mark.django_db
+def test_feed_compaction_and_limit(client, supplier, model_factory):
+    cursor = get_feed(client)['cursor']
+    offer = model_factory(ProductSupplier, supplier=supplier, price=100, quantity=1, _fill_optional=['product'])
+    offer.quantity = 5
+    offer.save()
+    offer.price = 90
+    offer.save()
+
+    changes = get_feed(client, since=cursor)['changes']
+    assert len(changes) == 1
+    assert changes[0]['kind'] == 'insert' and changes[0]['price'] == '90.00' and changes[0]['quantity'] == 5
+
+    first_page = get_feed(client, since=cursor, limit=2)
+    assert first_page['has_more'] and first_page['changes'][0]['quantity'] == 5
+    assert get_feed(client, since=first_page['cursor'])['changes'][0]['kind'] == 'update'
+
+
+@pytest.mark.django_db
+def test_supplier_availability_change(user_s, client_with_credentials_user_s, supplier):
+    cursor = get_feed(client_with_credentials_user_s)['cursor']
+
+    response = client_with_credentials_user_s.patch(reverse('backend:supplier-detail', args=[supplier.id]),
+                                                    {'is_available': False})
+
+    assert response.status_code == 200
+    changes = get_feed(client_with_credentials_user_s, since=cursor)['changes']
+    assert [(c['kind'], c['supplier_id'], c['is_available']) for c in changes] == [
+        ('availability', supplier.id, False)]
+
+
+@pytest.mark.django_db
+def test_feed_bad_params(client):
+    url = reverse('backend:supplier-products-changes')
+
+    assert client.get(url, {'since': 'abc'}).status_code == 400
+    assert client.get(url, {'since': -1}).status_code == 400
+    assert client.get(url, {'since': 0, 'limit': 0}).status_code == 400
@@ -0,0 +1,78 @@
+import gzip
+import zlib
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from backend.compression import choose_encoding
+from backend.models import ProductSupplier
+
+
+@pytest.fixture
+def catalog(model_factory):
+    return model_factory(ProductSupplier, supplier__is_available=True, price=Decimal('110000'), _quantity=20,
+                         _fill_optional=['product'])
+
+
+def test_choose_encoding():
+    preferred = ['zstd', 'br', 'gzip']
+    assert choose_encoding('gzip, deflate, br', preferred) == 'br'
+    assert choose_encoding('gzip;q=1, br;q=0.5', preferred) == 'gzip'
+    assert choose_encoding('*;q=0.1, zstd;q=0', preferred) == 'br'
+    assert choose_encoding('identity', preferred) is None
+    assert choose_encoding('', preferred) is None
+
+
+@pytest.mark.django_db
+def test_compressed_json(client_with_credentials, catalog, settings):
+    url = reverse('backend:supplier-products')
+    plain = client_with_credentials.get(url)
+    assert 'Content-Encoding' not in plain and 'Accept-Encoding' in plain['Vary']
+
+    response = client_with_credentials.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in response['Vary']
+    assert int(response['Content-Length']) == len(response.content) < len(plain.content)
+    assert gzip.decompress(response.content) == plain.content
+
+    settings.COMPRESSION_MIN_SIZE = len(plain.content) + 1
+    assert 'Content-Encoding' not in client_with_credentials.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('encoding, module', [('zstd', 'zstandard'), ('br', 'brotli')])
+def test_optional_encodings(client_with_credentials, catalog, encoding, module):
+    library = pytest.importorskip(module)
+    url = reverse('backend:supplier-products')
+    plain = client_with_credentials.get(url)
+    response = client_with_credentials.get(url, HTTP_ACCEPT_ENCODING=f'gzip, {encoding}')
+    assert response['Content-Encoding'] == encoding
+    decompress = library.ZstdDecompressor().decompressobj().decompress if module == 'zstandard' else library.decompress
+    assert decompress(response.content) == plain.content
+
+
+@pytest.mark.django_db
+def test_compressed_stream(client, catalog, settings):
+    settings.COMPRESSION_ENCODINGS = ['gzip']
+    plain = b''.join(client.get(reverse('backend:export-catalog')).streaming_content)
+
+    response = client.get(reverse('backend:export-catalog'), HTTP_ACCEPT_ENCODING='gzip')
+    assert response.streaming and response['Content-Encoding'] == 'gzip' and 'Content-Length' not in response
+    decompressor = zlib.decompressobj(31)
+    # первая часть (первая строка выгрузки) распаковывается без ожидания конца ответа
+    chunks = [decompressor.decompress(chunk) for chunk in response.streaming_content]
+    assert chunks[0] == plain.split(b'\n', 1)[0] + b'\n'
+    assert b''.join(chunks) == plain
+
+
+def test_compressed_schema_etag(client, settings, tmp_path):
+    settings.OPENAPI_SCHEMA_DIR = str(tmp_path)
+    call_command('build_openapi_schema')
+    etag = client.get(reverse('schema'))['ETag']
+
+    response = client.get(reverse('schema'), HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip' and response['ETag'] == f'W/{etag}'
+    for if_none_match in (etag, response['ETag']):
+        assert client.get(reverse('schema'), HTTP_ACCEPT_ENCODING='gzip',
+                          HTTP_IF_NONE_MATCH=if_none_match).status_code == 304
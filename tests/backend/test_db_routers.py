@@ -0,0 +1,80 @@
+import pytest
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from rest_framework.authtoken.models import Token
+
+from backend.db_routers import ReplicaRouter, use_replica
+from backend.middleware import ReplicaRoutingMiddleware
+from backend.models import ProductCategory, Order
+
+# интеграционный тест запускается при заданном POSTGRES_REPLICA_HOST (в тестах реплика - зеркало основной БД)
+REPLICA_CONFIGURED = 'replica' in settings.DATABASES
+
+
+@pytest.fixture
+def replica_settings(settings):
+    settings.REPLICA_DATABASE = 'replica'
+    settings.REPLICA_STICKY_SECONDS = 10
+
+
+def test_router_reads_primary_by_default(replica_settings):
+    router = ReplicaRouter()
+
+    assert router.db_for_read(ProductCategory) == 'default'
+    with use_replica():
+        assert router.db_for_read(ProductCategory) == 'replica'
+        assert router.db_for_read(Token) == 'default'
+        assert router.db_for_write(Order) == 'default'
+    assert not router.allow_migrate('replica', 'backend')
+
+
+def test_router_without_replica(settings):
+    settings.REPLICA_DATABASE = None
+
+    with use_replica():
+        assert ReplicaRouter().db_for_read(ProductCategory) == 'default'
+    assert ReplicaRouter().allow_migrate('default', 'backend')
+
+
+def routed_request(rf, method, url_name, token):
+    """Прогоняет запрос через middleware и возвращает БД, выбранную для чтения каталога во время запроса"""
+
+    url = reverse(url_name)
+    request = getattr(rf, method)(url, HTTP_AUTHORIZATION=f'Token {token}')
+    request.resolver_match = resolve(url)
+    chosen = []
+
+    def get_response(request):
+        middleware.process_view(request, None, (), {})
+        chosen.append(ReplicaRouter().db_for_read(ProductCategory))
+        return HttpResponse(status=201 if method == 'post' else 200)
+
+    middleware = ReplicaRoutingMiddleware(get_response)
+    middleware(request)
+    return chosen[0]
+
+
+def test_middleware_sticky_primary_after_write(replica_settings, rf):
+    assert routed_request(rf, 'get', 'backend:category', 'a') == 'replica'
+    assert routed_request(rf, 'get', 'backend:buyer-basket', 'a') == 'default'
+
+    routed_request(rf, 'post', 'backend:buyer-basket', 'a')
+
+    assert routed_request(rf, 'get', 'backend:buyer-order', 'a') == 'default'
+    assert routed_request(rf, 'get', 'backend:buyer-order', 'b') == 'replica'
+
+
+@pytest.mark.skipif(not REPLICA_CONFIGURED, reason='Реплика не настроена')
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'] if REPLICA_CONFIGURED else ['default'])
+def test_catalog_read_from_replica(client):
+    ProductCategory.objects.create(id=1, name='Смартфоны')
+
+    with CaptureQueriesContext(connections['replica']) as replica_queries:
+        response = client.get(reverse('backend:category'))
+
+    assert response.status_code == 200
+    assert replica_queries.captured_queries
+    assert response.json()['results'][0]['name'] == 'Смартфоны'
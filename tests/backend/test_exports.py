@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from backend.exports import CATALOG_FIELDS, ORDER_ITEM_FIELDS, buffered
+from backend.models import Supplier, ProductSupplier, ProductSupplierParameter, Buyer, Order, OrderItem
+
+
+@pytest.fixture
+def catalog(user_s, user_s2, model_factory):
+    supplier = model_factory(Supplier, user=user_s)
+    supplier_2 = model_factory(Supplier, user=user_s2)
+    offers = model_factory(ProductSupplier, supplier=supplier, price=Decimal('110000'), _quantity=3,
+                           _fill_optional=['product'])
+    offers += model_factory(ProductSupplier, supplier=supplier_2, _quantity=2, _fill_optional=['product'])
+    # параметры у товаров обоих поставщиков, чтобы при фильтрации слияние пропускало чужие
+    for offer in offers[1:]:
+        model_factory(ProductSupplierParameter, product_supplier=offer, _quantity=2, _fill_optional=['parameter'])
+    return offers
+
+
+def read_ndjson(response):
+    assert response.streaming
+    return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+
+@pytest.mark.django_db
+def test_catalog_ndjson(client, catalog):
+    response = client.get(reverse('backend:export-catalog'))
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/x-ndjson'
+    rows = read_ndjson(response)
+    assert [row['id'] for row in rows] == [offer.id for offer in catalog]
+    assert rows[0]['price'] == '110000.00' and rows[0]['parameters'] == []
+    assert len(rows[1]['parameters']) == 2
+
+
+@pytest.mark.django_db
+def test_catalog_csv_with_filter(client, catalog):
+    supplier_id = catalog[-1].supplier_id
+    response = client.get(reverse('backend:export-catalog'), {'format': 'csv', 'supplier_id': supplier_id})
+
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == 'attachment; filename="catalog.csv"'
+    rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+    assert tuple(rows[0].keys()) == CATALOG_FIELDS
+    assert [int(row['id']) for row in rows] == [offer.id for offer in catalog[3:]]
+    assert rows[0]['parameters'].count('; ') == 1
+
+
+@pytest.mark.django_db
+def test_buyer_order_export(user, client_with_credentials, catalog, model_factory):
+    buyer = model_factory(Buyer, user=user)
+    basket = model_factory(Order, buyer=buyer, state='basket')
+    order = model_factory(Order, buyer=buyer, state='new')
+    model_factory(OrderItem, order=basket, product_supplier=catalog[0], quantity=1)
+    model_factory(OrderItem, order=order, product_supplier=catalog[0], quantity=3)
+    model_factory(OrderItem, order=order, product_supplier=catalog[3], quantity=1)
+
+    response = client_with_credentials.get(reverse('backend:buyer-order-export'))
+
+    rows = read_ndjson(response)
+    assert len(rows) == 2 and tuple(rows[0].keys()) == ORDER_ITEM_FIELDS
+    assert {row['order_id'] for row in rows} == {order.id}
+    assert rows[0]['sum'] == '330000.00'
+
+
+@pytest.mark.django_db
+def test_order_export_permissions(client, client_with_credentials):
+    assert client_with_credentials.get(reverse('backend:supplier-order-export')).status_code == 403
+
+    client.force_authenticate(user=None)
+    response = client.get(reverse('backend:buyer-order-export'), {'format': 'csv'})
+    assert response.status_code == 401
+    assert response.content.decode().startswith('detail')
+
+
+def test_buffered():
+    lines = [b'header\n'] + [b'x' * 10 + b'\n'] * 10
+
+    chunks = list(buffered(iter(lines), size=30))
+
+    assert chunks[0] == b'header\n'
+    assert b''.join(chunks) == b''.join(lines)
+    assert len(chunks) == 5
@@ -0,0 +1,137 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from backend.fast_read import product_supplier_rows, basket_rows, buyer_order_rows, supplier_order_rows, \
+    decimal_str
+from backend.models import Supplier, ProductSupplier, ProductSupplierParameter, Buyer, Order, OrderItem
+from backend.serializers import ProductSupplierSerializer, BasketGetSerializer, BuyerOrderGetSerializer, \
+    SupplierOrdertGetSerializer
+
+
+# Эталон - прежняя реализация представлений через сериализаторы
+
+
+def reference_items(order_items, supplier=None):
+    items, order_sum = [], 0
+    for order_item in order_items:
+        product_supplier = order_item.product_supplier
+        if supplier and product_supplier.supplier.id != supplier.id:
+            continue
+        item_sum = product_supplier.price * order_item.quantity
+        item = {
+            'product_supplier_id': product_supplier.id,
+            'product_name': product_supplier.product.name,
+            'quantity': order_item.quantity,
+            'sum': item_sum,
+        }
+        # у поставщика - внешний id товара вместо id позиции
+        if supplier:
+            item['external_id'] = product_supplier.external_id
+        else:
+            item['id'] = order_item.id
+        items.append(item)
+        order_sum += item_sum
+    return items, order_sum
+
+
+def reference_basket(user):
+    data = []
+    for order in Order.objects.filter(buyer__in=user.buyers.all(), state='basket'):
+        items, order_sum = reference_items(OrderItem.objects.filter(order=order))
+        data.append({'buyer_id': order.buyer.id, 'order_id': order.id, 'order_sum': order_sum, 'order_items': items})
+    return BasketGetSerializer(data, many=True).data
+
+
+def reference_buyer_orders(user):
+    data = []
+    for buyer in user.buyers.all():
+        orders, buyer_sum = [], 0
+        for order in Order.objects.filter(buyer=buyer).exclude(state='basket'):
+            items, order_sum = reference_items(OrderItem.objects.filter(order=order))
+            orders.append({'id': order.id, 'state': order.state, 'order_sum': order_sum, 'order_items': items})
+            buyer_sum += order_sum
+        data.append({'buyer_id': buyer.id, 'buyer_sum': buyer_sum, 'orders': orders})
+    return BuyerOrderGetSerializer(data, many=True).data
+
+
+def reference_supplier_orders(user):
+    data = []
+    for supplier in user.suppliers.all():
+        orders, supplier_sum = [], 0
+        for order in Order.objects.filter(
+                order_items__product_supplier__supplier=supplier).exclude(state='basket').distinct():
+            items, order_sum = reference_items(OrderItem.objects.filter(order=order), supplier)
+            orders.append({'id': order.id, 'buyer_id': order.buyer.id, 'state': order.state,
+                           'order_sum': order_sum, 'order_items': items})
+            supplier_sum += order_sum
+        data.append({'supplier_id': supplier.id, 'supplier_sum': supplier_sum, 'orders': orders})
+    return SupplierOrdertGetSerializer(data, many=True).data
+
+
+@pytest.fixture
+def orders_data(user, user_s, user_s2, model_factory):
+    """Два поставщика с общими заказами, у покупателя корзина и размещенные заказы, один покупатель без заказов"""
+
+    supplier = model_factory(Supplier, user=user_s)
+    supplier_2 = model_factory(Supplier, user=user_s2)
+    model_factory(Supplier, user=user_s)
+    offers = model_factory(ProductSupplier, supplier=supplier, price=Decimal('1999.90'), _quantity=3,
+                           _fill_optional=['product']) + \
+        model_factory(ProductSupplier, supplier=supplier_2, price=Decimal('10'), _quantity=2,
+                                                                    _fill_optional=['product'])
+    for offer in offers[:3]:
+        model_factory(ProductSupplierParameter, product_supplier=offer, _quantity=2, _fill_optional=['parameter'])
+
+    buyer, buyer_2, _ = model_factory(Buyer, user=user, _quantity=3)
+    basket = model_factory(Order, buyer=buyer, state='basket')
+    orders = [model_factory(Order, buyer=buyer, state='new'), model_factory(Order, buyer=buyer_2, state='sent'),
+              model_factory(Order, buyer=buyer, state='confirmed')]
+    for order, order_offers in zip([basket] + orders, [offers[:2], offers, offers[3:], offers[1:4]]):
+        for quantity, offer in enumerate(order_offers, start=1):
+            model_factory(OrderItem, order=order, product_supplier=offer, quantity=quantity)
+    return offers
+
+
+def test_decimal_str():
+    assert decimal_str(Decimal('5')) == '5.00'
+    assert decimal_str(Decimal('1999.90') * 3) == '5999.70'
+    assert decimal_str(0) == '0.00'
+
+
+@pytest.mark.django_db
+def test_product_supplier_rows(orders_data, django_assert_num_queries):
+    reference = ProductSupplierSerializer(ProductSupplier.objects.select_related(
+        'supplier', 'product__category').prefetch_related('p_parameters__parameter').order_by('id'), many=True).data
+
+    with django_assert_num_queries(2):
+        rows = product_supplier_rows(ProductSupplier.objects.order_by('id'))
+
+    assert rows == reference
+    assert len(rows[0]['p_parameters']) == 2
+
+
+@pytest.mark.django_db
+def test_order_rows(user, user_s, orders_data, django_assert_num_queries):
+    with django_assert_num_queries(2):
+        basket = basket_rows(user)
+    with django_assert_num_queries(3):
+        orders = buyer_order_rows(user)
+    with django_assert_num_queries(2):
+        supplier_orders = supplier_order_rows(user_s)
+
+    assert basket == reference_basket(user)
+    assert orders == reference_buyer_orders(user)
+    assert supplier_orders == reference_supplier_orders(user_s)
+    assert len(supplier_orders) == 2 and len(supplier_orders[0]['orders']) == 2
+
+
+@pytest.mark.django_db
+def test_order_views(user, client_with_credentials, orders_data):
+    basket = client_with_credentials.get(reverse('backend:buyer-basket')).json()
+    orders = client_with_credentials.get(reverse('backend:buyer-order')).json()
+
+    assert basket == reference_basket(user)
+    assert orders == reference_buyer_orders(user)
+    assert orders[0]['buyer_sum'] == '18119.10'
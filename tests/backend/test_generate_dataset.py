@@ -0,0 +1,33 @@
+from io import StringIO
+
+import pytest
+import yaml
+from django.core.management import call_command
+
+from backend.models import CustomUser, Supplier, Product, ProductSupplier, Buyer, Order, OrderItem
+from backend.tasks import do_import_task
+
+
+@pytest.mark.django_db
+def test_generate_dataset(tmp_path):
+    call_command('generate_dataset', '--suppliers', '3', '--categories', '4', '--products', '20', '--offers', '40',
+                 '--buyer-users', '5', '--orders', '30', '--batch-size', '7', '--price-lists', '1',
+                 '--price-list-dir', str(tmp_path), stdout=StringIO())
+
+    offers = ProductSupplier.objects.count()
+    assert (Supplier.objects.count(), Product.objects.count()) == (3, 20) and 20 <= offers <= 40
+    assert not Product.objects.filter(s_products__isnull=True).exists()
+    assert CustomUser.objects.count() == 8 and Buyer.objects.exists()
+    assert Order.objects.exclude(state='basket').count() == 30
+    assert not Order.objects.filter(order_items__isnull=True).exists()
+    assert OrderItem.objects.count() >= 30
+
+    # id после вставки с явными id выдаются дальше
+    assert Order.objects.create(buyer=Buyer.objects.first()).id > Order.objects.order_by('-id')[1].id
+
+    # прайс совпадает с товарами в БД - загрузка обновляет их на месте
+    path, = tmp_path.glob('supplier_*.yaml')
+    supplier = Supplier.objects.get(id=int(path.stem.split('_')[1]))
+    own = supplier.s_products.count()
+    do_import_task(supplier.id, None, yaml.safe_load(path.read_text(encoding='utf-8')))
+    assert (ProductSupplier.objects.count(), supplier.s_products.count()) == (offers, own)
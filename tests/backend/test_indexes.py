@@ -0,0 +1,39 @@
+import pytest
+from django.db import connection, IntegrityError, transaction
+
+from backend.models import Supplier, ProductSupplier, Buyer, Order, OrderItem
+
+
+@pytest.mark.django_db
+def test_one_basket_per_buyer(user, model_factory):
+    buyer = model_factory(Buyer, user=user)
+    basket = model_factory(Order, buyer=buyer, state='basket')
+    model_factory(Order, buyer=buyer, state='new', _quantity=2)
+
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Order.objects.create(buyer=buyer, state='basket')
+    assert Order.objects.get_or_create(buyer=buyer, state='basket') == (basket, False)
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='EXPLAIN - только PostgreSQL')
+@pytest.mark.django_db
+def test_queries_use_indexes(user, user_s, model_factory):
+    supplier = model_factory(Supplier, user=user_s)
+    buyer = model_factory(Buyer, user=user)
+    offer = model_factory(ProductSupplier, supplier=supplier, _fill_optional=['product'])
+    model_factory(OrderItem, order=model_factory(Order, buyer=buyer, state='new'), product_supplier=offer)
+
+    with connection.cursor() as cursor:
+        # на нескольких строках последовательное чтение всегда дешевле, проверяется только возможность
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('ANALYZE')
+
+    queries = {
+        'unique_basket_per_buyer': Order.objects.filter(buyer=buyer, state='basket'),
+        'order_buyer_placed': Order.objects.filter(buyer=buyer).exclude(state='basket').order_by('created_at'),
+        'order_item_ps_order': OrderItem.objects.filter(product_supplier__supplier=supplier).values('order_id'),
+        'product_supplier_supplier_id': ProductSupplier.objects.filter(supplier=supplier).order_by('id'),
+        'supplier_available': Supplier.objects.filter(is_available=True).values('id'),
+    }
+    for index, queryset in queries.items():
+        assert index in queryset.explain(), index
@@ -0,0 +1,73 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from backend import metrics
+from backend.models import Supplier
+from backend.tasks import do_import_task
+from backend.throttles import AnonShortRateThrottle
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(client, settings):
+    # без токена и METRICS_PUBLIC=on метрики не отдаются
+    assert client.get(reverse('metrics')).status_code == 404
+
+    settings.METRICS_PUBLIC = True
+    before = sample('apiorders_http_request_duration_seconds_count', view='backend:category', method='GET',
+                    status='2xx')
+    client.get(reverse('backend:category'))
+
+    response = client.get(reverse('metrics'))
+    assert response.status_code == 200
+    assert b'apiorders_http_request_duration_seconds_bucket' in response.content
+    assert sample('apiorders_http_request_duration_seconds_count', view='backend:category', method='GET',
+                  status='2xx') == before + 1
+
+    settings.METRICS_TOKEN = 'secret'
+    settings.METRICS_PUBLIC = False
+    assert client.get(reverse('metrics')).status_code == 403
+    assert client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').status_code == 200
+    assert client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer sécret').status_code == 403
+
+
+def test_throttle_rejections():
+    before = sample('apiorders_throttle_rejections_total', scope='anon_short')
+    assert AnonShortRateThrottle().throttle_failure() is False
+    assert sample('apiorders_throttle_rejections_total', scope='anon_short') == before + 1
+
+
+@pytest.mark.django_db
+def test_import_metrics(user_s, model_factory):
+    supplier = model_factory(Supplier, user=user_s, name='Связной')
+    before = sample('apiorders_import_rows_total'), sample('apiorders_import_duration_seconds_count')
+
+    do_import_task(supplier.id, None, {
+        'shop': 'Связной',
+        'categories': [{'id': 224, 'name': 'Смартфоны'}],
+        'goods': [{'id': i, 'category': 224, 'model': f'm{i}', 'name': f'Смартфон {i}', 'price': 100,
+                   'price_rrc': 110, 'quantity': 1, 'parameters': {}} for i in range(3)],
+    })
+    assert (sample('apiorders_import_rows_total'), sample('apiorders_import_duration_seconds_count')) == (
+        before[0] + 3, before[1] + 1)
+
+
+def test_task_queue_lag():
+    headers = {}
+    metrics._mark_enqueued(headers=headers)
+    task = SimpleNamespace(name='backend.tasks.send_email_new_order_task',
+                           request=SimpleNamespace(enqueued_at=headers['enqueued_at'] - 5))
+    before = sample('apiorders_celery_task_queue_lag_seconds_sum', task=task.name)
+
+    metrics._task_started(task=task)
+    metrics._task_finished(task=task, state='SUCCESS')
+    assert sample('apiorders_celery_task_queue_lag_seconds_sum', task=task.name) - before >= 5
+    assert sample('apiorders_celery_task_duration_seconds_count', task=task.name, state='SUCCESS') >= 1
+    assert headers['enqueued_at'] <= time.time()
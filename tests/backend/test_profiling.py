@@ -0,0 +1,89 @@
+import os
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from backend import profiling
+
+
+@pytest.fixture
+def profiles(settings, tmp_path):
+    settings.PROFILING = True
+    settings.PROFILING_DIR = str(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_profile_by_staff_header(client, user, user_2, get_token, profiles, monkeypatch):
+    user.is_staff = True
+    user.save()
+    started = []
+    monkeypatch.setattr(profiling.Profile, '__enter__', lambda self: started.append(self.mode) or self)
+
+    # заголовок от обычного пользователя, без токена или с неверным токеном не запускает профилирование
+    for authorization in (f'Token {Token.objects.create(user=user_2).key}', None, 'Token invalid'):
+        headers = {'HTTP_AUTHORIZATION': authorization} if authorization else {}
+        response = client.get(reverse('backend:category'), HTTP_X_PROFILE='cprofile', **headers)
+        assert 'X-Profile-Id' not in response
+    # параметр запроса не включает профилирование и для сотрудника
+    response = client.get(reverse('backend:category'), {'profile': 1}, HTTP_AUTHORIZATION=f'Token {get_token.key}')
+    assert 'X-Profile-Id' not in response
+    assert not started and not os.listdir(profiles)
+    client.force_authenticate(user=user_2)
+    assert client.get(reverse('backend:profiles')).status_code == 403
+    client.force_authenticate(user=None)
+
+    monkeypatch.undo()
+    name = client.get(reverse('backend:category'), HTTP_X_PROFILE='1',
+                      HTTP_AUTHORIZATION=f'Token {get_token.key}')['X-Profile-Id']
+    assert sorted(os.listdir(profiles)) == [f'{name}.folded', f'{name}.json', f'{name}.prof']
+
+    client.force_authenticate(user=user)
+    profile, = client.get(reverse('backend:profiles')).json()
+    assert (profile['name'], profile['view'], profile['user_id'], profile['mode']) == (
+        name, 'backend:category', user.id, 'cprofile')
+    assert profile['queries'] >= 1 and set(profile['urls']) == {'json', 'folded', 'prof', 'stats'}
+    stats = client.get(reverse('backend:profile-file', args=[name, 'stats']))
+    assert stats.status_code == 200 and b'cumulative' in stats.content
+    assert client.get(reverse('backend:profile-file', args=[name, 'folded'])).status_code == 200
+    assert client.get(reverse('backend:profile-file', args=['missing', 'json'])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_sampled_profiles(client, profiles, settings):
+    settings.PROFILING_SAMPLE_RATE = 1
+    settings.PROFILING_MODE = 'sample'
+    settings.PROFILING_KEEP = 1
+
+    for _ in range(2):
+        response = client.get(reverse('backend:category'))
+        assert response.status_code == 200 and 'X-Profile-Id' not in response
+    name, = [entry[:-len('.json')] for entry in os.listdir(profiles) if entry.endswith('.json')]
+    assert sorted(os.listdir(profiles)) == [f'{name}.folded', f'{name}.json']
+
+
+@pytest.mark.django_db
+def test_profiling_disabled(client, user, settings, tmp_path):
+    settings.PROFILING_DIR = str(tmp_path / 'profiles')
+    user.is_staff = True
+    client.force_authenticate(user=user)
+
+    assert 'X-Profile-Id' not in client.get(reverse('backend:category'), HTTP_X_PROFILE='cprofile')
+    assert not os.path.exists(settings.PROFILING_DIR)
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampler_stacks(settings):
+    settings.PROFILING_INTERVAL = 0.001
+    with profiling.Profile('sample') as profile:
+        busy(0.1)
+    assert profile.profiler is None
+    assert any(stack.endswith(f'busy (test_profiling.py:{busy.__code__.co_firstlineno})')
+               for stack in profile.sampler.stacks)
@@ -0,0 +1,66 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from backend.renderers import ORJSONRenderer, ORJSONParser
+
+PAYLOAD = ReturnList([
+    {
+        'product': {'id': 1, 'name': 'Смартфон Apple iPhone XS Max 512GB (золотистый)', 'category': '224.Смартфоны'},
+        'price': '110000.00',
+        'sum': Decimal('330000.50'),
+        'created_at': datetime.datetime(2023, 2, 26, 21, 11, 5, 123456, tzinfo=datetime.timezone.utc),
+        'updated_at': timezone.make_aware(datetime.datetime(2023, 2, 26, 21, 11), datetime.timezone(
+            datetime.timedelta(hours=3))),
+        'day': datetime.date(2023, 2, 26),
+        'lag': datetime.timedelta(seconds=90),
+        'uuid': uuid.UUID('12345678123456781234567812345678'),
+        'detail': _('Invalid token.'),
+        'orders': {22: 3, 24: 1},
+        'note': 'строка\u2028с разделителем',
+        'empty': None,
+    }
+], serializer=None)
+
+
+def test_render_matches_json_renderer():
+    assert ORJSONRenderer().render(PAYLOAD) == JSONRenderer().render(PAYLOAD)
+
+
+def test_render_with_indent_uses_json_renderer():
+    media_type = 'application/json; indent=4'
+
+    assert ORJSONRenderer().render(PAYLOAD, media_type) == JSONRenderer().render(PAYLOAD, media_type)
+
+
+def test_render_none():
+    assert ORJSONRenderer().render(None) == b''
+
+
+def test_parse_matches_json_parser():
+    body = JSONRenderer().render(PAYLOAD)
+
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+
+def test_parse_error():
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b'{"orders_ids": [1, 2'))
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), -float('inf')])
+def test_render_non_finite_float_rejected(value):
+    data = {'items': [{'price': 1.5, 'rating': value}], 'note': None}
+    with pytest.raises(ValueError):
+        JSONRenderer().render(data)
+    with pytest.raises(ValueError):
+        ORJSONRenderer().render(data)
@@ -0,0 +1,66 @@
+import logging
+
+import pytest
+from django.urls import reverse
+
+from backend.models import Supplier, ProductCategory
+from backend.request_stats import fingerprint, request_stats
+
+
+@pytest.fixture(autouse=True)
+def stats():
+    request_stats.reset()
+    yield request_stats
+    request_stats.reset()
+
+
+@pytest.mark.django_db
+def test_request_metrics_sampled(client, user_s, model_factory, settings, caplog):
+    settings.REQUEST_METRICS_SAMPLE_RATE = 1
+    model_factory(ProductCategory, suppliers=[model_factory(Supplier, user=user_s)], _quantity=3)
+
+    with caplog.at_level(logging.INFO, logger='backend.middleware'):
+        response = client.get(reverse('backend:category'))
+    assert response.status_code == 200
+    assert response['Server-Timing'].startswith('app;dur=')
+    assert 'db;dur=' in response['Server-Timing']
+
+    stats = request_stats.snapshot()['backend:category']
+    assert (stats['requests'], stats['sampled']) == (1, 1)
+    assert stats['max_queries'] >= 1 and stats['slowest_sql'].startswith('SELECT')
+    record = caplog.records[-1].request_metrics
+    assert record['view'] == 'backend:category' and record['queries'] == stats['max_queries']
+
+
+@pytest.mark.django_db
+def test_request_metrics_not_sampled(client, settings, caplog):
+    settings.REQUEST_METRICS_SAMPLE_RATE = 0
+
+    with caplog.at_level(logging.INFO, logger='backend.middleware'):
+        client.get(reverse('backend:category'))
+        client.get('/api/v1/missing/')
+    # без выборки - только время ответа, в лог попадают только медленные запросы
+    assert 'db;dur=' not in client.get(reverse('backend:category'))['Server-Timing']
+    snapshot = request_stats.snapshot()
+    assert (snapshot['backend:category']['requests'], snapshot['backend:category']['sampled']) == (2, 0)
+    assert snapshot['<unresolved>']['requests'] == 1
+    assert not [record for record in caplog.records if record.name == 'backend.middleware']
+
+
+@pytest.mark.django_db
+def test_request_stats_view(client, user, settings):
+    settings.REQUEST_METRICS_SAMPLE_RATE = 1
+    client.get(reverse('backend:category'))
+    client.force_authenticate(user=user)
+    assert client.get(reverse('backend:request-stats')).status_code == 403
+
+    user.is_staff = True
+    response = client.get(reverse('backend:request-stats'))
+    assert response.status_code == 200
+    assert response.json()['views']['backend:category'] == request_stats.snapshot()['backend:category']
+
+
+def test_fingerprint():
+    assert fingerprint('SELECT "id"\n  FROM "t" WHERE "id" IN (%s, %s, %s) AND "x" = %s') == \
+        fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s) AND "x" = %s') == \
+        'SELECT "id" FROM "t" WHERE "id" IN (...) AND "x" = %s'
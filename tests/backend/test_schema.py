@@ -0,0 +1,49 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+
+from apiorders.schema import schema_file_path
+
+
+@pytest.fixture
+def schema_dir(settings, tmp_path):
+    settings.OPENAPI_SCHEMA_DIR = str(tmp_path)
+    return tmp_path
+
+
+def test_static_schema(client, schema_dir):
+    call_command('build_openapi_schema')
+    assert sorted(path.name for path in schema_dir.iterdir()) == ['openapi-1.0.0.json', 'openapi-1.0.0.yaml']
+    call_command('build_openapi_schema', '--check')
+
+    response = client.get(reverse('schema'))
+    assert response.status_code == 200 and response['Content-Type'].startswith('application/vnd.oai.openapi;')
+    assert response.content.startswith(b'openapi: 3.0.3') and response['Vary'] == 'Accept, Accept-Encoding'
+    assert 'max-age=3600' in response['Cache-Control'] and 'public' in response['Cache-Control']
+
+    not_modified = client.get(reverse('schema'), HTTP_IF_NONE_MATCH=response['ETag'])
+    assert not_modified.status_code == 304 and not not_modified.content
+
+    as_json = client.get(reverse('schema'), {'format': 'json'})
+    assert as_json.json()['info']['version'] == '1.0.0' and as_json['ETag'] != response['ETag']
+    assert client.get(reverse('schema'), HTTP_ACCEPT='application/json')['ETag'] == as_json['ETag']
+
+
+def test_schema_check_detects_drift(schema_dir):
+    with pytest.raises(CommandError):
+        call_command('build_openapi_schema', '--check')
+    call_command('build_openapi_schema')
+    with open(schema_file_path('yaml'), 'ab') as file:
+        file.write(b'# changed\n')
+    with pytest.raises(CommandError):
+        call_command('build_openapi_schema', '--check')
+
+
+def test_schema_not_built(client, schema_dir, settings):
+    settings.DEBUG = True
+    response = client.get(reverse('schema'))
+    assert response.status_code == 200 and 'ETag' not in response  # генерация на запрос
+
+    settings.DEBUG = False
+    response = client.get(reverse('schema'))
+    assert response.status_code == 404 and 'build_openapi_schema' in response.json()['error']
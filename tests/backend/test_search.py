@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.pagination import PageNumberPagination
+
+from backend.models import Supplier, Product, ProductSupplier, ProductSupplierParameter, Parameter
+
+NAMES = ['Смартфон Apple iPhone XS Max 512GB (золотистый)', 'Смартфон Xiaomi Redmi Note 7 4/64GB (синий)',
+         'Чехол для Apple iPhone XS Max', 'Наушники Apple AirPods Pro']
+
+
+@pytest.fixture
+def offers(user_s, user_s2, model_factory):
+    supplier = model_factory(Supplier, user=user_s)
+    # baker напрямую: поле model конфликтует с первым аргументом model_factory
+    offers = [baker.make(ProductSupplier, supplier=supplier, product=model_factory(Product, name=name), model=model)
+              for name, model in zip(NAMES, ['apple/iphone/xs-max', 'xiaomi/redmi-note-7', 'case-xs', 'airpods'])]
+    parameter = model_factory(Parameter, name='Цвет')
+    model_factory(ProductSupplierParameter, product_supplier=offers[1], parameter=parameter, value='синий')
+    # товары недоступного поставщика в поиск не попадают
+    unavailable = model_factory(Supplier, user=user_s2, is_available=False)
+    baker.make(ProductSupplier, supplier=unavailable, product=model_factory(Product, name='Смартфон Apple iPhone 8'),
+               model='apple/iphone/8')
+    return offers
+
+
+def search(client, q, **params):
+    response = client.get(reverse('backend:supplier-products-search'), {'q': q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_search(client, offers):
+    data = search(client, 'apple iphone')
+
+    assert data['count'] == 2
+    # совпадение в названии и модели выше, чем только в названии
+    assert [row['product']['name'] for row in data['results']] == [NAMES[0], NAMES[2]]
+    assert data['results'][0]['model'] == 'apple/iphone/xs-max'
+
+
+@pytest.mark.django_db
+def test_search_case_parameters_pagination(client, offers, monkeypatch):
+    assert [row['product']['name'] for row in search(client, 'СМАРТФОН синий')['results']] == [NAMES[1]]
+
+    monkeypatch.setattr(PageNumberPagination, 'page_size', 2)
+    data = search(client, 'apple', page=2)
+    assert data['count'] == 3 and len(data['results']) == 1 and data['next'] is None
+
+
+@pytest.mark.django_db
+def test_search_bad_query(client):
+    url = reverse('backend:supplier-products-search')
+
+    assert client.get(url).status_code == 400
+    assert client.get(url, {'q': ' я '}).status_code == 400
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='Морфология и опечатки - только PostgreSQL')
+@pytest.mark.django_db
+def test_search_morphology_and_typos(client, offers):
+    assert search(client, 'смартфоны')['count'] == 2
+    assert search(client, 'iphonr')['count'] == 2
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Модули, нужные только отдельным запросам: при запуске воркера не загружаются
+DEFERRED = ('drf_spectacular.views', 'cProfile', 'pstats')
+
+CODE = f'''
+import os, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'apiorders.settings')
+from apiorders.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+print('loaded:', *[name for name in {DEFERRED!r} if name in sys.modules])
+'''
+
+
+def test_wsgi_startup_without_output_and_deferred_imports():
+    result = subprocess.run([sys.executable, '-c', CODE], capture_output=True, text=True, cwd=settings.BASE_DIR)
+    assert result.returncode == 0, result.stderr
+    # до отметки - вывод при импорте, после - загруженные отложенные модули
+    assert result.stdout == 'loaded:\n'
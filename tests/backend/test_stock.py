@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from backend.models import Supplier, ProductSupplier, ProductSupplierChange
+
+
+@pytest.fixture
+def offers(user_s, model_factory):
+    supplier = model_factory(Supplier, user=user_s)
+    return [model_factory(ProductSupplier, supplier=supplier, external_id=external_id, price=Decimal('100'),
+                          price_rrc=Decimal('120'), quantity=10, _fill_optional=['product'])
+            for external_id in (1, 2, 3)]
+
+
+@pytest.mark.django_db
+def test_stock_update(client_with_credentials_user_s, offers, django_assert_max_num_queries):
+    supplier_id = offers[0].supplier_id
+    cursor = ProductSupplierChange.objects.last().id
+    items = [
+        {'external_id': 1, 'quantity': 0},
+        {'external_id': 2, 'price': '99.90', 'price_rrc': 120},
+        {'external_id': 3, 'quantity': 10},
+        {'external_id': 4, 'quantity': 1},
+        {'external_id': 1, 'quantity': 5},
+        {'external_id': 5, 'quantity': -1, 'stock': 1},
+        {'price': 1},
+    ]
+
+    with django_assert_max_num_queries(12):
+        response = client_with_credentials_user_s.post(reverse('backend:supplier-stock'),
+                                                       {'supplier_id': supplier_id, 'items': items})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data['updated'], data['unchanged'], data['not_found'], data['invalid']) == (2, 1, 1, 3)
+    assert [r['status'] for r in data['results']] == ['updated', 'updated', 'unchanged', 'not_found', 'invalid',
+                                                       'invalid', 'invalid']
+    assert set(data['results'][5]['errors']) == {'non_field_errors', 'quantity'}
+    assert list(data['results'][6]['errors']) == ['external_id']
+
+    offers_by_id = {offer.external_id: offer for offer in ProductSupplier.objects.all()}
+    assert offers_by_id[1].quantity == 0
+    assert offers_by_id[2].price == Decimal('99.90') and offers_by_id[2].price_rrc == Decimal('120')
+    # в ленту попадают только изменившиеся поля
+    assert list(ProductSupplierChange.objects.filter(id__gt=cursor).values_list(
+        'product_supplier_id', 'price', 'quantity')) == [(offers[0].id, None, 0), (offers[1].id, Decimal('99.90'), None)]
+
+
+@pytest.mark.django_db
+def test_stock_update_foreign_supplier(client_with_credentials_user_s, user_s2, model_factory):
+    supplier = model_factory(Supplier, user=user_s2)
+
+    response = client_with_credentials_user_s.post(reverse('backend:supplier-stock'),
+                                                   {'supplier_id': supplier.id, 'items': [{'external_id': 1}]})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_stock_update_max_rows(client_with_credentials_user_s, offers, settings):
+    settings.STOCK_UPDATE_MAX_ROWS = 2
+    items = [{'external_id': i, 'quantity': 1} for i in range(3)]
+
+    response = client_with_credentials_user_s.post(reverse('backend:supplier-stock'),
+                                                   {'supplier_id': offers[0].supplier_id, 'items': items})
+
+    assert response.status_code == 400
+    assert 'items' in response.json()
@@ -0,0 +1,115 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from apiorders.celery import app as celery_app
+from backend.models import Supplier, ProductSupplier
+from backend.tasks import refresh_price_lists_task
+
+PRICE_LIST = '''
+shop: {shop}
+categories:
+  - id: 224
+    name: Смартфоны
+goods:
+  - id: 4216292
+    category: 224
+    model: apple/iphone/xs-max
+    name: Смартфон Apple iPhone XS Max 512GB ({shop})
+    price: 110000
+    price_rrc: 116990
+    quantity: 31
+    parameters:
+      "Цвет": золотистый
+'''
+
+
+class PriceListHandler(BaseHTTPRequestHandler):
+    """Отдает прайс по имени файла (shop.yaml), поддерживает If-None-Match"""
+
+    requests_log = []
+
+    def do_GET(self):
+        shop = self.path.strip('/').split('.')[0]
+        etag = f'"{shop}-v1"'
+        self.requests_log.append((self.path, self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = PRICE_LIST.format(shop=shop).encode()
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def price_list_server():
+    PriceListHandler.requests_log = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PriceListHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def eager_celery():
+    celery_app.conf.task_always_eager = True
+    yield
+    celery_app.conf.task_always_eager = False
+
+
+@pytest.mark.django_db
+def test_refresh_price_lists_imports_only_changed(user_s, model_factory, price_list_server, eager_celery):
+    shops = ['shop1', 'shop2', 'shop3']
+    suppliers = [model_factory(Supplier, name=shop, user=user_s, file_url=f'{price_list_server}/{shop}.yaml')
+                 for shop in shops]
+    model_factory(Supplier, name='off', user=user_s, is_available=False, file_url=f'{price_list_server}/off.yaml')
+
+    result = refresh_price_lists_task()
+
+    assert sorted(result['updated']) == [s.id for s in suppliers]
+    assert result['failed'] == []
+    assert ProductSupplier.objects.count() == 3
+    assert Supplier.objects.get(id=suppliers[0].id).file_etag == '"shop1-v1"'
+    assert '/off.yaml' not in [path for path, _ in PriceListHandler.requests_log]
+
+    result = refresh_price_lists_task()
+
+    assert result['updated'] == []
+    assert sorted(result['unchanged']) == [s.id for s in suppliers]
+    assert all(etag for _, etag in PriceListHandler.requests_log[3:])
+
+
+@pytest.mark.django_db
+def test_refresh_price_lists_failed_download(user_s, model_factory):
+    supplier = model_factory(Supplier, name='shop1', user=user_s, file_url='http://127.0.0.1:1/shop1.yaml')
+
+    result = refresh_price_lists_task()
+
+    assert result['failed'] == [supplier.id]
+    assert not ProductSupplier.objects.exists()
+
+
+@pytest.mark.django_db
+def test_refresh_price_lists_retries_failed_import(user_s, model_factory, price_list_server, eager_celery):
+    # имя в прайсе (shop1) не совпадает с поставщиком - импорт не выполнен, версия файла не запоминается
+    supplier = model_factory(Supplier, name='other', user=user_s, file_url=f'{price_list_server}/shop1.yaml')
+
+    assert refresh_price_lists_task()['updated'] == [supplier.id]
+    supplier.refresh_from_db()
+    assert (supplier.file_etag, supplier.file_hash) == ('', '')
+    assert not ProductSupplier.objects.exists()
+
+    Supplier.objects.filter(id=supplier.id).update(name='shop1')
+    assert refresh_price_lists_task()['updated'] == [supplier.id]
+    assert PriceListHandler.requests_log[1] == ('/shop1.yaml', None)
+    assert ProductSupplier.objects.count() == 1 and Supplier.objects.get(id=supplier.id).file_etag == '"shop1-v1"'
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+import redis
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from backend import throttles
+from backend.throttles import RedisScopedRateThrottle
+
+REDIS_URL = os.getenv('THROTTLE_TEST_REDIS_URL', 'redis://127.0.0.1:6379/15')
+
+
+class View:
+    throttle_scope = None
+
+
+class PriceListView:
+    throttle_scope = 'price_list_update'
+
+
+@pytest.fixture
+def redis_throttle(settings, monkeypatch):
+    client = redis.Redis.from_url(REDIS_URL)
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip('Redis недоступен')
+    client.flushdb()
+    settings.THROTTLE_REDIS_URL = REDIS_URL
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {
+        'anon_short': '3/min', 'anon_long': '100/day', 'user_short': '5/min', 'user_long': '100/day',
+        'price_list_update': '2/min'}}
+    monkeypatch.setattr(throttles, '_script', None)
+    yield client
+    client.flushdb()
+
+
+def make_request(user=None):
+    request = Request(APIRequestFactory().get('/', REMOTE_ADDR='10.0.0.1'))
+    if user:
+        request.user = user
+    return request
+
+
+def test_anon_limit_shared_between_instances(redis_throttle):
+    # разные экземпляры (как разные воркеры) используют общие счетчики
+    results = [RedisScopedRateThrottle().allow_request(make_request(), View()) for _ in range(4)]
+
+    assert results == [True, True, True, False]
+
+
+def test_rejection_reports_scope_and_wait(redis_throttle):
+    for _ in range(3):
+        RedisScopedRateThrottle().allow_request(make_request(), View())
+    throttle = RedisScopedRateThrottle()
+
+    assert not throttle.allow_request(make_request(), View())
+    assert throttle.failed_scope == 'anon_short'
+    assert 0 < throttle.wait() <= 60
+
+
+@pytest.mark.django_db
+def test_view_scope_checked_with_user_scopes(redis_throttle, user_s):
+    throttle = RedisScopedRateThrottle()
+    scopes = [scope for scope, _ in throttle.get_scopes(make_request(user_s), PriceListView())]
+    results = [RedisScopedRateThrottle().allow_request(make_request(user_s), PriceListView()) for _ in range(3)]
+
+    assert scopes == ['user_short', 'user_long', 'price_list_update']
+    assert results == [True, True, False]
+    # отклоненный запрос не увеличивает счетчики остальных scope
+    assert sum(int(redis_throttle.get(key)) for key in redis_throttle.keys('*user_short*')) == 2
+
+
+def test_redis_unavailable_allows_request(settings, monkeypatch):
+    settings.THROTTLE_REDIS_URL = 'redis://127.0.0.1:1/0'
+    monkeypatch.setattr(throttles, '_script', None)
+
+    assert RedisScopedRateThrottle().allow_request(make_request(), View())
+
+
+@pytest.mark.django_db
+def test_view_scope_without_redis(client, user, settings):
+    assert 'backend.throttles.ViewScopeRateThrottle' in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES']
+    cache.clear()
+    client.force_authenticate(user=user)
+    statuses = [client.get(reverse('backend:buyer-order-export')).status_code for _ in range(11)]
+    assert statuses == [200] * 10 + [429]  # export: 10/hour
+    cache.clear()
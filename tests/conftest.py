@@ -5,6 +5,15 @@ from rest_framework.test import APIClient
 from backend.models import CustomUser
 
 
+def pytest_addoption(parser):
+    group = parser.getgroup('bench', 'бенчмарк эндпоинтов (tests/backend/test_benchmarks.py)')
+    group.addoption('--bench-sizes', default='1,4', help='размеры сгенерированных наборов данных через запятую')
+    group.addoption('--bench-repeat', type=int, default=3, help='повторов GET-запроса для медианы времени')
+    group.addoption('--bench-save', help='сохранить запросы к БД и время в JSON')
+    group.addoption('--bench-baseline', help='JSON прошлого запуска: больше запросов или медленнее - ошибка')
+    group.addoption('--bench-tolerance', type=float, default=50, help='допустимое замедление от baseline, %%')
+
+
 @pytest.fixture
 def client():
     return APIClient()